@@ -0,0 +1,229 @@
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session
+from models import Team, User, VisibilityType
+
+class AudienceCache:
+    """
+    In-process LRU cache of alert audiences keyed by (visibility_type, target_id).
+
+    Member ids are stored as compact int64 arrays. The cache is bounded by the
+    total number of cached ids; least recently used audiences are evicted
+    first. Audience sizes counted without loading ids are cached separately,
+    up to `max_sizes` of them. Committed sessions that add, move or delete
+    users or delete teams call the invalidation hooks through session events,
+    and entries also expire after `ttl_seconds` so other processes' writes
+    are picked up eventually.
+    """
+
+    def __init__(self, max_ids: int = 2_000_000, ttl_seconds: Optional[float] = 300, max_sizes: int = 100_000):
+        self.max_ids = max_ids
+        self.ttl_seconds = ttl_seconds
+        self.max_sizes = max_sizes
+        self._entries: "OrderedDict[tuple, Tuple[array, float]]" = OrderedDict()
+        self._sizes: "OrderedDict[tuple, Tuple[int, float]]" = OrderedDict()
+        self._cached_ids = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get_member_ids(self, db: Session, visibility_type: VisibilityType, target_id: Optional[int]) -> array:
+        key = self._cache_key(db.get_bind(), visibility_type, target_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and self._fresh(entry[1]):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry:
+                self._remove(key)
+            self.misses += 1
+            generation = self._generation
+
+        member_ids = array('q', self._load(db, visibility_type, key[2]))
+        with self._lock:
+            # Skip caching if an invalidation raced with the load
+            if generation == self._generation and len(member_ids) <= self.max_ids:
+                self._store(key, member_ids)
+        return member_ids
+
+    def get_size(self, db: Session, visibility_type: VisibilityType, target_id: Optional[int]) -> int:
+        return len(self.get_member_ids(db, visibility_type, target_id))
+
+    def get_sizes(self, db: Session, keys: Iterable[Tuple[VisibilityType, Optional[int]]]) -> Dict[tuple, int]:
+        """
+        Audience size per (visibility_type, target_id) key.
+
+        Cached member lists and sizes are used where fresh; every miss is
+        counted together, in at most three queries however many keys miss.
+        """
+        bind = db.get_bind()
+        sizes, missing = {}, []
+        with self._lock:
+            for visibility_type, target_id in set(keys):
+                cache_key = self._cache_key(bind, visibility_type, target_id)
+                entry = self._entries.get(cache_key)
+                if entry and self._fresh(entry[1]):
+                    sizes[(visibility_type, target_id)] = len(entry[0])
+                elif cache_key in self._sizes and self._fresh(self._sizes[cache_key][1]):
+                    self._sizes.move_to_end(cache_key)
+                    sizes[(visibility_type, target_id)] = self._sizes[cache_key][0]
+                else:
+                    missing.append((visibility_type, target_id))
+                    continue
+                self.hits += 1
+            self.misses += len(missing)
+            generation = self._generation
+
+        counted = self._count(db, missing) if missing else {}
+        with self._lock:
+            if generation == self._generation:
+                now = time.monotonic()
+                for (visibility_type, target_id), size in counted.items():
+                    cache_key = self._cache_key(bind, visibility_type, target_id)
+                    self._sizes.pop(cache_key, None)
+                    self._sizes[cache_key] = (size, now)
+                while len(self._sizes) > self.max_sizes:
+                    self._sizes.popitem(last=False)
+        sizes.update(counted)
+        return sizes
+
+    def _count(self, db: Session, keys: Iterable[Tuple[VisibilityType, Optional[int]]]) -> Dict[tuple, int]:
+        team_ids = {target_id for visibility_type, target_id in keys if visibility_type == VisibilityType.TEAM}
+        user_ids = {target_id for visibility_type, target_id in keys if visibility_type == VisibilityType.USER}
+        team_sizes, existing_users, org_size = {}, set(), 0
+        if any(visibility_type == VisibilityType.ORGANIZATION for visibility_type, _ in keys):
+            org_size = db.query(func.count(User.id)).scalar()
+        if team_ids:
+            team_sizes = dict(db.query(User.team_id, func.count(User.id)).filter(
+                User.team_id.in_(team_ids)
+            ).group_by(User.team_id).all())
+        if user_ids:
+            existing_users = {user_id for (user_id,) in db.query(User.id).filter(User.id.in_(user_ids))}
+
+        sizes = {}
+        for visibility_type, target_id in keys:
+            if visibility_type == VisibilityType.ORGANIZATION:
+                sizes[(visibility_type, target_id)] = org_size
+            elif visibility_type == VisibilityType.TEAM:
+                sizes[(visibility_type, target_id)] = team_sizes.get(target_id, 0)
+            elif visibility_type == VisibilityType.USER:
+                sizes[(visibility_type, target_id)] = int(target_id in existing_users)
+            else:
+                sizes[(visibility_type, target_id)] = 0
+        return sizes
+
+    @staticmethod
+    def _cache_key(bind, visibility_type: VisibilityType, target_id: Optional[int]) -> tuple:
+        if visibility_type == VisibilityType.ORGANIZATION:
+            target_id = None
+        return (bind, visibility_type, target_id)
+
+    def _fresh(self, stored_at: float) -> bool:
+        return self.ttl_seconds is None or time.monotonic() - stored_at < self.ttl_seconds
+
+    def _load(self, db: Session, visibility_type: VisibilityType, target_id: Optional[int]) -> Iterable[int]:
+        query = db.query(User.id)
+        if visibility_type == VisibilityType.ORGANIZATION:
+            pass
+        elif visibility_type == VisibilityType.TEAM:
+            query = query.filter(User.team_id == target_id)
+        elif visibility_type == VisibilityType.USER:
+            query = query.filter(User.id == target_id)
+        else:
+            return []
+        return [user_id for (user_id,) in query.order_by(User.id)]
+
+    def _store(self, key: tuple, member_ids: array):
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (member_ids, time.monotonic())
+        self._cached_ids += len(member_ids)
+        while self._cached_ids > self.max_ids and self._entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key: tuple):
+        member_ids, _ = self._entries.pop(key)
+        self._cached_ids -= len(member_ids)
+
+    # Invalidation hooks
+    def invalidate(self, visibility_type: VisibilityType, target_id: Optional[int] = None):
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            for key in [k for k in self._entries if k[1] == visibility_type and k[2] == target_id]:
+                self._remove(key)
+            for key in [k for k in self._sizes if k[1] == visibility_type and k[2] == target_id]:
+                del self._sizes[key]
+
+    def user_changed(self, user_id: int, team_ids: Iterable[Optional[int]] = ()):
+        """A user was created, deleted or moved between `team_ids`"""
+        self.invalidate(VisibilityType.ORGANIZATION)
+        self.invalidate(VisibilityType.USER, user_id)
+        for team_id in set(team_ids):
+            if team_id is not None:
+                self.invalidate(VisibilityType.TEAM, team_id)
+
+    def team_deleted(self, team_id: int):
+        self.invalidate(VisibilityType.TEAM, team_id)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._sizes.clear()
+            self._cached_ids = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'cached_ids': self._cached_ids,
+                'cached_sizes': len(self._sizes),
+                'max_ids': self.max_ids,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
+
+# Global cache instance
+audience_cache = AudienceCache()
+
+@event.listens_for(Session, "after_flush")
+def _collect_audience_changes(session: Session, flush_context):
+    # Any flush that adds, deletes or moves a user, or deletes a team, whichever code path issued it
+    changes = session.info.setdefault('audience_changes', [])
+    for obj in session.new | session.deleted:
+        if isinstance(obj, User):
+            changes.append((obj.id, [obj.team_id]))
+    for obj in session.dirty:
+        if isinstance(obj, User):
+            history = inspect(obj).attrs.team_id.history
+            if history.has_changes():
+                changes.append((obj.id, [*history.deleted, *history.added]))
+    for obj in session.deleted:
+        if isinstance(obj, Team):
+            changes.append((None, [obj.id]))
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_audiences(session: Session):
+    for user_id, team_ids in session.info.pop('audience_changes', []):
+        if user_id is None:
+            audience_cache.team_deleted(team_ids[0])
+        else:
+            audience_cache.user_changed(user_id, team_ids)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_audience_changes(session: Session):
+    session.info.pop('audience_changes', None)
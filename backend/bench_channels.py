@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-recipient send() against batched send_many() on a fake provider.
+
+    python bench_channels.py --recipients 5000 --latency 0.002 --batch-size 100
+"""
+
+import argparse
+import time
+from models import Alert, User, SeverityLevel, DeliveryType, VisibilityType
+from providers import FakeProvider
+from services import EmailNotificationChannel, SMSNotificationChannel, SlackNotificationChannel
+
+CHANNELS = {
+    'Email': EmailNotificationChannel,
+    'SMS': SMSNotificationChannel,
+    'Slack': SlackNotificationChannel,
+}
+
+def run(channel_cls, users, alert, latency, batch_size, batched):
+    provider = FakeProvider(channel_cls.label, max_batch_size=batch_size, latency=latency)
+    channel = channel_cls(provider=provider, batch_size=batch_size)
+    started = time.perf_counter()
+    if batched:
+        channel.send_many(users, alert)
+    else:
+        for user in users:
+            channel.send(user, alert)
+    elapsed = time.perf_counter() - started
+    return {
+        'provider_calls': provider.calls,
+        'seconds': round(elapsed, 3),
+        'calls_per_second': round(provider.calls / elapsed, 1),
+        'messages_per_second': round(provider.messages / elapsed, 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--recipients', type=int, default=2000)
+    parser.add_argument('--latency', type=float, default=0.002, help='seconds per provider call')
+    parser.add_argument('--batch-size', type=int, default=100)
+    args = parser.parse_args()
+
+    users = [User(id=i, name=f"User {i}", email=f"user{i}@company.com") for i in range(1, args.recipients + 1)]
+    alert = Alert(id=1, title="Benchmark", message="Benchmark", severity=SeverityLevel.INFO,
+                  delivery_type=DeliveryType.EMAIL, visibility_type=VisibilityType.ORGANIZATION)
+
+    for name, channel_cls in CHANNELS.items():
+        single = run(channel_cls, users, alert, args.latency, args.batch_size, batched=False)
+        batch = run(channel_cls, users, alert, args.latency, args.batch_size, batched=True)
+        print(f"{name:6} send():      {single}")
+        print(f"{name:6} send_many(): {batch}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Before/after benchmark for the hot-query indexes (schema version 3).
+
+Seeds an isolated SQLite database, times the hot lookups with only primary
+keys, then applies the indexes and times them again.
+
+    python bench_indexes.py --preferences 1000000
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+from sqlalchemy import create_engine, insert, text
+from models import Base, User, Team, Alert, UserAlertPreference, SeverityLevel, VisibilityType
+
+# name -> (SQL, parameter factory)
+HOT_QUERIES = {
+    'preference_by_user_and_alert': (
+        "SELECT id, is_read FROM user_alert_preferences WHERE user_id = :user_id AND alert_id = :alert_id",
+        lambda r, n: {'user_id': r.randint(1, n['users']), 'alert_id': r.randint(1, n['alerts'])},
+    ),
+    'alerts_for_audience': (
+        "SELECT id FROM alerts WHERE visibility_type = 'TEAM' AND target_id = :team_id AND is_active = 1",
+        lambda r, n: {'team_id': r.randint(1, n['teams'])},
+    ),
+    'read_count_for_alert': (
+        "SELECT COUNT(*) FROM user_alert_preferences WHERE alert_id = :alert_id AND is_read = 1",
+        lambda r, n: {'alert_id': r.randint(1, n['alerts'])},
+    ),
+    'snoozed_count_for_alert': (
+        "SELECT COUNT(*) FROM user_alert_preferences WHERE alert_id = :alert_id AND is_snoozed = 1",
+        lambda r, n: {'alert_id': r.randint(1, n['alerts'])},
+    ),
+    'users_in_team': (
+        "SELECT id FROM users WHERE team_id = :team_id",
+        lambda r, n: {'team_id': r.randint(1, n['teams'])},
+    ),
+}
+
+INDEXES = {
+    User.__table__: ["ix_users_team_id"],
+    Alert.__table__: ["ix_alerts_audience"],
+    UserAlertPreference.__table__: ["ux_preferences_user_alert", "ix_preferences_alert_read",
+                                    "ix_preferences_alert_snoozed"],
+}
+
+def seed(engine, sizes, rng, chunk_size=50000):
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(Team.__table__), [{'name': f"Team {i}"} for i in range(sizes['teams'])])
+        conn.execute(insert(User.__table__), [
+            {'name': f"User {i}", 'email': f"user{i}@example.com",
+             'team_id': rng.randint(1, sizes['teams']), 'is_admin': False}
+            for i in range(sizes['users'])
+        ])
+        conn.execute(insert(Alert.__table__), [
+            {'title': f"Alert {i}", 'message': "Synthetic", 'severity': rng.choice(list(SeverityLevel)).name,
+             'visibility_type': VisibilityType.TEAM.name, 'target_id': rng.randint(1, sizes['teams']),
+             'is_active': rng.random() < 0.8, 'reminder_frequency': 2, 'start_time': now, 'created_at': now}
+            for i in range(sizes['alerts'])
+        ])
+
+    # Spread preferences over distinct (user, alert) pairs
+    per_alert = max(1, sizes['preferences'] // sizes['alerts'])
+    rows = []
+    with engine.begin() as conn:
+        for alert_id in range(1, sizes['alerts'] + 1):
+            for user_id in rng.sample(range(1, sizes['users'] + 1), min(per_alert, sizes['users'])):
+                rows.append({'user_id': user_id, 'alert_id': alert_id, 'is_read': rng.random() < 0.4,
+                             'is_snoozed': rng.random() < 0.1, 'last_reminded': now})
+                if len(rows) >= chunk_size:
+                    conn.execute(insert(UserAlertPreference.__table__), rows)
+                    rows = []
+        if rows:
+            conn.execute(insert(UserAlertPreference.__table__), rows)
+
+def time_queries(engine, sizes, iterations, seed_value):
+    results = {}
+    with engine.connect() as conn:
+        for name, (sql, make_params) in HOT_QUERIES.items():
+            rng = random.Random(seed_value)
+            statement = text(sql)
+            started = time.perf_counter()
+            for _ in range(iterations):
+                conn.execute(statement, make_params(rng, sizes)).fetchall()
+            results[name] = round((time.perf_counter() - started) / iterations * 1000, 3)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--teams', type=int, default=50)
+    parser.add_argument('--alerts', type=int, default=500)
+    parser.add_argument('--preferences', type=int, default=200000)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+    sizes = {'users': args.users, 'teams': args.teams, 'alerts': args.alerts, 'preferences': args.preferences}
+
+    with tempfile.TemporaryDirectory() as workdir:
+        engine = create_engine(f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            for table, names in INDEXES.items():
+                for index in table.indexes:
+                    if index.name in names:
+                        index.drop(conn)
+
+        started = time.perf_counter()
+        seed(engine, sizes, random.Random(args.seed))
+        seed_seconds = time.perf_counter() - started
+
+        before = time_queries(engine, sizes, args.iterations, args.seed)
+        started = time.perf_counter()
+        with engine.begin() as conn:
+            for table, names in INDEXES.items():
+                for index in table.indexes:
+                    if index.name in names:
+                        index.create(conn)
+        index_seconds = time.perf_counter() - started
+        after = time_queries(engine, sizes, args.iterations, args.seed)
+        engine.dispose()
+
+    report = {
+        'sizes': sizes,
+        'seed_seconds': round(seed_seconds, 2),
+        'index_build_seconds': round(index_seconds, 2),
+        'queries_ms': {name: {'before': before[name], 'after': after[name],
+                              'speedup': round(before[name] / after[name], 1) if after[name] else None}
+                       for name in HOT_QUERIES},
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
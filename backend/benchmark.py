@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the backend hot paths on generated data.
+
+Builds an isolated SQLite database with datagen.py, then times alert
+fan-out, inbox reads, reminder passes, dashboard analytics and the
+/admin/alerts endpoint, the latter with a warm and a cold audience cache. Each scenario reports latency percentiles and SQL
+statements per call. Save a run with --output and compare a later commit
+against it with --compare.
+
+    python benchmark.py --users 20000 --alerts 500 --output bench.json
+    python benchmark.py --users 20000 --alerts 500 --compare bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timedelta
+import httpx
+import sqlalchemy
+from sqlalchemy import event, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from database import get_async_db, make_engine
+from audience import audience_cache
+from datagen import DEFAULT_SIZES, generate
+from logging_config import configure_logging
+from migrations import run_migrations
+from models import Base, UserAlertPreference, SeverityLevel, VisibilityType
+from services import AlertService, AnalyticsService, NotificationObserver, ReminderService
+
+class QueryCounter:
+    """Counts statements sent through the given engines"""
+
+    def __init__(self, *engines):
+        self.count = 0
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def summarize(latencies, queries):
+    return {
+        'iterations': len(latencies),
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'max_ms': round(max(latencies) * 1000, 3),
+        'queries_per_call': round(queries / len(latencies), 1),
+    }
+
+def measure(counter, iterations, call, setup=None):
+    """Time `call(i)` per iteration; `setup(i)` runs first and is neither timed nor counted"""
+    latencies, queries, extras = [], 0, []
+    for i in range(iterations):
+        if setup:
+            setup(i)
+        before = counter.count
+        started = time.perf_counter()
+        extras.append(call(i))
+        latencies.append(time.perf_counter() - started)
+        queries += counter.count - before
+    return summarize(latencies, queries), extras
+
+def bench_inbox(Session, counter, sizes, iterations, rng):
+    def call(i):
+        with Session() as db:
+            AlertService(db).get_alerts_for_user(rng.randint(1, sizes['users']), limit=50)
+    return measure(counter, iterations, call)[0]
+
+def bench_analytics(Session, counter, iterations):
+    def call(i):
+        with Session() as db:
+            AnalyticsService(db).get_dashboard_metrics()
+    return measure(counter, iterations, call)[0]
+
+def bench_admin_alerts(async_engine, counter, iterations, cold=False):
+    """Time GET /admin/alerts; with `cold` the audience cache is emptied (untimed) before every call"""
+    from main import app
+
+    sessions = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    async def override():
+        async with sessions() as session:
+            yield session
+
+    async def run():
+        latencies, queries = [], 0
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            params = {'limit': 50, 'sort_by': 'read_count'}
+            # Warm the pooled connection (SQLite pragmas) and the audience cache so steady state is measured
+            await client.get("/admin/alerts", params=params)
+            for i in range(iterations):
+                if cold:
+                    audience_cache.clear()
+                before = counter.count
+                started = time.perf_counter()
+                response = await client.get("/admin/alerts", params=params)
+                latencies.append(time.perf_counter() - started)
+                queries += counter.count - before
+                response.raise_for_status()
+        return summarize(latencies, queries)
+
+    app.dependency_overrides[get_async_db] = override
+    try:
+        return asyncio.run(run())
+    finally:
+        app.dependency_overrides.clear()
+
+def bench_reminders(Session, counter, iterations):
+    def setup(i):
+        # Make every unread, unsnoozed row due again
+        with Session() as db:
+            db.execute(update(UserAlertPreference).where(
+                UserAlertPreference.is_read == False,
+                UserAlertPreference.is_snoozed == False
+            ).values(last_reminded=datetime.utcnow() - timedelta(hours=3),
+                     next_reminder_at=datetime.utcnow() - timedelta(minutes=1)))
+            db.commit()
+
+    def call(i):
+        with Session() as db:
+            reminder_service = ReminderService(db, AlertService(db, queue_deliveries=True))
+            reminder_service.process_reminders()
+            return reminder_service.last_run
+
+    result, runs = measure(counter, iterations, call, setup)
+    reminded = sum(run['reminded'] for run in runs)
+    result['reminders_per_second'] = round(reminded / (result['mean_ms'] * iterations / 1000), 1)
+    result['batches_per_pass'] = round(sum(len(run['batches']) for run in runs) / iterations, 1)
+    return result
+
+def bench_fanout(Session, counter, iterations):
+    def call(i):
+        with Session() as db:
+            alert_service = AlertService(db, queue_deliveries=True)
+            observer = NotificationObserver(db, alert_service)
+            alert_service.add_observer(observer)
+            alert_service.create_alert({
+                'title': f"Benchmark {i}", 'message': "Fan-out", 'severity': SeverityLevel.CRITICAL,
+                'visibility_type': VisibilityType.ORGANIZATION
+            }, created_by=1)
+            return observer.last_fanout
+
+    result, fanouts = measure(counter, iterations, call)
+    result['recipients_per_call'] = fanouts[0]['recipients']
+    result['rows_per_second'] = round(sum(f['rows_per_second'] for f in fanouts) / iterations, 1)
+    return result
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(report, baseline):
+    print(f"\nAgainst {baseline['meta'].get('commit')} ({baseline['meta']['timestamp']}):")
+    if baseline['sizes'] != report['sizes']:
+        print(f"  warning: baseline sizes {baseline['sizes']} differ from {report['sizes']}")
+    for name, result in report['scenarios'].items():
+        before = baseline['scenarios'].get(name)
+        if not before:
+            print(f"  {name:20} new")
+            continue
+        ratio = result['p50_ms'] / before['p50_ms'] if before['p50_ms'] else float('inf')
+        print(f"  {name:20} p50 {before['p50_ms']:>9.3f} -> {result['p50_ms']:>9.3f} ms ({ratio:.2f}x)"
+              f"  queries {before['queries_per_call']} -> {result['queries_per_call']}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=DEFAULT_SIZES['users'])
+    parser.add_argument('--teams', type=int, default=DEFAULT_SIZES['teams'])
+    parser.add_argument('--alerts', type=int, default=DEFAULT_SIZES['alerts'])
+    parser.add_argument('--iterations', type=int, default=50, help='iterations for the read scenarios')
+    parser.add_argument('--write-iterations', type=int, default=3, help='iterations for fan-out and reminders')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--compare', help='print changes against an earlier --output file')
+    args = parser.parse_args()
+    sizes = {'users': args.users, 'teams': args.teams, 'alerts': args.alerts}
+    # Per-request and fan-out log lines would interleave with the report
+    configure_logging(level="WARNING")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        url = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+        engine = make_engine(url)
+        async_engine = make_engine(url.replace("sqlite://", "sqlite+aiosqlite://"), is_async=True)
+        Base.metadata.create_all(bind=engine)
+        run_migrations(engine)
+
+        started = time.perf_counter()
+        sizes = generate(engine, sizes, args.seed)
+        seed_seconds = time.perf_counter() - started
+
+        Session = sessionmaker(bind=engine, autoflush=False)
+        counter = QueryCounter(engine, async_engine.sync_engine)
+        rng = random.Random(args.seed)
+        scenarios = {
+            'get_alerts_for_user': bench_inbox(Session, counter, sizes, args.iterations, rng),
+            'dashboard_metrics': bench_analytics(Session, counter, args.iterations),
+            'admin_alerts_api': bench_admin_alerts(async_engine, counter, args.iterations),
+            'admin_alerts_api_cold': bench_admin_alerts(async_engine, counter, args.iterations, cold=True),
+            'process_reminders': bench_reminders(Session, counter, args.write_iterations),
+            'create_alert_fanout': bench_fanout(Session, counter, args.write_iterations),
+        }
+        asyncio.run(async_engine.dispose())
+        engine.dispose()
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.utcnow().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlalchemy': sqlalchemy.__version__,
+            'seed': args.seed,
+            'seed_seconds': round(seed_seconds, 2),
+        },
+        'sizes': sizes,
+        'scenarios': scenarios,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+if __name__ == "__main__":
+    main()
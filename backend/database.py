@@ -1,15 +1,168 @@
-from sqlalchemy import create_engine
+import os
+import threading
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool, StaticPool
 from models import Base, User, Team, SeverityLevel, VisibilityType
+from migrations import run_migrations
 from datetime import datetime, timedelta
 
-DATABASE_URL = "sqlite:///./alerts.db"
+def _flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./alerts.db")
+
+POOL_SETTINGS = {
+    'pool_size': int(os.getenv("DB_POOL_SIZE", 5)),
+    'max_overflow': int(os.getenv("DB_MAX_OVERFLOW", 10)),
+    'pool_timeout': float(os.getenv("DB_POOL_TIMEOUT", 30)),
+    'pool_recycle': int(os.getenv("DB_POOL_RECYCLE", 1800)),
+    'pool_pre_ping': _flag("DB_POOL_PRE_PING", "true"),
+}
+
+# Applied to every new SQLite connection so the API and the background
+# threads can write concurrently without failing on the file lock
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000)),
+    'mmap_size': int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+}
+
+# Sync driver -> async driver used for the request handlers
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'sqlite+pysqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+    'postgresql+psycopg2': 'postgresql+asyncpg',
+    'postgresql+psycopg': 'postgresql+psycopg_async',
+}
+
+def normalize_url(url: str):
+    parsed = make_url(url)
+    # Hosting providers still hand out the deprecated postgres:// scheme
+    if parsed.drivername == 'postgres':
+        parsed = parsed.set(drivername='postgresql')
+    return parsed
+
+def async_url(url: str) -> str:
+    parsed = normalize_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.drivername, parsed.drivername)
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or async_url(DATABASE_URL)
+
+class PoolMetrics:
+    """Checkout wait times and connection counts for one engine's pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.connections_opened = 0
+
+    def record_checkout(self, waited: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connections_opened += 1
+
+    def snapshot(self, pool) -> dict:
+        with self._lock:
+            stats = {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'avg_wait_ms': round(self.wait_seconds / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                'max_wait_ms': round(self.max_wait_seconds * 1000, 3),
+                'connections_opened': self.connections_opened,
+            }
+        stats['pool'] = type(pool).__name__
+        if isinstance(pool, QueuePool):
+            stats.update({
+                'size': pool.size(),
+                'checked_in': pool.checkedin(),
+                'checked_out': pool.checkedout(),
+                'overflow': max(pool.overflow(), 0),
+            })
+        return stats
+
+def measured_pool(pool_class, metrics: PoolMetrics):
+    """Subclass `pool_class` so time spent waiting for a connection is recorded"""
+    class MeasuredPool(pool_class):
+        def _do_get(self):
+            started = time.perf_counter()
+            try:
+                connection = super()._do_get()
+            except PoolTimeout:
+                metrics.record_checkout(time.perf_counter() - started, timed_out=True)
+                raise
+            metrics.record_checkout(time.perf_counter() - started)
+            return connection
+
+    MeasuredPool.__name__ = f"Measured{pool_class.__name__}"
+    return MeasuredPool
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+def make_engine(url: str, metrics: PoolMetrics = None, is_async: bool = False):
+    """Build a sync or async engine with the configured pooling for `url`"""
+    url = normalize_url(url)
+    is_sqlite = url.get_backend_name() == 'sqlite'
+    kwargs = {}
+    if is_sqlite and not is_async:
+        kwargs['connect_args'] = {"check_same_thread": False}
+    if is_sqlite and url.database in (None, '', ':memory:'):
+        # An in-memory database only exists on its one connection
+        kwargs['poolclass'] = StaticPool
+    else:
+        pool_class = AsyncAdaptedQueuePool if is_async else QueuePool
+        kwargs['poolclass'] = measured_pool(pool_class, metrics) if metrics else pool_class
+        kwargs.update(POOL_SETTINGS)
+
+    engine = (create_async_engine if is_async else create_engine)(url, **kwargs)
+    sync_engine = engine.sync_engine if is_async else engine
+    if is_sqlite:
+        event.listen(sync_engine, "connect", _apply_sqlite_pragmas)
+    if metrics:
+        event.listen(sync_engine, "connect", metrics.on_connect)
+    return engine
+
+pool_metrics = {'sync': PoolMetrics(), 'async': PoolMetrics()}
+
+engine = make_engine(DATABASE_URL, pool_metrics['sync'])
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Request handlers use the async engine; background workers keep the sync one
+async_engine = make_engine(ASYNC_DATABASE_URL, pool_metrics['async'], is_async=True)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+def pool_stats() -> dict:
+    return {
+        'backend': engine.dialect.name,
+        'sync': pool_metrics['sync'].snapshot(engine.pool),
+        'async': pool_metrics['async'].snapshot(async_engine.sync_engine.pool),
+    }
+
 def create_tables():
     Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
 
 def get_db():
     db = SessionLocal()
@@ -18,6 +171,10 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
 def seed_data():
     """Create sample data for testing"""
     db = SessionLocal()
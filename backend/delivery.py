@@ -0,0 +1,131 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+from database import SessionLocal
+from models import DeliveryType
+from ratelimit import DeliveryRateLimiter, delivery_rate_limiter
+from services import AlertService, DeliveryQueue
+
+logger = logging.getLogger("alerting.delivery")
+
+# Concurrent sends allowed per channel; override with e.g. DELIVERY_CONCURRENCY="Email=8,SMS=2"
+DEFAULT_CONCURRENCY = {
+    DeliveryType.IN_APP: 4,
+    DeliveryType.EMAIL: 4,
+    DeliveryType.SMS: 2,
+    DeliveryType.SLACK: 2,
+}
+
+def parse_concurrency(value: Optional[str]) -> Dict[DeliveryType, int]:
+    limits = dict(DEFAULT_CONCURRENCY)
+    for item in filter(None, (part.strip() for part in (value or "").split(","))):
+        name, _, limit = item.partition("=")
+        limits[DeliveryType(name.strip())] = max(1, int(limit))
+    return limits
+
+class DeliveryWorkerPool:
+    def __init__(self, concurrency: Optional[Dict[DeliveryType, int]] = None,
+                 batch_size: int = 100, poll_interval: float = 1.0,
+                 rate_limiter: Optional[DeliveryRateLimiter] = None):
+        self.concurrency = concurrency or parse_concurrency(os.getenv("DELIVERY_CONCURRENCY"))
+        self.rate_limiter = rate_limiter or delivery_rate_limiter
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.running = False
+        self.thread = None
+        self.executors: Dict[DeliveryType, ThreadPoolExecutor] = {}
+        self.in_flight: Dict[DeliveryType, int] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+
+    def start(self):
+        if not self.running:
+            self.running = True
+            self._wakeup.clear()
+            for delivery_type, limit in self.concurrency.items():
+                self.executors[delivery_type] = ThreadPoolExecutor(
+                    max_workers=limit, thread_name_prefix=f"delivery-{delivery_type.name.lower()}"
+                )
+                self.in_flight[delivery_type] = 0
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+            logger.info("Delivery workers started - %s", ', '.join(f'{t.value}={n}' for t, n in self.concurrency.items()),
+                        extra={'concurrency': {t.value: n for t, n in self.concurrency.items()}})
+
+    def stop(self):
+        self.running = False
+        self._wakeup.set()
+        if self.thread:
+            self.thread.join()
+        for executor in self.executors.values():
+            executor.shutdown(wait=True)
+        self.executors = {}
+
+    def notify(self):
+        """Wake the dispatcher so newly queued deliveries go out without waiting for the next poll"""
+        self._wakeup.set()
+
+    def _run(self):
+        while self.running:
+            try:
+                dispatched = self._dispatch_once()
+            except Exception as e:
+                logger.exception("Error in delivery dispatcher: %s", e)
+                dispatched = 0
+            if not dispatched:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def _dispatch_once(self) -> int:
+        """Claim due batches for every channel with spare capacity"""
+        dispatched = 0
+        db = SessionLocal()
+        try:
+            delivery_queue = DeliveryQueue(db)
+            for delivery_type, executor in self.executors.items():
+                # Claiming now would only defer every row until the channel bucket refills
+                if self.rate_limiter.channel_wait(delivery_type):
+                    continue
+                while self.running and self._has_capacity(delivery_type):
+                    token = delivery_queue.claim(delivery_type, self.batch_size)
+                    if not token:
+                        break
+                    with self._lock:
+                        self.in_flight[delivery_type] += 1
+                    executor.submit(self._deliver_batch, delivery_type, token)
+                    dispatched += 1
+        finally:
+            db.close()
+        return dispatched
+
+    def _has_capacity(self, delivery_type: DeliveryType) -> bool:
+        with self._lock:
+            return self.in_flight[delivery_type] < self.concurrency[delivery_type]
+
+    def _deliver_batch(self, delivery_type: DeliveryType, token: str):
+        db = SessionLocal()
+        try:
+            delivery_queue = DeliveryQueue(db, rate_limiter=self.rate_limiter)
+            channel = AlertService(db).notification_channels.get(delivery_type.value)
+            deliveries = delivery_queue.claimed(token)
+            if deliveries:
+                started = time.perf_counter()
+                counts = delivery_queue.deliver(deliveries, channel)
+                logger.debug("Delivered %s batch of %d", delivery_type.value, len(deliveries),
+                             extra={'channel': delivery_type.value, **counts,
+                                    'duration_ms': round((time.perf_counter() - started) * 1000, 1)})
+        except Exception as e:
+            db.rollback()
+            logger.exception("Error delivering %s batch: %s", delivery_type.value, e,
+                             extra={'channel': delivery_type.value})
+        finally:
+            db.close()
+            with self._lock:
+                self.in_flight[delivery_type] -= 1
+            self._wakeup.set()
+
+# Global worker pool instance
+delivery_workers = DeliveryWorkerPool()
@@ -0,0 +1,103 @@
+import asyncio
+import itertools
+import json
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, Set
+from models import Alert
+
+class Subscription:
+    def __init__(self, user_id: int, queue_size: int):
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+class EventBroker:
+    """
+    In-process pub/sub of inbox events keyed by user id.
+
+    Each open stream owns a bounded asyncio queue on the event loop that
+    created it. `publish` may be called from any thread (services run through
+    run_sync and in worker threads), so events are handed to the loop with
+    call_soon_threadsafe. A subscriber that falls behind loses its oldest
+    events instead of blocking the publisher.
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscribers: Dict[int, Set[Subscription]] = defaultdict(set)
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, user_id: int) -> Subscription:
+        """Must be called from the event loop that will consume the queue"""
+        subscription = Subscription(user_id, self.queue_size)
+        with self._lock:
+            self._subscribers[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def subscribed_user_ids(self) -> Set[int]:
+        with self._lock:
+            return set(self._subscribers)
+
+    def publish(self, user_ids: Iterable[int], event: dict):
+        with self._lock:
+            targets = [s for user_id in user_ids for s in self._subscribers.get(user_id, ())]
+            if not targets:
+                return
+            event = dict(event, id=next(self._ids))
+            self.published += len(targets)
+        for subscription in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(self._offer, subscription, event)
+            except RuntimeError:
+                # The subscriber's loop has shut down
+                self.unsubscribe(subscription)
+
+    def _offer(self, subscription: Subscription, event: dict):
+        if subscription.queue.full():
+            subscription.queue.get_nowait()
+            self.dropped += 1
+        subscription.queue.put_nowait(event)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'users': len(self._subscribers),
+                'streams': sum(len(s) for s in self._subscribers.values()),
+                'published': self.published,
+                'dropped': self.dropped
+            }
+
+def alert_event(alert: Alert) -> dict:
+    """A new-alert event, shaped like an inbox entry"""
+    return {
+        'type': 'alert',
+        'alert': {
+            'id': alert.id,
+            'title': alert.title,
+            'message': alert.message,
+            'severity': alert.severity.value,
+            'visibility_type': alert.visibility_type.value,
+            'is_active': alert.is_active,
+            'created_at': alert.created_at.isoformat(),
+            'is_read': False,
+            'is_snoozed': False
+        }
+    }
+
+def format_sse(event: dict) -> str:
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+# Global broker instance
+event_broker = EventBroker()
@@ -0,0 +1,187 @@
+"""
+Per-request SQL and timing instrumentation.
+
+`instrument_engine` hooks cursor execution on an engine: every statement is
+timed, added to the current request's totals (tracked in a context variable,
+which SQLAlchemy carries into `run_sync` greenlets) and, when slower than
+SLOW_QUERY_MS, logged and aggregated by fingerprint. `InstrumentationMiddleware`
+opens those totals per request, reports them as X-DB-Queries, X-DB-Time-Ms
+and X-Response-Time-Ms headers and a log line, and feeds per-route histograms
+in the metrics registry.
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from metrics import registry
+
+logger = logging.getLogger("alerting.requests")
+slow_logger = logging.getLogger("alerting.slow_queries")
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 200))
+
+class RequestStats:
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+_FINGERPRINT_RULES = [
+    (re.compile(r"'(?:[^']|'')*'"), "?"),                     # string literals
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),                  # numeric literals
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)"), "(?+)"),      # IN lists of any length
+    (re.compile(r"\s+"), " "),
+]
+
+def fingerprint(statement: str) -> str:
+    """Statement with literals and list lengths removed, so variants of one query group together"""
+    for pattern, replacement in _FINGERPRINT_RULES:
+        statement = pattern.sub(replacement, statement)
+    return statement.strip()
+
+class SlowQueryLog:
+    """Slow statements aggregated by fingerprint"""
+
+    def __init__(self, max_fingerprints: int = 500):
+        self.max_fingerprints = max_fingerprints
+        self.entries: Dict[str, dict] = {}
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, seconds: float):
+        key = fingerprint(statement)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                if len(self.entries) >= self.max_fingerprints:
+                    self.dropped += 1
+                    return
+                entry = self.entries[key] = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+            entry['count'] += 1
+            entry['total_ms'] += seconds * 1000
+            entry['max_ms'] = max(entry['max_ms'], seconds * 1000)
+
+    def stats(self, limit: int = 20) -> dict:
+        with self._lock:
+            top = sorted(self.entries.items(), key=lambda item: item[1]['total_ms'], reverse=True)[:limit]
+            return {
+                'threshold_ms': SLOW_QUERY_MS,
+                'fingerprints': len(self.entries),
+                'dropped': self.dropped,
+                'slowest': [
+                    {'fingerprint': key, 'count': entry['count'], 'total_ms': round(entry['total_ms'], 1),
+                     'max_ms': round(entry['max_ms'], 1), 'mean_ms': round(entry['total_ms'] / entry['count'], 1)}
+                    for key, entry in top
+                ]
+            }
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.dropped = 0
+
+slow_queries = SlowQueryLog()
+
+db_queries_total = registry.counter("db_queries_total", "SQL statements executed")
+db_slow_queries_total = registry.counter("db_slow_queries_total", "SQL statements slower than SLOW_QUERY_MS")
+http_requests_total = registry.counter(
+    "http_requests_total", "HTTP requests served", ("method", "route", "status"))
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "Wall time per request", ("method", "route"))
+http_request_db_seconds = registry.histogram(
+    "http_request_db_seconds", "Time spent in SQL per request", ("method", "route"))
+http_request_db_queries = registry.histogram(
+    "http_request_db_queries", "SQL statements per request", ("method", "route"),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250))
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._instrumentation_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_instrumentation_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    db_queries_total.inc()
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        db_slow_queries_total.inc()
+        slow_queries.record(statement, elapsed)
+        slow_logger.warning("slow query %.1fms: %s", elapsed * 1000, fingerprint(statement)[:500],
+                            extra={'duration_ms': round(elapsed * 1000, 1), 'fingerprint': fingerprint(statement)})
+
+def instrument_engine(engine: Engine):
+    """Time every statement on `engine`; pass `async_engine.sync_engine` for async engines"""
+    if not event.contains(engine, "after_cursor_execute", _after_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+class InstrumentationMiddleware:
+    """Pure ASGI middleware, so streaming responses pass through untouched"""
+
+    def __init__(self, app):
+        self.app = app
+        self._routes: Dict[object, str] = {}
+
+    def _route(self, scope) -> str:
+        # The router records the matched endpoint in the scope; label by its path template
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        if endpoint not in self._routes:
+            app = scope.get("app")
+            self._routes.update({
+                route.endpoint: route.path for route in getattr(app, "routes", []) if hasattr(route, "endpoint")
+            })
+        return self._routes.get(endpoint, "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_headers(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers += [
+                    (b"x-db-queries", str(stats.queries).encode()),
+                    (b"x-db-time-ms", f"{stats.db_seconds * 1000:.1f}".encode()),
+                    (b"x-response-time-ms", f"{(time.perf_counter() - started) * 1000:.1f}".encode()),
+                ]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            _request_stats.reset(token)
+            elapsed = time.perf_counter() - started
+            method, route = scope["method"], self._route(scope)
+            http_requests_total.inc(method=method, route=route, status=str(status))
+            http_request_duration.observe(elapsed, method=method, route=route)
+            http_request_db_seconds.observe(stats.db_seconds, method=method, route=route)
+            http_request_db_queries.observe(stats.queries, method=method, route=route)
+            logger.info(
+                "%s %s %s %.1fms %d queries %.1fms db", method, scope["path"], status, elapsed * 1000,
+                stats.queries, stats.db_seconds * 1000,
+                extra={'method': method, 'route': route, 'path': scope["path"], 'status': status,
+                       'duration_ms': round(elapsed * 1000, 1), 'db_queries': stats.queries,
+                       'db_ms': round(stats.db_seconds * 1000, 1)}
+            )
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Concurrent load test against a running API server.
+
+Polls user inboxes at increasing concurrency levels and reports throughput
+and latency per level. On SQLite throughput stays flat as concurrency grows:
+handlers run the synchronous service layer through `run_sync`, one greenlet
+per request holds its connection for the whole call, and SQLite serializes
+writers. Higher levels show the latency cost of queueing, not scaling.
+
+    uvicorn main:app --port 8000 &
+    python loadtest.py --url http://localhost:8000 --concurrency 1 8 32 64
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import httpx
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+async def run_level(client, paths, concurrency, requests):
+    latencies = []
+    errors = 0
+    queue = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(paths[i % len(paths)])
+
+    async def worker():
+        nonlocal errors
+        while not queue.empty():
+            path = queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                response = await client.get(path)
+                if response.status_code != 200:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    return {
+        'concurrency': concurrency,
+        'requests': requests,
+        'errors': errors,
+        'seconds': round(elapsed, 3),
+        'requests_per_second': round(requests / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+    }
+
+async def main(args):
+    limits = httpx.Limits(max_connections=max(args.concurrency))
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=30) as client:
+        users = (await client.get("/users")).json()
+        paths = [f"/users/{user['id']}/alerts?limit={args.limit}" for user in users]
+        results = []
+        for concurrency in args.concurrency:
+            result = await run_level(client, paths, concurrency, args.requests)
+            print(f"concurrency={concurrency:<4} {result['requests_per_second']:>8} req/s  "
+                  f"p50={result['p50_ms']}ms p95={result['p95_ms']}ms errors={result['errors']}")
+            results.append(result)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default="http://localhost:8000")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32, 64])
+    parser.add_argument('--requests', type=int, default=2000, help='requests per concurrency level')
+    parser.add_argument('--limit', type=int, default=50, help='inbox page size')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,102 @@
+"""
+Structured logging for the "alerting.*" loggers.
+
+Records are put on a bounded queue by a QueueHandler, so the calling thread
+never waits on stdout; a QueueListener thread formats them and writes one
+JSON object per line. Fields passed through `extra=` become keys of that
+object. When the queue is full the record is dropped and counted rather than
+blocking the request or worker that logged it.
+
+    LOG_LEVEL=DEBUG LOG_FORMAT=text python main.py
+"""
+
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+from metrics import registry
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+
+log_records_dropped = registry.counter("log_records_dropped_total", "Log records dropped because the queue was full")
+
+# Attributes every LogRecord has; anything else on a record came from `extra=`
+_RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _RESERVED})
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class _NonBlockingQueueHandler(QueueHandler):
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            log_records_dropped.inc()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve the message and traceback on the calling thread, but leave formatting to the listener
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+_listener: Optional[QueueListener] = None
+
+def configure_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT, stream=None,
+                      queue_size: int = LOG_QUEUE_SIZE, force: bool = False) -> logging.Logger:
+    """
+    Route the "alerting" logger hierarchy through a background queue.
+
+    Like logging.basicConfig, a second call does nothing unless `force` is
+    set, so a script can pick its level before importing main.
+    """
+    global _listener
+    logger = logging.getLogger("alerting")
+    if _listener is not None and not force:
+        return logger
+    stop_logging()
+
+    sink = logging.StreamHandler(stream or sys.stdout)
+    sink.setFormatter(JsonFormatter() if fmt == "json" else
+                      logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    _listener = QueueListener(log_queue, sink)
+    _listener.start()
+
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.addHandler(_NonBlockingQueueHandler(log_queue))
+    logger.setLevel(level)
+    # Keep uvicorn's or the test runner's root handlers from printing every record twice
+    logger.propagate = False
+    return logger
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+atexit.register(stop_logging)
@@ -1,15 +1,32 @@
+import asyncio
+import json
 import os
-from fastapi import FastAPI, Depends, HTTPException
+import time
+from fastapi import FastAPI, Body, Depends, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from pydantic import BaseModel
-from typing import List, Optional
+from sqlalchemy import func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, contains_eager, selectinload
+from pydantic import BaseModel, ValidationError
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
 from datetime import datetime
-from database import get_db, create_tables, seed_data
-from models import Alert, User, Team, SeverityLevel, VisibilityType, DeliveryType
-from services import AlertService, NotificationObserver, ReminderService, AnalyticsService
+from database import async_engine, engine, get_async_db, create_tables, seed_data, pool_stats
+from models import Alert, User, Team, UserAlertPreference, SeverityLevel, VisibilityType, DeliveryType
+from services import AlertService, NotificationObserver, StreamObserver, ReminderService, AnalyticsService
+from stats import STATS_RESOURCES, AlertStatsService
+from audience import audience_cache
+from events import event_broker, format_sse
+from versions import etag_matches, resource_versions, response_cache, touch
 from scheduler import reminder_scheduler
+from delivery import delivery_workers
+from retention import RETENTION_DAYS, run_compaction
+from instrumentation import InstrumentationMiddleware, instrument_engine, slow_queries
+from metrics import registry
+from logging_config import configure_logging
 
+configure_logging()
 app = FastAPI(title="Alerting & Notification Platform")
 
 # Configure CORS for production and development
@@ -31,8 +48,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-After", "X-Total-Count", "ETag", "X-DB-Queries", "X-DB-Time-Ms", "X-Response-Time-Ms"],
 )
 
+# Per-request query counts and timings; added last so it also times CORS handling
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+app.add_middleware(InstrumentationMiddleware)
+
 # Pydantic models
 class AlertCreate(BaseModel):
     title: str
@@ -92,69 +115,115 @@ class TeamUpdate(BaseModel):
 async def startup_event():
     create_tables()
     seed_data()
-    # Start automatic reminder processing
+    # Start outbound delivery workers and automatic reminder processing
+    delivery_workers.start()
     reminder_scheduler.start()
 
 @app.on_event("shutdown")
 async def shutdown_event():
     reminder_scheduler.stop()
+    delivery_workers.stop()
+    # Pooled aiosqlite connections keep a worker thread alive until closed
+    await async_engine.dispose()
+    engine.dispose()
 
 @app.get("/")
 async def root():
     return {"message": "Alerting & Notification Platform API"}
 
+async def cached_json(request: Request, db: AsyncSession, resources: Iterable[str],
+                      build: Callable[[dict], Awaitable[object]], vary: str = "") -> Response:
+    """Serve `build`'s JSON through ETag revalidation and the response cache.
+    
+    The ETag covers the stored versions of `resources`, the request URL and
+    `vary`, for inputs such as the current date that no write changes;
+    `build` may add response headers to the dict it is given.
+    """
+    key = f"{request.url.path}?{request.url.query}|{vary}"
+    # Read before building, so a body is never older than the versions in its ETag
+    versions = dict((await db.execute(resource_versions.query(resources))).all())
+    etag = resource_versions.etag(versions, resources, key)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        response_cache.record_not_modified()
+        return Response(status_code=304, headers=headers)
+    
+    cached = response_cache.get(key, etag)
+    if cached:
+        body, extra_headers = cached
+    else:
+        extra_headers = {}
+        content = jsonable_encoder(await build(extra_headers))
+        body = json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+        response_cache.put(key, etag, body, extra_headers)
+    return Response(body, media_type="application/json", headers={**headers, **extra_headers})
+
+def user_response(user: User) -> UserResponse:
+    return UserResponse(
+        id=user.id,
+        name=user.name,
+        email=user.email,
+        is_admin=user.is_admin,
+        team_name=user.team.name if user.team else None
+    )
+
+async def load_user(db: AsyncSession, user_id: int) -> Optional[User]:
+    # Relationships can't lazy-load on an AsyncSession, so fetch the team up front
+    result = await db.execute(
+        select(User).options(selectinload(User.team)).where(User.id == user_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalar_one_or_none()
+
 # User endpoints
 @app.get("/users", response_model=List[UserResponse])
-async def get_users(db: Session = Depends(get_db)):
-    users = db.query(User).all()
-    result = []
-    for user in users:
-        result.append(UserResponse(
-            id=user.id,
-            name=user.name,
-            email=user.email,
-            is_admin=user.is_admin,
-            team_name=user.team.name if user.team else None
-        ))
-    return result
+async def get_users(request: Request, db: AsyncSession = Depends(get_async_db)):
+    async def build(headers: dict):
+        users = await db.scalars(select(User).options(selectinload(User.team)))
+        return [user_response(user) for user in users]
+    return await cached_json(request, db, ('users', 'teams'), build)
 
 @app.get("/teams")
-async def get_teams(db: Session = Depends(get_db)):
-    teams = db.query(Team).all()
-    return [{"id": team.id, "name": team.name} for team in teams]
+async def get_teams(request: Request, db: AsyncSession = Depends(get_async_db)):
+    async def build(headers: dict):
+        teams = await db.scalars(select(Team))
+        return [{"id": team.id, "name": team.name} for team in teams]
+    return await cached_json(request, db, ('teams',), build)
 
 @app.post("/teams")
-async def create_team(team_data: TeamCreate, db: Session = Depends(get_db)):
+async def create_team(team_data: TeamCreate, db: AsyncSession = Depends(get_async_db)):
     team = Team(name=team_data.name)
     db.add(team)
-    db.commit()
-    db.refresh(team)
+    touch(db, 'teams')
+    await db.commit()
     return {"id": team.id, "name": team.name}
 
 @app.put("/teams/{team_id}")
-async def update_team(team_id: int, team_data: TeamUpdate, db: Session = Depends(get_db)):
-    team = db.query(Team).filter(Team.id == team_id).first()
+async def update_team(team_id: int, team_data: TeamUpdate, db: AsyncSession = Depends(get_async_db)):
+    team = await db.get(Team, team_id)
     if not team:
         raise HTTPException(status_code=404, detail="Team not found")
     
     if team_data.name:
         team.name = team_data.name
     
-    db.commit()
+    touch(db, 'teams')
+    await db.commit()
     return {"id": team.id, "name": team.name}
 
 @app.delete("/teams/{team_id}")
-async def delete_team(team_id: int, db: Session = Depends(get_db)):
-    team = db.query(Team).filter(Team.id == team_id).first()
+async def delete_team(team_id: int, db: AsyncSession = Depends(get_async_db)):
+    team = await db.get(Team, team_id)
     if not team:
         raise HTTPException(status_code=404, detail="Team not found")
     
-    db.delete(team)
-    db.commit()
+    await db.delete(team)
+    touch(db, 'teams', 'users')
+    await db.commit()
     return {"message": "Team deleted successfully"}
 
 @app.post("/users")
-async def create_user(user_data: UserCreate, db: Session = Depends(get_db)):
+async def create_user(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
     user = User(
         name=user_data.name,
         email=user_data.email,
@@ -162,234 +231,269 @@ async def create_user(user_data: UserCreate, db: Session = Depends(get_db)):
         is_admin=user_data.is_admin
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    touch(db, 'users')
+    await db.commit()
     
-    return UserResponse(
-        id=user.id,
-        name=user.name,
-        email=user.email,
-        is_admin=user.is_admin,
-        team_name=user.team.name if user.team else None
-    )
+    return user_response(await load_user(db, user.id))
 
 @app.put("/users/{user_id}")
-async def update_user(user_id: int, user_data: UserUpdate, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == user_id).first()
+async def update_user(user_id: int, user_data: UserUpdate, db: AsyncSession = Depends(get_async_db)):
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     for field, value in user_data.dict(exclude_unset=True).items():
         setattr(user, field, value)
     
-    db.commit()
-    db.refresh(user)
+    touch(db, 'users')
+    await db.commit()
     
-    return UserResponse(
-        id=user.id,
-        name=user.name,
-        email=user.email,
-        is_admin=user.is_admin,
-        team_name=user.team.name if user.team else None
-    )
+    return user_response(await load_user(db, user_id))
 
 @app.delete("/users/{user_id}")
-async def delete_user(user_id: int, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == user_id).first()
+async def delete_user(user_id: int, db: AsyncSession = Depends(get_async_db)):
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    db.delete(user)
-    db.commit()
+    await db.delete(user)
+    touch(db, 'users')
+    await db.commit()
     return {"message": "User deleted successfully"}
 
 # Admin endpoints
 @app.post("/admin/alerts")
-async def create_alert(alert_data: AlertCreate, created_by: int = 1, db: Session = Depends(get_db)):
-    alert_service = AlertService(db)
-    notification_observer = NotificationObserver(db, alert_service)
-    alert_service.add_observer(notification_observer)
+async def create_alert(alert_data: AlertCreate, created_by: int = 1, db: AsyncSession = Depends(get_async_db)):
+    def create(session: Session):
+        alert_service = AlertService(session, queue_deliveries=True)
+        notification_observer = NotificationObserver(session, alert_service)
+        alert_service.add_observer(notification_observer)
+        alert_service.add_observer(StreamObserver(session))
+        return alert_service.create_alert(alert_data.dict(), created_by), notification_observer.last_fanout
+    
+    alert, fanout = await db.run_sync(create)
+    delivery_workers.notify()
+    reminder_scheduler.replan()
+    return {
+        "id": alert.id,
+        "message": "Alert created successfully",
+        "fanout": fanout
+    }
+
+# Upper bound on alerts accepted by one bulk request
+MAX_BULK_ALERTS = 1000
+
+@app.post("/admin/alerts/bulk")
+async def create_alerts_bulk(
+    items: List[Dict[str, Any]] = Body(...),
+    created_by: int = 1,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Create many alerts in one transaction, reporting failures per item"""
+    if len(items) > MAX_BULK_ALERTS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_ALERTS} alerts per request")
     
-    alert = alert_service.create_alert(alert_data.dict(), created_by)
-    return {"id": alert.id, "message": "Alert created successfully"}
+    # Items are validated one by one so a bad entry doesn't reject the whole batch
+    valid, positions, errors = [], [], []
+    for index, item in enumerate(items):
+        try:
+            valid.append(AlertCreate(**item).dict())
+            positions.append(index)
+        except ValidationError as e:
+            detail = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            errors.append({"index": index, "error": detail})
+    
+    def create(session: Session):
+        alert_service = AlertService(session, queue_deliveries=True)
+        notification_observer = NotificationObserver(session, alert_service)
+        alert_service.add_observer(notification_observer)
+        alert_service.add_observer(StreamObserver(session))
+        created, rejected = alert_service.create_alerts(valid, created_by)
+        return {positions[i]: alert.id for i, alert in created.items()}, rejected, notification_observer.last_fanout
+    
+    started = time.perf_counter()
+    created, rejected, fanout = await db.run_sync(create)
+    elapsed = time.perf_counter() - started
+    if created:
+        delivery_workers.notify()
+        reminder_scheduler.replan()
+    
+    errors.extend({"index": positions[i], "error": reason} for i, reason in rejected.items())
+    return {
+        "created": len(created),
+        "failed": len(errors),
+        "ids": [created[index] for index in sorted(created)],
+        "errors": sorted(errors, key=lambda error: error["index"]),
+        "seconds": round(elapsed, 4),
+        "alerts_per_second": round(len(created) / elapsed, 1) if elapsed > 0 else 0.0,
+        "fanout": fanout
+    }
 
 @app.get("/admin/alerts")
 async def get_all_alerts(
+    response: Response,
     severity: Optional[SeverityLevel] = None,
     status: Optional[str] = None,  # active, expired, inactive
     audience: Optional[VisibilityType] = None,
-    db: Session = Depends(get_db)
+    sort_by: str = "created_at",  # created_at, severity, title, expiry_time, read_count, snoozed_count
+    order: str = "asc",
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    query = db.query(Alert)
-    
-    # Apply filters
-    if severity:
-        query = query.filter(Alert.severity == severity)
-    if audience:
-        query = query.filter(Alert.visibility_type == audience)
-    
-    alerts = query.all()
-    now = datetime.utcnow()
-    result = []
-    
-    for alert in alerts:
-        # Determine status
-        alert_status = "inactive"
-        if alert.is_active:
-            if alert.expiry_time and alert.expiry_time < now:
-                alert_status = "expired"
-            else:
-                alert_status = "active"
-        
-        # Filter by status if specified
-        if status and alert_status != status:
-            continue
-        
-        # Get user engagement stats
-        total_users = len(get_target_users_for_alert(alert, db))
-        preferences = db.query(UserAlertPreference).filter(
-            UserAlertPreference.alert_id == alert.id
-        ).all()
-        
-        snoozed_count = sum(1 for p in preferences if p.is_snoozed)
-        read_count = sum(1 for p in preferences if p.is_read)
-        
-        # Determine if still recurring
-        is_recurring = (
-            alert.is_active and 
-            alert.reminder_frequency > 0 and
-            (not alert.expiry_time or alert.expiry_time > now) and
-            snoozed_count < total_users * 0.8  # Less than 80% snoozed
-        )
-        
-        result.append({
-            "id": alert.id,
-            "title": alert.title,
-            "message": alert.message,
-            "severity": alert.severity.value,
-            "visibility_type": alert.visibility_type.value,
-            "target_id": alert.target_id,
-            "is_active": alert.is_active,
-            "status": alert_status,
-            "created_at": alert.created_at,
-            "start_time": alert.start_time,
-            "expiry_time": alert.expiry_time,
-            "reminder_frequency": alert.reminder_frequency,
-            "total_users": total_users,
-            "snoozed_count": snoozed_count,
-            "read_count": read_count,
-            "is_recurring": is_recurring,
-            "engagement_rate": round((read_count / total_users * 100) if total_users > 0 else 0, 1)
-        })
+    try:
+        alerts, total = await db.run_sync(lambda session: AlertService(session).get_admin_alerts(
+            severity=severity, status=status, audience=audience,
+            sort_by=sort_by, order=order, limit=limit, offset=offset
+        ))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    return result
+    if total is not None:
+        response.headers["X-Total-Count"] = str(total)
+    return alerts
 
-def get_target_users_for_alert(alert: Alert, db: Session) -> List[User]:
-    """Helper function to get target users for an alert"""
-    if alert.visibility_type == VisibilityType.ORGANIZATION:
-        return db.query(User).all()
-    elif alert.visibility_type == VisibilityType.TEAM:
-        return db.query(User).filter(User.team_id == alert.target_id).all()
-    elif alert.visibility_type == VisibilityType.USER:
-        user = db.query(User).filter(User.id == alert.target_id).first()
-        return [user] if user else []
-    return []
-
-@app.put("/admin/alerts/{alert_id}")
-async def update_alert(alert_id: int, alert_data: AlertUpdate, db: Session = Depends(get_db)):
-    alert = db.query(Alert).filter(Alert.id == alert_id).first()
+async def load_alert(db: AsyncSession, alert_id: int) -> Alert:
+    alert = await db.get(Alert, alert_id)
     if not alert:
         raise HTTPException(status_code=404, detail="Alert not found")
+    return alert
+
+async def save_alert(db: AsyncSession, alert: Alert):
+    await db.run_sync(lambda session: AlertService(session).save_alert(alert))
+    reminder_scheduler.replan()
+
+@app.put("/admin/alerts/{alert_id}")
+async def update_alert(alert_id: int, alert_data: AlertUpdate, db: AsyncSession = Depends(get_async_db)):
+    alert = await load_alert(db, alert_id)
     
     for field, value in alert_data.dict(exclude_unset=True).items():
         setattr(alert, field, value)
     
-    db.commit()
+    await save_alert(db, alert)
     return {"message": "Alert updated successfully"}
 
 @app.delete("/admin/alerts/{alert_id}")
-async def archive_alert(alert_id: int, db: Session = Depends(get_db)):
-    alert = db.query(Alert).filter(Alert.id == alert_id).first()
-    if not alert:
-        raise HTTPException(status_code=404, detail="Alert not found")
+async def archive_alert(alert_id: int, db: AsyncSession = Depends(get_async_db)):
+    alert = await load_alert(db, alert_id)
     
     alert.is_active = False
-    db.commit()
+    await save_alert(db, alert)
     return {"message": "Alert archived successfully"}
 
 @app.put("/admin/alerts/{alert_id}/toggle")
-async def toggle_alert(alert_id: int, db: Session = Depends(get_db)):
-    alert = db.query(Alert).filter(Alert.id == alert_id).first()
-    if not alert:
-        raise HTTPException(status_code=404, detail="Alert not found")
+async def toggle_alert(alert_id: int, db: AsyncSession = Depends(get_async_db)):
+    alert = await load_alert(db, alert_id)
     
     alert.is_active = not alert.is_active
-    db.commit()
+    await save_alert(db, alert)
     return {"message": f"Alert {'activated' if alert.is_active else 'deactivated'}"}
 
 @app.put("/admin/alerts/{alert_id}/reminders")
-async def toggle_reminders(alert_id: int, enabled: bool, db: Session = Depends(get_db)):
-    alert = db.query(Alert).filter(Alert.id == alert_id).first()
-    if not alert:
-        raise HTTPException(status_code=404, detail="Alert not found")
+async def toggle_reminders(alert_id: int, enabled: bool, db: AsyncSession = Depends(get_async_db)):
+    alert = await load_alert(db, alert_id)
     
     alert.reminder_frequency = 2 if enabled else 0
-    db.commit()
+    await save_alert(db, alert)
     return {"message": f"Reminders {'enabled' if enabled else 'disabled'}"}
 
 # User endpoints
 @app.get("/users/{user_id}/alerts", response_model=List[AlertResponse])
-async def get_user_alerts(user_id: int, db: Session = Depends(get_db)):
-    alert_service = AlertService(db)
-    alerts_data = alert_service.get_alerts_for_user(user_id)
-    
-    result = []
-    for data in alerts_data:
-        alert = data['alert']
-        result.append(AlertResponse(
-            id=alert.id,
-            title=alert.title,
-            message=alert.message,
-            severity=alert.severity.value,
-            visibility_type=alert.visibility_type.value,
-            is_active=alert.is_active,
-            created_at=alert.created_at,
-            is_read=data['is_read'],
-            is_snoozed=data['is_snoozed']
+async def get_user_alerts(
+    user_id: int,
+    request: Request,
+    after: Optional[int] = None,  # last alert id of the previous page
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    severity: Optional[SeverityLevel] = None,
+    unread: bool = False,
+    db: AsyncSession = Depends(get_async_db)
+):
+    async def build(headers: dict):
+        alerts_data = await db.run_sync(lambda session: AlertService(session).get_alerts_for_user(
+            user_id, after=after, limit=limit, severity=severity, unread_only=unread
         ))
+        
+        result = [
+            AlertResponse(
+                id=data['alert'].id,
+                title=data['alert'].title,
+                message=data['alert'].message,
+                severity=data['alert'].severity.value,
+                visibility_type=data['alert'].visibility_type.value,
+                is_active=data['alert'].is_active,
+                created_at=data['alert'].created_at,
+                is_read=data['is_read'],
+                is_snoozed=data['is_snoozed']
+            )
+            for data in alerts_data
+        ]
+        
+        if limit and len(result) == limit:
+            headers["X-Next-After"] = str(result[-1].id)
+        return result
     
-    return result
+    # Membership changes and snooze expiry can change any inbox
+    resources = ('alerts', 'users', 'teams', 'snoozes', f'inbox:{user_id}')
+    # A snooze lapsing changes the inbox before any write does, so the next lapse is part of the ETag
+    next_lapse = await db.scalar(select(func.min(UserAlertPreference.snoozed_until)).where(
+        UserAlertPreference.user_id == user_id,
+        UserAlertPreference.is_snoozed == True,
+        UserAlertPreference.snoozed_until > datetime.utcnow()
+    ))
+    return await cached_json(request, db, resources, build, vary=str(next_lapse))
 
 @app.post("/users/{user_id}/alerts/{alert_id}/snooze")
-async def snooze_alert(user_id: int, alert_id: int, db: Session = Depends(get_db)):
-    alert_service = AlertService(db)
-    alert_service.snooze_alert(user_id, alert_id)
+async def snooze_alert(user_id: int, alert_id: int, db: AsyncSession = Depends(get_async_db)):
+    await db.run_sync(lambda session: AlertService(session).snooze_alert(user_id, alert_id))
+    reminder_scheduler.replan()
     return {"message": "Alert snoozed for 24 hours"}
 
 @app.post("/users/{user_id}/alerts/{alert_id}/read")
-async def mark_alert_read(user_id: int, alert_id: int, db: Session = Depends(get_db)):
-    alert_service = AlertService(db)
-    alert_service.mark_as_read(user_id, alert_id)
+async def mark_alert_read(user_id: int, alert_id: int, db: AsyncSession = Depends(get_async_db)):
+    await db.run_sync(lambda session: AlertService(session).mark_as_read(user_id, alert_id))
     return {"message": "Alert marked as read"}
 
 @app.post("/users/{user_id}/alerts/{alert_id}/unread")
-async def mark_alert_unread(user_id: int, alert_id: int, db: Session = Depends(get_db)):
-    preference = db.query(UserAlertPreference).filter(
-        UserAlertPreference.user_id == user_id,
-        UserAlertPreference.alert_id == alert_id
-    ).first()
-    
-    if preference:
-        preference.is_read = False
-        db.commit()
+async def mark_alert_unread(user_id: int, alert_id: int, db: AsyncSession = Depends(get_async_db)):
+    await db.run_sync(lambda session: AlertService(session).mark_as_unread(user_id, alert_id))
+    reminder_scheduler.replan()
     return {"message": "Alert marked as unread"}
 
+# Seconds between keep-alive comments on idle streams
+STREAM_HEARTBEAT_SECONDS = 15
+
+@app.get("/users/{user_id}/stream")
+async def stream_user_alerts(user_id: int, request: Request):
+    """Server-Sent Events feed of new alerts and read/snooze changes for one user"""
+    subscription = event_broker.subscribe(user_id)
+    
+    async def events():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            event_broker.unsubscribe(subscription)
+    
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @app.get("/users/{user_id}/alerts/snoozed")
-async def get_snoozed_alerts(user_id: int, db: Session = Depends(get_db)):
-    preferences = db.query(UserAlertPreference).join(Alert).filter(
-        UserAlertPreference.user_id == user_id,
-        UserAlertPreference.is_snoozed == True
-    ).all()
+async def get_snoozed_alerts(user_id: int, db: AsyncSession = Depends(get_async_db)):
+    preferences = await db.scalars(
+        select(UserAlertPreference).join(Alert).options(contains_eager(UserAlertPreference.alert)).where(
+            UserAlertPreference.user_id == user_id,
+            UserAlertPreference.is_snoozed == True,
+            or_(UserAlertPreference.snoozed_until.is_(None), UserAlertPreference.snoozed_until > datetime.utcnow())
+        )
+    )
     
     result = []
     for pref in preferences:
@@ -407,17 +511,90 @@ async def get_snoozed_alerts(user_id: int, db: Session = Depends(get_db)):
 
 # Analytics endpoint
 @app.get("/analytics")
-async def get_analytics(db: Session = Depends(get_db)):
-    analytics_service = AnalyticsService(db)
-    return analytics_service.get_dashboard_metrics()
+async def get_analytics(
+    request: Request,
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    sort_by: str = "snoozed",  # snoozed, read_rate, delivered, recent
+    db: AsyncSession = Depends(get_async_db)
+):
+    async def build(headers: dict):
+        try:
+            return await db.run_sync(lambda session: AnalyticsService(session).get_dashboard_metrics(
+                limit=limit, offset=offset, sort_by=sort_by
+            ))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return await cached_json(request, db, ('alerts', *STATS_RESOURCES), build)
+
+@app.get("/analytics/deliveries")
+async def get_delivery_history(request: Request, days: int = Query(30, ge=1, le=366),
+                               db: AsyncSession = Depends(get_async_db)):
+    async def build(headers: dict):
+        return await db.run_sync(lambda session: AnalyticsService(session).get_delivery_history(days))
+    # The window ends today, so it moves at midnight without any write
+    return await cached_json(request, db, STATS_RESOURCES, build, vary=datetime.utcnow().date().isoformat())
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/admin/slow-queries")
+async def get_slow_queries(limit: int = Query(20, ge=1, le=500)):
+    return slow_queries.stats(limit)
+
+@app.get("/admin/audience-cache")
+async def get_audience_cache_stats():
+    return audience_cache.stats()
+
+@app.get("/admin/scheduler")
+async def get_scheduler_stats():
+    return reminder_scheduler.stats()
+
+@app.get("/admin/delivery-limits")
+async def get_delivery_limit_stats():
+    return delivery_workers.rate_limiter.stats()
+
+@app.get("/admin/response-cache")
+async def get_response_cache_stats():
+    return response_cache.stats()
+
+@app.get("/admin/streams")
+async def get_stream_stats():
+    return event_broker.stats()
+
+@app.get("/admin/db-pool")
+async def get_db_pool_stats():
+    return pool_stats()
+
+@app.post("/admin/stats/rebuild")
+async def rebuild_stats(db: AsyncSession = Depends(get_async_db)):
+    rebuilt = await db.run_sync(lambda session: AlertStatsService(session).rebuild())
+    return {"message": f"Rebuilt counters for {rebuilt} alerts"}
+
+@app.post("/admin/stats/reconcile")
+async def reconcile_stats(db: AsyncSession = Depends(get_async_db)):
+    drifted = await db.run_sync(lambda session: AlertStatsService(session).reconcile())
+    return {"repaired": len(drifted), "alerts": drifted}
+
+@app.post("/admin/retention/compact")
+async def compact_deliveries(days: int = Query(RETENTION_DAYS, ge=1)):
+    # Archive files are written with blocking I/O, so keep it off the event loop
+    return await asyncio.to_thread(run_compaction, days)
 
 # Reminder trigger (for demo purposes)
 @app.post("/admin/trigger-reminders")
-async def trigger_reminders(db: Session = Depends(get_db)):
-    alert_service = AlertService(db)
-    reminder_service = ReminderService(db, alert_service)
-    reminder_service.process_reminders()
-    return {"message": "Reminders processed"}
+async def trigger_reminders(db: AsyncSession = Depends(get_async_db)):
+    def process(session: Session):
+        alert_service = AlertService(session, queue_deliveries=True)
+        reminder_service = ReminderService(session, alert_service, page_size=reminder_scheduler.batch_size)
+        reminder_service.process_reminders()
+        return reminder_service.last_run
+    
+    run = await db.run_sync(process)
+    delivery_workers.notify()
+    reminder_scheduler.replan()
+    return {"message": "Reminders processed", **run}
 
 if __name__ == "__main__":
     import uvicorn
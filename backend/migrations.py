@@ -0,0 +1,116 @@
+"""
+Versioned schema migrations for databases created before a model change.
+
+`Base.metadata.create_all` only creates missing tables, so columns and
+indexes added to existing tables are applied here. Every step is written
+to be a no-op on a freshly created schema.
+"""
+
+from datetime import datetime
+from sqlalchemy import Column, Table, inspect, text
+from sqlalchemy.engine import Connection, Engine
+from models import Alert, User, NotificationDelivery, UserAlertPreference
+from stats import rebuild_alert_stats
+
+def _add_column(conn: Connection, column: Column):
+    table = column.table.name
+    existing = {c['name'] for c in inspect(conn).get_columns(table)}
+    if column.name not in existing:
+        column_type = column.type.compile(dialect=conn.dialect)
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column.name} {column_type}"))
+
+def _create_index(conn: Connection, table: Table, name: str):
+    # Looked up by name so later additions to the model don't leak into earlier steps
+    index = next(index for index in table.indexes if index.name == name)
+    index.create(conn, checkfirst=True)
+
+def _delivery_queue(conn: Connection):
+    columns = NotificationDelivery.__table__.c
+    for column in (columns.status, columns.attempts, columns.next_attempt_at,
+                   columns.last_error, columns.claim_token):
+        _add_column(conn, column)
+    # Everything logged before the queue existed was sent inline
+    conn.execute(text("UPDATE notification_deliveries SET status = 'SENT' WHERE status IS NULL"))
+    conn.execute(text("UPDATE notification_deliveries SET attempts = 1 WHERE attempts IS NULL"))
+    _create_index(conn, NotificationDelivery.__table__, "ix_deliveries_queue")
+
+def _reminder_due_times(conn: Connection):
+    table = UserAlertPreference.__table__
+    _add_column(conn, table.c.next_reminder_at)
+    # Let the next reminder tick work out each row's real due time
+    conn.execute(table.update().where(table.c.next_reminder_at.is_(None)).values(next_reminder_at=datetime.utcnow()))
+    _create_index(conn, table, "ix_preferences_due")
+
+def _hot_query_indexes(conn: Connection):
+    # Collapse duplicate preferences onto the oldest row before enforcing uniqueness
+    conn.execute(text(
+        "UPDATE user_alert_preferences SET is_read = :read WHERE id IN ("
+        "SELECT MIN(id) FROM user_alert_preferences GROUP BY user_id, alert_id "
+        "HAVING COUNT(*) > 1 AND MAX(CASE WHEN is_read THEN 1 ELSE 0 END) = 1)"
+    ), {"read": True})
+    # A snooze on any duplicate survives, until the latest of their snoozed_until times
+    conn.execute(text(
+        "UPDATE user_alert_preferences SET is_snoozed = :snoozed, snoozed_until = ("
+        "SELECT MAX(d.snoozed_until) FROM user_alert_preferences d "
+        "WHERE d.user_id = user_alert_preferences.user_id AND d.alert_id = user_alert_preferences.alert_id "
+        "AND d.is_snoozed = :snoozed) WHERE id IN ("
+        "SELECT MIN(id) FROM user_alert_preferences GROUP BY user_id, alert_id "
+        "HAVING COUNT(*) > 1 AND MAX(CASE WHEN is_snoozed THEN 1 ELSE 0 END) = 1)"
+    ), {"snoozed": True})
+    conn.execute(text(
+        "DELETE FROM user_alert_preferences WHERE id NOT IN ("
+        "SELECT MIN(id) FROM user_alert_preferences GROUP BY user_id, alert_id)"
+    ))
+    _create_index(conn, User.__table__, "ix_users_team_id")
+    _create_index(conn, Alert.__table__, "ix_alerts_audience")
+    for name in ("ux_preferences_user_alert", "ix_preferences_alert_read", "ix_preferences_alert_snoozed"):
+        _create_index(conn, UserAlertPreference.__table__, name)
+
+def _alert_stats(conn: Connection):
+    # The table itself comes from create_all; fill it from existing history
+    rebuild_alert_stats(conn)
+
+def _snooze_expiry_index(conn: Connection):
+    _create_index(conn, UserAlertPreference.__table__, "ix_preferences_snooze_expiry")
+
+def _reminder_leases(conn: Connection):
+    columns = UserAlertPreference.__table__.c
+    for column in (columns.claimed_by, columns.claimed_until):
+        _add_column(conn, column)
+
+def _delivery_retention(conn: Connection):
+    # delivery_rollups itself comes from create_all
+    _create_index(conn, NotificationDelivery.__table__, "ix_deliveries_sent_at")
+
+# (version, description, step) - append only, never renumber
+MIGRATIONS = [
+    (1, "notification delivery queue", _delivery_queue),
+    (2, "reminder due times", _reminder_due_times),
+    (3, "indexes for hot query shapes", _hot_query_indexes),
+    (4, "alert stats counters", _alert_stats),
+    (5, "snooze expiry index", _snooze_expiry_index),
+    (6, "reminder leases", _reminder_leases),
+    (7, "delivery retention", _delivery_retention),
+]
+
+def current_version(conn: Connection) -> int:
+    return conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar() or 0
+
+def run_migrations(engine: Engine) -> int:
+    """Apply pending migrations and return the resulting schema version"""
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_version ("
+            "version INTEGER PRIMARY KEY, description VARCHAR(200))"
+        ))
+        version = current_version(conn)
+        for step_version, description, step in MIGRATIONS:
+            if step_version <= version:
+                continue
+            step(conn)
+            conn.execute(
+                text("INSERT INTO schema_version (version, description) VALUES (:version, :description)"),
+                {"version": step_version, "description": description}
+            )
+            version = step_version
+    return version
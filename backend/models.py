@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Enum, Text
+from sqlalchemy import Column, Integer, String, Date, DateTime, Boolean, ForeignKey, Enum, Text, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -17,6 +17,11 @@ class DeliveryType(enum.Enum):
     SMS = "SMS"
     SLACK = "Slack"
 
+class DeliveryStatus(enum.Enum):
+    QUEUED = "Queued"
+    SENT = "Sent"
+    FAILED = "Failed"
+
 class VisibilityType(enum.Enum):
     ORGANIZATION = "Organization"
     TEAM = "Team"
@@ -33,6 +38,10 @@ class User(Base):
     
     team = relationship("Team", back_populates="members")
     alert_preferences = relationship("UserAlertPreference", back_populates="user")
+    
+    __table_args__ = (
+        Index("ix_users_team_id", "team_id"),
+    )
 
 class Team(Base):
     __tablename__ = "teams"
@@ -63,6 +72,10 @@ class Alert(Base):
     creator = relationship("User")
     deliveries = relationship("NotificationDelivery", back_populates="alert")
     preferences = relationship("UserAlertPreference", back_populates="alert")
+    
+    __table_args__ = (
+        Index("ix_alerts_audience", "visibility_type", "target_id", "is_active"),
+    )
 
 class NotificationDelivery(Base):
     __tablename__ = "notification_deliveries"
@@ -70,11 +83,23 @@ class NotificationDelivery(Base):
     id = Column(Integer, primary_key=True)
     alert_id = Column(Integer, ForeignKey("alerts.id"))
     user_id = Column(Integer, ForeignKey("users.id"))
-    delivered_at = Column(DateTime, default=datetime.utcnow)
+    delivered_at = Column(DateTime, default=datetime.utcnow)  # null while queued
     delivery_type = Column(Enum(DeliveryType))
     
+    # Outbound queue state, drained by delivery.DeliveryWorkerPool
+    status = Column(Enum(DeliveryStatus), default=DeliveryStatus.SENT)
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime)
+    last_error = Column(Text)
+    claim_token = Column(String(32))
+    
     alert = relationship("Alert", back_populates="deliveries")
     user = relationship("User")
+    
+    __table_args__ = (
+        Index("ix_deliveries_queue", "status", "delivery_type", "next_attempt_at"),
+        Index("ix_deliveries_sent_at", "status", "delivered_at"),
+    )
 
 class UserAlertPreference(Base):
     __tablename__ = "user_alert_preferences"
@@ -86,6 +111,48 @@ class UserAlertPreference(Base):
     is_snoozed = Column(Boolean, default=False)
     snoozed_until = Column(DateTime)
     last_reminded = Column(DateTime)
+    next_reminder_at = Column(DateTime)  # null when no further reminder is due
+    
+    # Lease taken by the reminder worker currently processing this row
+    claimed_by = Column(String(64))
+    claimed_until = Column(DateTime)
     
     user = relationship("User", back_populates="alert_preferences")
-    alert = relationship("Alert", back_populates="preferences")
\ No newline at end of file
+    alert = relationship("Alert", back_populates="preferences")
+    
+    __table_args__ = (
+        # One preference per user and alert; also serves the per-user lookups
+        Index("ux_preferences_user_alert", "user_id", "alert_id", unique=True),
+        Index("ix_preferences_alert_read", "alert_id", "is_read"),
+        Index("ix_preferences_alert_snoozed", "alert_id", "is_snoozed"),
+        Index("ix_preferences_due", "is_read", "is_snoozed", "next_reminder_at"),
+        Index("ix_preferences_snooze_expiry", "is_snoozed", "snoozed_until"),
+    )
+
+class AlertStats(Base):
+    """Per-alert counters kept up to date by the services, rebuilt with `python stats.py rebuild`"""
+    __tablename__ = "alert_stats"
+    
+    alert_id = Column(Integer, ForeignKey("alerts.id"), primary_key=True)
+    targeted_count = Column(Integer, default=0, nullable=False)
+    delivered_count = Column(Integer, default=0, nullable=False)  # sent notifications, reminders included
+    read_count = Column(Integer, default=0, nullable=False)
+    snoozed_count = Column(Integer, default=0, nullable=False)
+    
+    alert = relationship("Alert")
+
+class ResourceVersion(Base):
+    """Version per cached resource ('alerts', 'inbox:7', ...), bumped in the transaction that changed it"""
+    __tablename__ = "resource_versions"
+    
+    resource = Column(String(100), primary_key=True)
+    version = Column(Integer, default=0, nullable=False)
+
+class DeliveryRollup(Base):
+    """Daily sent counts for deliveries compacted out of notification_deliveries by retention.py"""
+    __tablename__ = "delivery_rollups"
+    
+    day = Column(Date, primary_key=True)
+    alert_id = Column(Integer, ForeignKey("alerts.id"), primary_key=True)
+    delivery_type = Column(Enum(DeliveryType), primary_key=True)
+    sent_count = Column(Integer, default=0, nullable=False)
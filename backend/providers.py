@@ -0,0 +1,39 @@
+import random
+import threading
+import time
+from typing import List, Optional, Tuple
+
+class FakeProvider:
+    """
+    Local stand-in for a batch messaging API (SES, Twilio, Slack, ...).
+
+    Accepts up to `max_batch_size` (address, message) pairs per call, sleeps
+    `latency` seconds per call to model the network round trip and counts
+    calls so channel throughput can be benchmarked without a real account.
+    """
+
+    def __init__(self, name: str, max_batch_size: int = 100, latency: float = 0.0,
+                 failure_rate: float = 0.0, seed: Optional[int] = None):
+        self.name = name
+        self.max_batch_size = max_batch_size
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self.messages = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def send_batch(self, messages: List[Tuple[str, str]]) -> List[bool]:
+        if len(messages) > self.max_batch_size:
+            raise ValueError(f"{self.name} accepts at most {self.max_batch_size} messages per call")
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.calls += 1
+            self.messages += len(messages)
+            return [self._random.random() >= self.failure_rate for _ in messages]
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self.messages = 0
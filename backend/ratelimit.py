@@ -0,0 +1,138 @@
+"""
+Token buckets for outbound deliveries.
+
+Each channel has a bucket of messages per second (the provider's quota), and
+each recipient has a bucket per external channel so a user with many due
+alerts gets a few digests rather than a message per alert. Buckets live in
+process memory, so with several API processes each enforces its own share.
+
+    DELIVERY_RATE_LIMITS="Email=100,SMS=10"   # messages per second per channel
+    USER_DELIVERY_BURST=3                     # sends a user can receive back to back
+    USER_DELIVERY_INTERVAL=300                # seconds to earn another send
+"""
+
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+from models import DeliveryType
+
+DEFAULT_CHANNEL_RATES = {
+    DeliveryType.EMAIL: 100.0,
+    DeliveryType.SMS: 10.0,
+    DeliveryType.SLACK: 50.0,
+}
+
+def parse_rates(value: Optional[str]) -> Dict[DeliveryType, float]:
+    rates = dict(DEFAULT_CHANNEL_RATES)
+    for item in filter(None, (part.strip() for part in (value or "").split(","))):
+        name, _, rate = item.partition("=")
+        rates[DeliveryType(name.strip())] = float(rate)
+    return rates
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, tokens: float = 1.0) -> float:
+        """Seconds until `tokens` are available, 0 if they are now"""
+        self._refill()
+        if self.tokens >= tokens:
+            return 0.0
+        return (tokens - self.tokens) / self.rate
+
+    def take(self, tokens: float = 1.0):
+        self._refill()
+        self.tokens -= tokens
+
+    @property
+    def full(self) -> bool:
+        self._refill()
+        return self.tokens >= self.capacity
+
+class DeliveryRateLimiter:
+    """Per-channel and per-(user, channel) token buckets; In-App sends are never limited"""
+
+    def __init__(self, channel_rates: Optional[Dict[DeliveryType, float]] = None, user_burst: float = 3,
+                 user_interval: float = 300, clock: Callable[[], float] = time.monotonic,
+                 max_user_buckets: int = 100_000):
+        self.clock = clock
+        self.channels = {
+            delivery_type: TokenBucket(rate, capacity=rate, clock=clock)
+            for delivery_type, rate in (channel_rates if channel_rates is not None else DEFAULT_CHANNEL_RATES).items()
+        }
+        self.user_burst = user_burst
+        self.user_interval = user_interval
+        self.max_user_buckets = max_user_buckets
+        self.users: Dict[Tuple[int, DeliveryType], TokenBucket] = {}
+        self.allowed = 0
+        self.limited = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "DeliveryRateLimiter":
+        return cls(
+            channel_rates=parse_rates(os.getenv("DELIVERY_RATE_LIMITS")),
+            user_burst=float(os.getenv("USER_DELIVERY_BURST", 3)),
+            user_interval=float(os.getenv("USER_DELIVERY_INTERVAL", 300))
+        )
+
+    def channel_wait(self, delivery_type: DeliveryType) -> float:
+        bucket = self.channels.get(delivery_type)
+        if not bucket:
+            return 0.0
+        with self._lock:
+            return bucket.wait_time()
+
+    def acquire(self, delivery_type: DeliveryType, user_id: int) -> float:
+        """Take one send for `user_id` on a channel; returns 0, or the seconds to wait before retrying"""
+        if delivery_type == DeliveryType.IN_APP:
+            return 0.0
+        with self._lock:
+            buckets = [self._user_bucket(user_id, delivery_type)]
+            if delivery_type in self.channels:
+                buckets.append(self.channels[delivery_type])
+            wait = max(bucket.wait_time() for bucket in buckets)
+            if wait:
+                self.limited += 1
+                return wait
+            for bucket in buckets:
+                bucket.take()
+            self.allowed += 1
+            return 0.0
+
+    def _user_bucket(self, user_id: int, delivery_type: DeliveryType) -> TokenBucket:
+        key = (user_id, delivery_type)
+        bucket = self.users.get(key)
+        if bucket is None:
+            if len(self.users) >= self.max_user_buckets:
+                # A full bucket behaves like a new one, so those are safe to forget
+                self.users = {k: b for k, b in self.users.items() if not b.full}
+            bucket = self.users[key] = TokenBucket(1 / self.user_interval, self.user_burst, clock=self.clock)
+        return bucket
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'allowed': self.allowed,
+                'limited': self.limited,
+                'user_buckets': len(self.users),
+                'user_burst': self.user_burst,
+                'user_interval_seconds': self.user_interval,
+                'channels': {
+                    delivery_type.value: {'rate': bucket.rate, 'tokens': round(bucket.tokens, 2)}
+                    for delivery_type, bucket in self.channels.items()
+                }
+            }
+
+# Global limiter shared by the delivery workers and inline reminder sends
+delivery_rate_limiter = DeliveryRateLimiter.from_env()
@@ -0,0 +1,124 @@
+"""
+Retention for notification_deliveries.
+
+Sent deliveries older than the retention period are moved out of the table
+a batch at a time: each batch is appended to a gzipped JSON-lines file per
+day, counted into delivery_rollups and deleted in one transaction. Counters
+and delivery history keep including them through the rollups. Failed and
+queued rows are never compacted.
+
+    python retention.py compact [--days 30] [--archive-dir archive] [--vacuum]
+"""
+
+import argparse
+import gzip
+import json
+import os
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Dict, Tuple
+from sqlalchemy import delete, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from models import DeliveryRollup, NotificationDelivery, DeliveryStatus, DeliveryType
+from stats import touch_stats
+
+RETENTION_DAYS = int(os.getenv("DELIVERY_RETENTION_DAYS", 30))
+ARCHIVE_DIR = os.getenv("DELIVERY_ARCHIVE_DIR", "archive")
+
+def archive_path(archive_dir: str, day: date) -> str:
+    return os.path.join(archive_dir, f"deliveries-{day.isoformat()}.jsonl.gz")
+
+def compact_deliveries(db: Session, before: datetime, archive_dir: str = ARCHIVE_DIR,
+                       batch_size: int = 5000) -> dict:
+    """Archive, roll up and delete sent deliveries delivered before `before`"""
+    os.makedirs(archive_dir, exist_ok=True)
+    summary = {'archived': 0, 'batches': 0, 'files': []}
+    while True:
+        rows = db.execute(
+            select(NotificationDelivery.id, NotificationDelivery.alert_id, NotificationDelivery.user_id,
+                   NotificationDelivery.delivery_type, NotificationDelivery.delivered_at,
+                   NotificationDelivery.attempts)
+            .where(NotificationDelivery.status == DeliveryStatus.SENT, NotificationDelivery.delivered_at < before)
+            .order_by(NotificationDelivery.delivered_at, NotificationDelivery.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        # Written before the delete commits: a crash in between re-archives the batch rather than losing it
+        by_day: Dict[date, list] = {}
+        for row in rows:
+            by_day.setdefault(row.delivered_at.date(), []).append(row)
+        for day, day_rows in by_day.items():
+            path = archive_path(archive_dir, day)
+            with gzip.open(path, 'at', encoding='utf-8') as archive:
+                for row in day_rows:
+                    archive.write(json.dumps({
+                        'id': row.id,
+                        'alert_id': row.alert_id,
+                        'user_id': row.user_id,
+                        'delivery_type': row.delivery_type.value if row.delivery_type else None,
+                        'delivered_at': row.delivered_at.isoformat(),
+                        'attempts': row.attempts
+                    }) + "\n")
+            if path not in summary['files']:
+                summary['files'].append(path)
+
+        _add_rollups(db, Counter((row.delivered_at.date(), row.alert_id, row.delivery_type) for row in rows))
+        db.execute(delete(NotificationDelivery).where(NotificationDelivery.id.in_([row.id for row in rows])))
+        touch_stats(db, {row.alert_id for row in rows})
+        db.commit()
+        summary['archived'] += len(rows)
+        summary['batches'] += 1
+    return summary
+
+def _add_rollups(db: Session, counts: Dict[Tuple[date, int, DeliveryType], int]):
+    existing = {
+        (rollup.day, rollup.alert_id, rollup.delivery_type): rollup
+        for rollup in db.query(DeliveryRollup).filter(
+            DeliveryRollup.day.in_({day for day, _, _ in counts}),
+            DeliveryRollup.alert_id.in_({alert_id for _, alert_id, _ in counts})
+        )
+    }
+    for (day, alert_id, delivery_type), count in counts.items():
+        rollup = existing.get((day, alert_id, delivery_type))
+        if rollup:
+            rollup.sent_count += count
+        else:
+            db.add(DeliveryRollup(day=day, alert_id=alert_id, delivery_type=delivery_type, sent_count=count))
+
+def vacuum(engine: Engine):
+    """Give the space freed by compaction back to the filesystem (SQLite only)"""
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM"))
+
+def run_compaction(days: int = RETENTION_DAYS, archive_dir: str = ARCHIVE_DIR) -> dict:
+    from database import SessionLocal
+
+    # Whole days only, so a day's archive file is complete once written
+    cutoff = datetime.combine(datetime.utcnow().date() - timedelta(days=days), datetime.min.time())
+    db = SessionLocal()
+    try:
+        return {'before': cutoff, **compact_deliveries(db, cutoff, archive_dir)}
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    from database import create_tables, engine
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['compact'])
+    parser.add_argument('--days', type=int, default=RETENTION_DAYS, help='keep sent deliveries this many days')
+    parser.add_argument('--archive-dir', default=ARCHIVE_DIR)
+    parser.add_argument('--vacuum', action='store_true', help='reclaim file space afterwards (SQLite)')
+    args = parser.parse_args()
+
+    create_tables()
+    summary = run_compaction(args.days, args.archive_dir)
+    print(f"Archived {summary['archived']} deliveries before {summary['before']:%Y-%m-%d} "
+          f"in {summary['batches']} batches to {len(summary['files'])} files")
+    if args.vacuum:
+        vacuum(engine)
@@ -1,48 +1,244 @@
+import heapq
+import logging
+import os
+import itertools
 import threading
-import time
-from datetime import datetime
+from collections import deque
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+from sqlalchemy import func, or_, select
 from database import SessionLocal
-from services import AlertService, ReminderService, NotificationObserver
+from metrics import registry
+from models import UserAlertPreference
+from services import AlertService, ReminderService, default_worker_id
+
+logger = logging.getLogger("alerting.scheduler")
+
+scheduler_lag = registry.histogram(
+    "reminder_scheduler_lag_seconds", "Delay between a due time and the start of its pass",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300))
+scheduler_errors_total = registry.counter("reminder_scheduler_errors_total", "Reminder passes that failed")
+scheduler_running = registry.gauge("reminder_scheduler_running", "1 while the scheduler thread runs")
+scheduler_queued = registry.gauge("reminder_scheduler_queued_due_times", "Due times waiting in the heap")
+scheduler_next_due = registry.gauge(
+    "reminder_scheduler_next_due_seconds", "Seconds until the next due time (negative when overdue)")
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
 
 class ReminderScheduler:
-    def __init__(self, interval_minutes=120):  # Default 2 hours
-        self.interval_minutes = interval_minutes
+    """
+    Runs reminder passes when the earliest reminder or snooze expiry is due.
+
+    Due times are kept in a min-heap seeded from the database. Writes that
+    move due times call `schedule` or `replan`, which wake the thread through
+    an Event, so `stop` returns without waiting out a sleep. The heap is also
+    re-seeded at least every `max_sleep_seconds` to pick up changes made by
+    other processes. Passes in several processes split the due rows through
+    the leases taken by ReminderService.
+    """
+
+    def __init__(self, max_sleep_seconds: float = 300, retry_seconds: float = 60,
+                 min_pass_interval: float = 1.0, session_factory=SessionLocal, lag_samples: int = 1000,
+                 worker_id: Optional[str] = None, batch_size: Optional[int] = None):
+        self.max_sleep_seconds = max_sleep_seconds
+        self.retry_seconds = retry_seconds
+        self.min_pass_interval = min_pass_interval
+        self.session_factory = session_factory
+        self.worker_id = worker_id or default_worker_id()
+        # Rows leased and committed per transaction within a pass
+        self.batch_size = batch_size or int(os.getenv("REMINDER_BATCH_SIZE", 500))
+        self.last_run: Optional[dict] = None
         self.running = False
         self.thread = None
-    
+        self.passes = 0
+        self._heap: List[Tuple[datetime, int, str]] = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._replan_requested = True
+        self._last_replan: Optional[datetime] = None
+        self._last_pass: Optional[datetime] = None
+        self._lags: deque = deque(maxlen=lag_samples)
+
     def start(self):
         if not self.running:
             self.running = True
+            self._replan_requested = True
+            self._wakeup.clear()
             self.thread = threading.Thread(target=self._run_scheduler, daemon=True)
             self.thread.start()
-            print(f"Reminder scheduler started - running every {self.interval_minutes} minutes")
-    
+            logger.info("Reminder scheduler started", extra={'worker_id': self.worker_id, 'batch_size': self.batch_size})
+
     def stop(self):
         self.running = False
+        self._wakeup.set()
         if self.thread:
             self.thread.join()
-    
+            self.thread = None
+
+    def schedule(self, due_at: datetime, reason: str = "reminder"):
+        """Make sure a pass runs at `due_at`"""
+        with self._lock:
+            wake = not self._heap or due_at < self._heap[0][0]
+            heapq.heappush(self._heap, (due_at, next(self._seq), reason))
+        if wake:
+            self._wakeup.set()
+
+    def replan(self):
+        """Re-seed due times from the database, e.g. after alerts or preferences changed"""
+        self._replan_requested = True
+        self._wakeup.set()
+
     def _run_scheduler(self):
         while self.running:
-            try:
-                self._process_reminders()
-                time.sleep(self.interval_minutes * 60)  # Convert to seconds
-            except Exception as e:
-                print(f"Error in reminder scheduler: {e}")
-                time.sleep(60)  # Wait 1 minute before retrying
-    
-    def _process_reminders(self):
-        print(f"[{datetime.now()}] Processing reminders...")
-        db = SessionLocal()
+            self._wakeup.clear()
+            now = datetime.utcnow()
+            if self._replan_requested or self._replan_overdue(now):
+                self._seed()
+
+            # Keeps a row that stays due from turning into a busy loop
+            if self._last_pass and self._next_due_by(now):
+                remaining = self.min_pass_interval - (now - self._last_pass).total_seconds()
+                if remaining > 0:
+                    self._wakeup.wait(remaining)
+                    continue
+
+            due_at = self._pop_due(now)
+            if due_at is not None:
+                self._last_pass = now
+                lag = (now - due_at).total_seconds()
+                self._lags.append(lag)
+                scheduler_lag.observe(lag)
+                if self._process_reminders():
+                    # The pass moved due times forward
+                    self._replan_requested = True
+                else:
+                    self.schedule(now + timedelta(seconds=self.retry_seconds), "retry")
+                continue
+
+            self._wakeup.wait(self._seconds_until_next(now))
+
+    def _replan_overdue(self, now: datetime) -> bool:
+        return self._last_replan is None or (now - self._last_replan).total_seconds() >= self.max_sleep_seconds
+
+    def _seed(self):
+        self._replan_requested = False
+        now = self._last_replan = datetime.utcnow()
+        db = self.session_factory()
+        try:
+            # Both queries are served by indexes on the preference flags. Rows leased by another
+            # worker are skipped, or the thread would wake for them until the lease ends; a lease
+            # left by a crashed worker is picked up by the periodic reseed once it expires
+            next_reminder = db.scalar(select(UserAlertPreference.next_reminder_at).where(
+                UserAlertPreference.is_read == False,
+                UserAlertPreference.is_snoozed == False,
+                UserAlertPreference.next_reminder_at.isnot(None),
+                or_(UserAlertPreference.claimed_until.is_(None), UserAlertPreference.claimed_until <= now)
+            ).order_by(UserAlertPreference.next_reminder_at).limit(1))
+            next_expiry = db.scalar(select(func.min(UserAlertPreference.snoozed_until)).where(
+                UserAlertPreference.is_snoozed == True
+            ))
+        except Exception as e:
+            logger.exception("Error planning reminders: %s", e)
+            self.schedule(datetime.utcnow() + timedelta(seconds=self.retry_seconds), "retry")
+            return
+        finally:
+            db.close()
+
+        with self._lock:
+            # Expiry is strict (snoozed_until < now), so leave a moment past it
+            seeds = [(next_reminder, "reminder"),
+                     (next_expiry and next_expiry + timedelta(milliseconds=1), "snooze-expiry")]
+            # A pending retry survives the reseed and nothing is planned before it, so a
+            # failing pass keeps backing off however often replan() is called
+            retries = [entry for entry in self._heap if entry[2] == "retry"]
+            not_before = min((due_at for due_at, _, _ in retries), default=None)
+            self._heap = retries + [
+                (max(due_at, not_before) if not_before else due_at, next(self._seq), reason)
+                for due_at, reason in seeds if due_at
+            ]
+            heapq.heapify(self._heap)
+
+    def _next_due_by(self, now: datetime) -> bool:
+        with self._lock:
+            return bool(self._heap) and self._heap[0][0] <= now
+
+    def _pop_due(self, now: datetime) -> Optional[datetime]:
+        """Drop every entry due by `now` and return the earliest, or None"""
+        earliest = None
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                due_at, _, _ = heapq.heappop(self._heap)
+                earliest = earliest or due_at
+        return earliest
+
+    def _seconds_until_next(self, now: datetime) -> float:
+        with self._lock:
+            if not self._heap:
+                return self.max_sleep_seconds
+            return max(0.0, min((self._heap[0][0] - now).total_seconds(), self.max_sleep_seconds))
+
+    def _process_reminders(self) -> bool:
+        logger.debug("Processing reminders")
+        db = self.session_factory()
         try:
-            alert_service = AlertService(db)
-            reminder_service = ReminderService(db, alert_service)
-            reminder_service.process_reminders()
-            print("Reminders processed successfully")
+            alert_service = AlertService(db, queue_deliveries=True)
+            reminder_service = ReminderService(db, alert_service, page_size=self.batch_size,
+                                               worker_id=self.worker_id)
+            try:
+                reminder_service.process_reminders()
+            finally:
+                self.last_run = reminder_service.last_run
+            self.passes += 1
+            run = self.last_run
+            # Passes that found nothing due are routine; keep them out of INFO
+            logger.log(logging.INFO if run['reminded'] or run['expired_snoozes'] else logging.DEBUG,
+                       "Reminders processed: %d sent in %d batches", run['reminded'], len(run['batches']),
+                       extra={'reminded': run['reminded'], 'batches': len(run['batches']),
+                              'expired_snoozes': run['expired_snoozes'], 'duration_ms': round(run['seconds'] * 1000, 1)})
+            return True
         except Exception as e:
-            print(f"Error processing reminders: {e}")
+            logger.exception("Error processing reminders: %s", e)
+            scheduler_errors_total.inc()
+            return False
         finally:
             db.close()
 
+    def stats(self) -> dict:
+        lags = list(self._lags)
+        with self._lock:
+            next_due = self._heap[0] if self._heap else None
+            queued = len(self._heap)
+        return {
+            'running': self.running,
+            'worker_id': self.worker_id,
+            'passes': self.passes,
+            'batch_size': self.batch_size,
+            'queued_due_times': queued,
+            'next_due_at': next_due[0] if next_due else None,
+            'next_due_reason': next_due[2] if next_due else None,
+            'lag_seconds': {
+                'samples': len(lags),
+                'p50': round(_percentile(lags, 0.50), 3) if lags else None,
+                'p95': round(_percentile(lags, 0.95), 3) if lags else None,
+                'p99': round(_percentile(lags, 0.99), 3) if lags else None,
+                'max': round(max(lags), 3) if lags else None
+            },
+            'last_run': self.last_run
+        }
+
 # Global scheduler instance
-reminder_scheduler = ReminderScheduler()
\ No newline at end of file
+reminder_scheduler = ReminderScheduler()
+
+@registry.collector
+def _collect_scheduler():
+    with reminder_scheduler._lock:
+        next_due = reminder_scheduler._heap[0][0] if reminder_scheduler._heap else None
+        queued = len(reminder_scheduler._heap)
+    scheduler_running.set(int(reminder_scheduler.running))
+    scheduler_queued.set(queued)
+    # With nothing queued the thread still wakes to re-seed within max_sleep_seconds
+    seconds = (next_due - datetime.utcnow()).total_seconds() if next_due else reminder_scheduler.max_sleep_seconds
+    scheduler_next_due.set(round(seconds, 3))
@@ -1,100 +1,529 @@
+import logging
+import os
+import socket
+import time
+import uuid
+from collections import Counter
+from bisect import bisect_left
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
-from models import Alert, User, Team, NotificationDelivery, UserAlertPreference, VisibilityType, SeverityLevel
+from sqlalchemy import and_, case, func, insert, or_, select, update
+from sqlalchemy.orm import Session, joinedload
+from providers import FakeProvider
+from ratelimit import DeliveryRateLimiter, delivery_rate_limiter
+from stats import AlertStatsService
+from audience import audience_cache
+from events import alert_event, event_broker
+from metrics import registry
+from versions import touch
+from models import (Alert, AlertStats, User, Team, NotificationDelivery, DeliveryRollup, UserAlertPreference,
+                    VisibilityType, SeverityLevel, DeliveryType, DeliveryStatus)
+
+logger = logging.getLogger("alerting.services")
+channel_logger = logging.getLogger("alerting.channels")
+
+channel_sent_total = registry.counter(
+    "notifications_sent_total", "Recipients a channel delivered to", ("channel",))
+channel_failed_total = registry.counter(
+    "notifications_failed_total", "Recipients a channel failed to deliver to", ("channel",))
+channel_send_seconds = registry.histogram(
+    "notification_send_seconds", "Time per channel send call (per provider batch for batch channels)", ("channel",))
+fanout_recipients = registry.histogram(
+    "alert_fanout_recipients", "Recipients per created alert", (),
+    buckets=(0, 1, 10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000))
+fanout_seconds = registry.histogram("alert_fanout_seconds", "Time to fan out one create call")
+reminder_passes_total = registry.counter("reminder_passes_total", "Reminder passes run")
+reminder_pass_seconds = registry.histogram("reminder_pass_seconds", "Wall time per reminder pass")
+reminders_due_total = registry.counter("reminders_due_total", "Due preferences leased by reminder passes")
+reminders_sent_total = registry.counter("reminders_sent_total", "Reminders sent or queued")
+expired_snoozes_total = registry.counter("expired_snoozes_total", "Snoozes reset by reminder passes")
+reminder_last_pass_rows = registry.gauge(
+    "reminder_last_pass_rows", "Due and sent rows in the most recent reminder pass", ("kind",))
 
 # Strategy Pattern for Notification Channels
 class NotificationChannel(ABC):
+    # Metrics label; defaults to the class name
+    label: Optional[str] = None
+    
     @abstractmethod
     def send(self, user: User, alert: Alert) -> bool:
         pass
+    
+    def send_many(self, users: List[User], alert: Alert) -> Dict[int, bool]:
+        """Send to several recipients, returning success per user id"""
+        started = time.perf_counter()
+        results = {}
+        for user in users:
+            try:
+                results[user.id] = self.send(user, alert)
+            except Exception:
+                results[user.id] = False
+        self.record_sends(results, started)
+        return results
+    
+    def send_digests(self, digests: List[Tuple[User, List[Alert]]]) -> Dict[int, bool]:
+        """Send each user one message covering several alerts, returning success per user id"""
+        started = time.perf_counter()
+        results = {}
+        for user, alerts in digests:
+            try:
+                results[user.id] = all([self.send(user, alert) for alert in alerts])
+            except Exception:
+                results[user.id] = False
+        self.record_sends(results, started)
+        return results
+    
+    def record_sends(self, results: Dict[int, bool], started: float):
+        """Count one send call's outcomes; called per call rather than per recipient"""
+        elapsed = time.perf_counter() - started
+        channel = self.label or type(self).__name__
+        sent = sum(1 for ok in results.values() if ok)
+        channel_sent_total.inc(sent, channel=channel)
+        channel_failed_total.inc(len(results) - sent, channel=channel)
+        channel_send_seconds.observe(elapsed, channel=channel)
+        if channel_logger.isEnabledFor(logging.DEBUG):
+            channel_logger.debug("%s sent to %d/%d recipients in %.1fms", channel, sent, len(results), elapsed * 1000,
+                                 extra={'channel': channel, 'recipients': len(results), 'sent': sent,
+                                        'duration_ms': round(elapsed * 1000, 1)})
 
 class InAppNotificationChannel(NotificationChannel):
+    label = "In-App"
+    
     def send(self, user: User, alert: Alert) -> bool:
         # In-app notifications are handled by the frontend
         return True
+    
+    def send_many(self, users: List[User], alert: Alert) -> Dict[int, bool]:
+        started = time.perf_counter()
+        results = {user.id: True for user in users}
+        self.record_sends(results, started)
+        return results
 
-class EmailNotificationChannel(NotificationChannel):
+class BatchNotificationChannel(NotificationChannel):
+    """Channel backed by a provider that accepts batches of messages"""
+    label = "Batch"
+    
+    def __init__(self, provider: Optional[FakeProvider] = None, batch_size: int = 100):
+        self.batch_size = batch_size
+        self.provider = provider or FakeProvider(self.label, max_batch_size=batch_size)
+    
+    @abstractmethod
+    def address(self, user: User) -> str:
+        pass
+    
+    def format_message(self, alert: Alert) -> str:
+        return alert.title
+    
+    def format_digest(self, alerts: List[Alert]) -> str:
+        return f"{len(alerts)} alerts: " + "; ".join(self.format_message(alert) for alert in alerts)
+    
     def send(self, user: User, alert: Alert) -> bool:
-        # Future implementation
-        print(f"Email sent to {user.email}: {alert.title}")
-        return True
+        return self.send_many([user], alert).get(user.id, False)
+    
+    def send_many(self, users: List[User], alert: Alert) -> Dict[int, bool]:
+        message = self.format_message(alert)
+        return self._send_batches([(user, message) for user in users])
+    
+    def send_digests(self, digests: List[Tuple[User, List[Alert]]]) -> Dict[int, bool]:
+        return self._send_batches([(user, self.format_digest(alerts)) for user, alerts in digests])
+    
+    def _send_batches(self, messages: List[Tuple[User, str]]) -> Dict[int, bool]:
+        results = {}
+        for start in range(0, len(messages), self.batch_size):
+            chunk = messages[start:start + self.batch_size]
+            started = time.perf_counter()
+            try:
+                outcomes = self.provider.send_batch([(self.address(user), message) for user, message in chunk])
+            except Exception as e:
+                # Keep earlier chunks' results so they are not re-sent on retry
+                channel_logger.warning("%s batch of %d failed: %s", self.label, len(chunk), e,
+                                       extra={'channel': self.label, 'recipients': len(chunk)})
+                outcomes = [False] * len(chunk)
+            chunk_results = {user.id: ok for (user, _), ok in zip(chunk, outcomes)}
+            self.record_sends(chunk_results, started)
+            results.update(chunk_results)
+        return results
 
-class SMSNotificationChannel(NotificationChannel):
-    def send(self, user: User, alert: Alert) -> bool:
-        # Future implementation
-        print(f"SMS sent to user {user.id}: {alert.title}")
-        return True
+class EmailNotificationChannel(BatchNotificationChannel):
+    label = "Email"
+    
+    def address(self, user: User) -> str:
+        return user.email
 
-class SlackNotificationChannel(NotificationChannel):
-    def send(self, user: User, alert: Alert) -> bool:
-        # Slack integration implementation
-        print(f"Slack message sent to {user.name}: [{alert.severity.value}] {alert.title}")
-        # In real implementation, would use Slack API
-        return True
+class SMSNotificationChannel(BatchNotificationChannel):
+    label = "SMS"
+    
+    def address(self, user: User) -> str:
+        # Future implementation - phone numbers are not stored yet
+        return str(user.id)
+
+class SlackNotificationChannel(BatchNotificationChannel):
+    label = "Slack"
+    
+    def address(self, user: User) -> str:
+        # In real implementation, would resolve the Slack member id
+        return user.name
+    
+    def format_message(self, alert: Alert) -> str:
+        return f"[{alert.severity.value}] {alert.title}"
 
 # Observer Pattern for Alert Management
 class AlertObserver(ABC):
     @abstractmethod
     def on_alert_created(self, alert: Alert):
         pass
+    
+    def on_alert_committed(self, alert: Alert):
+        """Called once the alert and its fan-out are committed"""
+        pass
+    
+    def on_alerts_created(self, alerts: List[Alert]):
+        """Bulk variant of on_alert_created; observers that can batch work override it"""
+        for alert in alerts:
+            self.on_alert_created(alert)
+    
+    def on_alerts_committed(self, alerts: List[Alert]):
+        for alert in alerts:
+            self.on_alert_committed(alert)
 
 class NotificationObserver(AlertObserver):
-    def __init__(self, db: Session, alert_service=None):
+    def __init__(self, db: Session, alert_service=None, chunk_size: int = 500):
         self.db = db
         self.alert_service = alert_service
+        self.chunk_size = chunk_size
+        self.last_fanout: Optional[dict] = None
         
     def on_alert_created(self, alert: Alert):
-        users = self._get_target_users(alert)
-        for user in users:
-            self._create_user_preference(user, alert)
-            self._deliver_notification(user, alert)
-    
-    def _get_target_users(self, alert: Alert) -> List[User]:
-        if alert.visibility_type == VisibilityType.ORGANIZATION:
-            return self.db.query(User).all()
-        elif alert.visibility_type == VisibilityType.TEAM:
-            return self.db.query(User).filter(User.team_id == alert.target_id).all()
-        elif alert.visibility_type == VisibilityType.USER:
-            user = self.db.query(User).filter(User.id == alert.target_id).first()
-            return [user] if user else []
-        return []
-    
-    def _create_user_preference(self, user: User, alert: Alert):
-        preference = UserAlertPreference(
-            user_id=user.id,
-            alert_id=alert.id,
-            last_reminded=datetime.utcnow()
-        )
-        self.db.add(preference)
+        self.on_alerts_created([alert])
+    
+    def on_alerts_created(self, alerts: List[Alert]):
+        """Fan alerts out to their audiences using chunked bulk inserts.
+        
+        Each distinct (visibility_type, target_id) is resolved once, and rows
+        for several small audiences share one insert per chunk.
+        """
+        started = time.perf_counter()
+        now = datetime.utcnow()
+        audiences: Dict[tuple, List[int]] = {}
+        targeted: Dict[int, int] = {}
+        delivered: Dict[int, int] = {}
+        batch: List[Tuple[Alert, List[int]]] = []
+        batch_rows = 0
+        
+        def flush():
+            self._create_user_preferences(batch, now)
+            for alert_id, count in self._deliver_notifications(batch, now).items():
+                delivered[alert_id] = delivered.get(alert_id, 0) + count
+        
+        for alert in alerts:
+            key = (alert.visibility_type, alert.target_id)
+            if key not in audiences:
+                audiences[key] = self._get_target_user_ids(alert)
+            user_ids = audiences[key]
+            targeted[alert.id] = len(user_ids)
+            for start in range(0, len(user_ids), self.chunk_size):
+                chunk = user_ids[start:start + self.chunk_size]
+                batch.append((alert, chunk))
+                batch_rows += len(chunk)
+                if batch_rows >= self.chunk_size:
+                    flush()
+                    batch, batch_rows = [], 0
+        if batch:
+            flush()
+        
+        queued = bool(self.alert_service and self.alert_service.queue_deliveries)
+        AlertStatsService(self.db).record_fanouts({
+            alert_id: (count, 0 if queued else delivered.get(alert_id, 0))
+            for alert_id, count in targeted.items()
+        })
+        
+        elapsed = time.perf_counter() - started
+        fanout_seconds.observe(elapsed)
+        for count in targeted.values():
+            fanout_recipients.observe(count)
+        preferences = sum(targeted.values())
+        deliveries = sum(delivered.values())
+        rows = preferences + deliveries
+        self.last_fanout = {
+            'alerts': len(alerts),
+            'audiences': len(audiences),
+            'recipients': preferences,
+            'preferences': preferences,
+            'deliveries': deliveries,
+            'seconds': round(elapsed, 4),
+            'rows_per_second': round(rows / elapsed, 1) if elapsed > 0 else 0.0
+        }
+        # One summary per create call instead of a line per recipient or chunk
+        logger.info("Fanned out %d alerts to %d recipients in %.1fms", len(alerts), preferences, elapsed * 1000,
+                    extra={'fanout': self.last_fanout})
+    
+    def _get_target_user_ids(self, alert: Alert) -> List[int]:
+        return list(audience_cache.get_member_ids(self.db, alert.visibility_type, alert.target_id))
     
-    def _deliver_notification(self, user: User, alert: Alert):
-        # Send actual notification through channel
+    def _create_user_preferences(self, batch: List[Tuple[Alert, List[int]]], now: datetime):
+        rows = []
+        for alert, user_ids in batch:
+            next_reminder_at = ReminderService.next_reminder_time(alert, now)
+            rows.extend(
+                {
+                    'user_id': user_id,
+                    'alert_id': alert.id,
+                    'last_reminded': now,
+                    'next_reminder_at': next_reminder_at
+                }
+                for user_id in user_ids
+            )
+        if rows:
+            self.db.execute(insert(UserAlertPreference), rows)
+    
+    def _deliver_notifications(self, batch: List[Tuple[Alert, List[int]]], now: datetime) -> Dict[int, int]:
+        """Deliver (or queue) one chunk and return the delivery count per alert"""
+        if self.alert_service and self.alert_service.queue_deliveries:
+            # Sent later by the delivery worker pool, once the alert is committed
+            DeliveryQueue(self.db).enqueue_many(batch, now)
+            return {alert.id: len(user_ids) for alert, user_ids in batch}
+        
+        delivered: List[Tuple[Alert, List[int]]] = []
         if self.alert_service:
-            channel = self.alert_service.notification_channels.get(alert.delivery_type.value)
-            if channel:
-                success = channel.send(user, alert)
-                if success:
-                    # Log successful delivery
-                    delivery = NotificationDelivery(
-                        alert_id=alert.id,
-                        user_id=user.id,
-                        delivery_type=alert.delivery_type
-                    )
-                    self.db.add(delivery)
+            # Channels only need contact details, so skip building full ORM users
+            all_ids = {user_id for _, user_ids in batch for user_id in user_ids}
+            contacts = {
+                user.id: user for user in
+                self.db.query(User.id, User.name, User.email).filter(User.id.in_(all_ids))
+            }
+            # Send actual notification through channel
+            for alert, user_ids in batch:
+                channel = self.alert_service.notification_channels.get(alert.delivery_type.value)
+                if not channel:
+                    continue
+                results = channel.send_many([contacts[i] for i in user_ids if i in contacts], alert)
+                delivered.append((alert, [user_id for user_id, ok in results.items() if ok]))
         else:
             # Fallback - just log delivery without sending
-            delivery = NotificationDelivery(
-                alert_id=alert.id,
-                user_id=user.id,
-                delivery_type=alert.delivery_type
+            delivered = batch
+        
+        rows = [
+            {
+                'alert_id': alert.id,
+                'user_id': user_id,
+                'delivered_at': now,
+                'delivery_type': alert.delivery_type,
+                'status': DeliveryStatus.SENT,
+                'attempts': 1
+            }
+            for alert, user_ids in delivered for user_id in user_ids
+        ]
+        if rows:
+            self.db.execute(insert(NotificationDelivery), rows)
+        counts: Dict[int, int] = {}
+        for alert, user_ids in delivered:
+            counts[alert.id] = counts.get(alert.id, 0) + len(user_ids)
+        return counts
+
+class StreamObserver(AlertObserver):
+    """Pushes new alerts to audience members with an open inbox stream"""
+    
+    def __init__(self, db: Session, broker=event_broker):
+        self.db = db
+        self.broker = broker
+    
+    def on_alert_created(self, alert: Alert):
+        pass
+    
+    def on_alert_committed(self, alert: Alert):
+        subscribed = self.broker.subscribed_user_ids()
+        if not subscribed or not alert.is_active:
+            return
+        # Member ids are sorted, so membership is a binary search per subscriber
+        member_ids = audience_cache.get_member_ids(self.db, alert.visibility_type, alert.target_id)
+        recipients = [
+            user_id for user_id in subscribed
+            if (i := bisect_left(member_ids, user_id)) < len(member_ids) and member_ids[i] == user_id
+        ]
+        self.broker.publish(recipients, alert_event(alert))
+
+# Durable outbound queue stored in notification_deliveries
+class DeliveryQueue:
+    def __init__(self, db: Session, max_attempts: int = 5, backoff_seconds: int = 30,
+                 lease_seconds: int = 300, rate_limiter: Optional[DeliveryRateLimiter] = None):
+        self.db = db
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.lease_seconds = lease_seconds
+        self.rate_limiter = rate_limiter
+    
+    def enqueue(self, alert: Alert, user_ids: List[int], now: Optional[datetime] = None) -> int:
+        return self.enqueue_many([(alert, user_ids)], now)
+    
+    def enqueue_many(self, batch: List[Tuple[Alert, List[int]]], now: Optional[datetime] = None,
+                     claim_token: Optional[str] = None) -> int:
+        """Queue deliveries due at `now`; with `claim_token` they are queued already leased to the caller"""
+        now = now or datetime.utcnow()
+        next_attempt_at = now + timedelta(seconds=self.lease_seconds) if claim_token else now
+        rows = [
+            {
+                'alert_id': alert.id,
+                'user_id': user_id,
+                'delivered_at': None,
+                'delivery_type': alert.delivery_type,
+                'status': DeliveryStatus.QUEUED,
+                'next_attempt_at': next_attempt_at,
+                'claim_token': claim_token
+            }
+            for alert, user_ids in batch for user_id in user_ids
+        ]
+        if rows:
+            # Core insert so the explicit NULL delivered_at isn't replaced by the column default
+            self.db.execute(insert(NotificationDelivery.__table__), rows)
+        return len(rows)
+    
+    def claim(self, delivery_type: DeliveryType, limit: int) -> Optional[str]:
+        """
+        Lease the due deliveries of the users behind the next `limit` due rows
+        and return the claim token, or None.
+        
+        Every due row of a claimed user joins the batch, so the user gets one
+        digest rather than one per batch the rows would otherwise be split over.
+        A batch can therefore exceed `limit` by those users' other due rows.
+        """
+        now = datetime.utcnow()
+        token = uuid.uuid4().hex
+        is_due = and_(
+            NotificationDelivery.status == DeliveryStatus.QUEUED,
+            NotificationDelivery.delivery_type == delivery_type,
+            NotificationDelivery.next_attempt_at <= now
+        )
+        users = select(NotificationDelivery.user_id).where(is_due).order_by(
+            NotificationDelivery.next_attempt_at, NotificationDelivery.user_id
+        ).limit(limit)
+        due = select(NotificationDelivery.id).where(
+            is_due, NotificationDelivery.user_id.in_(users.scalar_subquery())
+        ).with_for_update(skip_locked=True)
+        
+        # The lease makes rows reappear if the claiming worker dies mid-send
+        claimed = self.db.execute(
+            update(NotificationDelivery)
+            .where(NotificationDelivery.id.in_(due.scalar_subquery()))
+            .values(claim_token=token, next_attempt_at=now + timedelta(seconds=self.lease_seconds)),
+            execution_options={"synchronize_session": False}
+        ).rowcount
+        self.db.commit()
+        return token if claimed else None
+    
+    def claimed(self, token: str) -> List[NotificationDelivery]:
+        return self.db.query(NotificationDelivery).filter(
+            NotificationDelivery.claim_token == token
+        ).all()
+    
+    def deliver(self, deliveries: List[NotificationDelivery],
+                channel: Optional[NotificationChannel]) -> Dict[str, int]:
+        """
+        Send claimed deliveries through a channel and record the outcome.
+        
+        A recipient with several deliveries in the batch gets one digest rather
+        than a message per alert. Recipients over their rate limit are deferred
+        without using an attempt, so their deliveries join a later digest.
+        """
+        now = datetime.utcnow()
+        counts = {'sent': 0, 'failed': 0, 'deferred': 0, 'digests': 0}
+        sent_per_alert: Dict[int, int] = {}
+        alerts = {
+            alert.id: alert for alert in
+            self.db.query(Alert).filter(Alert.id.in_({delivery.alert_id for delivery in deliveries}))
+        }
+        users = {
+            user.id: user for user in
+            self.db.query(User.id, User.name, User.email).filter(
+                User.id.in_({delivery.user_id for delivery in deliveries})
             )
-            self.db.add(delivery)
+        }
+        
+        def record(group: List[NotificationDelivery], ok: bool, error: str):
+            for delivery in group:
+                if ok:
+                    self._mark_sent(delivery)
+                    counts['sent'] += 1
+                    sent_per_alert[delivery.alert_id] = sent_per_alert.get(delivery.alert_id, 0) + 1
+                else:
+                    self._retry_or_fail(delivery, error)
+                    counts['failed'] += 1
+        
+        def send(call) -> Tuple[Dict[int, bool], Optional[str]]:
+            try:
+                return call(), None
+            except Exception as e:
+                return {}, str(e) or e.__class__.__name__
+        
+        by_user: Dict[int, List[NotificationDelivery]] = {}
+        for delivery in deliveries:
+            if not channel:
+                record([delivery], False, "no notification channel configured")
+            elif delivery.alert_id not in alerts:
+                record([delivery], False, "alert no longer exists")
+            elif delivery.user_id not in users:
+                record([delivery], False, "recipient no longer exists")
+            else:
+                by_user.setdefault(delivery.user_id, []).append(delivery)
+        
+        singles: Dict[int, List[NotificationDelivery]] = {}
+        digests: List[Tuple[User, List[NotificationDelivery]]] = []
+        for user_id, group in by_user.items():
+            wait = self.rate_limiter.acquire(group[0].delivery_type, user_id) if self.rate_limiter else 0
+            if wait:
+                for delivery in group:
+                    self._defer(delivery, now + timedelta(seconds=wait))
+                counts['deferred'] += len(group)
+            elif len(group) == 1:
+                singles.setdefault(group[0].alert_id, []).append(group[0])
+            else:
+                digests.append((users[user_id], group))
+        
+        for alert_id, group in singles.items():
+            results, batch_error = send(lambda: channel.send_many([users[d.user_id] for d in group], alerts[alert_id]))
+            for delivery in group:
+                record([delivery], results.get(delivery.user_id), batch_error or "channel reported failure")
+        
+        if digests:
+            results, batch_error = send(lambda: channel.send_digests([
+                (user, list({d.alert_id: alerts[d.alert_id] for d in group}.values())) for user, group in digests
+            ]))
+            counts['digests'] = len(digests)
+            for user, group in digests:
+                record(group, results.get(user.id), batch_error or "channel reported failure")
+        
+        AlertStatsService(self.db).bump_many('delivered_count', sent_per_alert)
+        self.db.commit()
+        return counts
+    
+    def _mark_sent(self, delivery: NotificationDelivery):
+        delivery.status = DeliveryStatus.SENT
+        delivery.delivered_at = datetime.utcnow()
+        delivery.attempts = (delivery.attempts or 0) + 1
+        delivery.claim_token = None
+        delivery.last_error = None
+    
+    def _defer(self, delivery: NotificationDelivery, until: datetime):
+        # Rate limited rather than failed, so no attempt is used up
+        delivery.claim_token = None
+        delivery.next_attempt_at = until
+    
+    def _retry_or_fail(self, delivery: NotificationDelivery, error: str):
+        delivery.attempts = (delivery.attempts or 0) + 1
+        delivery.claim_token = None
+        delivery.last_error = error
+        if delivery.attempts >= self.max_attempts:
+            delivery.status = DeliveryStatus.FAILED
+            delivery.next_attempt_at = None
+        else:
+            # Exponential backoff: 30s, 60s, 120s, ...
+            delay = self.backoff_seconds * 2 ** (delivery.attempts - 1)
+            delivery.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
 
 class AlertService:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, queue_deliveries: bool = False):
         self.db = db
+        self.queue_deliveries = queue_deliveries
         self.observers: List[AlertObserver] = []
         self.notification_channels = {
             'In-App': InAppNotificationChannel(),
@@ -116,196 +545,563 @@ class AlertService:
         for observer in self.observers:
             observer.on_alert_created(alert)
         
+        touch(self.db, 'alerts')
         self.db.commit()
+        for observer in self.observers:
+            observer.on_alert_committed(alert)
         return alert
     
-    def get_alerts_for_user(self, user_id: int) -> List[dict]:
-        user = self.db.query(User).filter(User.id == user_id).first()
-        if not user:
-            return []
+    def create_alerts(self, items: List[dict], created_by: int) -> Tuple[Dict[int, Alert], Dict[int, str]]:
+        """Create many alerts in one transaction.
         
-        # Get alerts based on visibility
-        org_alerts = self.db.query(Alert).filter(
+        Returns the created alerts and the rejection reasons, both keyed by
+        position in `items`. Rejected items don't stop the rest of the batch.
+        """
+        errors = self._validate_alerts(items)
+        alerts = {
+            index: Alert(**data, created_by=created_by)
+            for index, data in enumerate(items) if index not in errors
+        }
+        if alerts:
+            self.db.add_all(alerts.values())
+            self.db.flush()
+            for observer in self.observers:
+                observer.on_alerts_created(list(alerts.values()))
+            touch(self.db, 'alerts')
+        self.db.commit()
+        for observer in self.observers:
+            observer.on_alerts_committed(list(alerts.values()))
+        return alerts, errors
+    
+    def _validate_alerts(self, items: List[dict]) -> Dict[int, str]:
+        targets = {VisibilityType.TEAM: Team, VisibilityType.USER: User}
+        existing = {}
+        for visibility, model in targets.items():
+            ids = {item.get('target_id') for item in items if item.get('visibility_type') == visibility}
+            ids.discard(None)
+            existing[visibility] = set(self.db.scalars(select(model.id).where(model.id.in_(ids)))) if ids else set()
+        
+        errors = {}
+        for index, item in enumerate(items):
+            visibility = item.get('visibility_type')
+            target_id = item.get('target_id')
+            start_time, expiry_time = item.get('start_time'), item.get('expiry_time')
+            if visibility in targets and target_id is None:
+                errors[index] = f"target_id is required for {visibility.value} alerts"
+            elif visibility in targets and target_id not in existing[visibility]:
+                errors[index] = f"{targets[visibility].__name__} {target_id} does not exist"
+            elif start_time and expiry_time and expiry_time <= start_time:
+                errors[index] = "expiry_time must be after start_time"
+        return errors
+    
+    def get_alerts_for_user(self, user_id: int, after: Optional[int] = None, limit: Optional[int] = None,
+                            severity: Optional[SeverityLevel] = None, unread_only: bool = False) -> List[dict]:
+        """Active alerts visible to a user with their read/snooze state, newest first.
+        
+        Pass the last returned alert id as `after` to fetch the next page.
+        """
+        audience = or_(
             Alert.visibility_type == VisibilityType.ORGANIZATION,
-            Alert.is_active == True
-        ).all()
+            and_(Alert.visibility_type == VisibilityType.TEAM, Alert.target_id == User.team_id),
+            and_(Alert.visibility_type == VisibilityType.USER, Alert.target_id == User.id)
+        )
+        # Joining the user makes an unknown user_id return nothing
+        query = self.db.query(
+            Alert,
+            UserAlertPreference.is_read,
+            UserAlertPreference.is_snoozed,
+            UserAlertPreference.snoozed_until
+        ).join(User, and_(User.id == user_id, audience)).outerjoin(
+            UserAlertPreference,
+            and_(UserAlertPreference.alert_id == Alert.id, UserAlertPreference.user_id == User.id)
+        ).filter(Alert.is_active == True)
         
-        team_alerts = self.db.query(Alert).filter(
-            Alert.visibility_type == VisibilityType.TEAM,
-            Alert.target_id == user.team_id,
-            Alert.is_active == True
-        ).all() if user.team_id else []
+        if severity:
+            query = query.filter(Alert.severity == severity)
+        if unread_only:
+            query = query.filter(or_(UserAlertPreference.is_read == False, UserAlertPreference.is_read.is_(None)))
+        if after:
+            query = query.filter(Alert.id < after)
+        query = query.order_by(Alert.id.desc())
+        if limit:
+            query = query.limit(limit)
         
-        user_alerts = self.db.query(Alert).filter(
-            Alert.visibility_type == VisibilityType.USER,
-            Alert.target_id == user_id,
-            Alert.is_active == True
-        ).all()
+        # A lapsed snooze reads as expired even before the reminder pass resets it
+        now = datetime.utcnow()
+        results = []
+        for alert, is_read, is_snoozed, snoozed_until in query:
+            snoozed = bool(is_snoozed) and not (snoozed_until and snoozed_until <= now)
+            results.append({
+                'alert': alert,
+                'is_read': bool(is_read),
+                'is_snoozed': snoozed,
+                'snoozed_until': snoozed_until if snoozed else None
+            })
+        return results
+    
+    ADMIN_SORTS = ('created_at', 'severity', 'title', 'expiry_time', 'read_count', 'snoozed_count')
+    
+    def get_admin_alerts(self, severity: Optional[SeverityLevel] = None, status: Optional[str] = None,
+                         audience: Optional[VisibilityType] = None, sort_by: str = 'created_at',
+                         order: str = 'asc', limit: Optional[int] = None, offset: int = 0):
+        """Admin alert listing with engagement stats in a constant number of queries.
+        
+        Returns the page of alerts and, when paginating, the total number of matches.
+        """
+        if sort_by not in self.ADMIN_SORTS:
+            raise ValueError(f"sort_by must be one of {', '.join(self.ADMIN_SORTS)}")
+        if order not in ('asc', 'desc'):
+            raise ValueError("order must be 'asc' or 'desc'")
+        
+        now = datetime.utcnow()
+        alert_status = case(
+            (Alert.is_active == False, 'inactive'),
+            (and_(Alert.expiry_time.isnot(None), Alert.expiry_time < now), 'expired'),
+            else_='active'
+        )
+        snoozed_count = func.coalesce(AlertStats.snoozed_count, 0)
+        read_count = func.coalesce(AlertStats.read_count, 0)
+        
+        query = self.db.query(Alert, alert_status, snoozed_count, read_count).outerjoin(
+            AlertStats, AlertStats.alert_id == Alert.id
+        )
+        if severity:
+            query = query.filter(Alert.severity == severity)
+        if audience:
+            query = query.filter(Alert.visibility_type == audience)
+        if status:
+            query = query.filter(alert_status == status)
         
-        all_alerts = org_alerts + team_alerts + user_alerts
+        total = query.count() if limit else None
+        sort_column = {
+            'created_at': Alert.created_at,
+            'severity': Alert.severity,
+            'title': Alert.title,
+            'expiry_time': Alert.expiry_time,
+            'read_count': read_count,
+            'snoozed_count': snoozed_count
+        }[sort_by]
+        direction = sort_column.asc() if order == 'asc' else sort_column.desc()
+        query = query.order_by(direction, Alert.id.asc() if order == 'asc' else Alert.id.desc())
+        if limit:
+            query = query.limit(limit)
+        if offset:
+            query = query.offset(offset)
+        rows = query.all()
         
-        # Get user preferences
+        audience_sizes = self.audience_sizes([alert for alert, *_ in rows])
         result = []
-        for alert in all_alerts:
-            preference = self.db.query(UserAlertPreference).filter(
-                UserAlertPreference.user_id == user_id,
-                UserAlertPreference.alert_id == alert.id
-            ).first()
+        for alert, status_value, alert_snoozed, alert_read in rows:
+            total_users = audience_sizes.get((alert.visibility_type, alert.target_id), 0)
+            
+            # Determine if still recurring
+            is_recurring = (
+                alert.is_active and 
+                alert.reminder_frequency > 0 and
+                (not alert.expiry_time or alert.expiry_time > now) and
+                alert_snoozed < total_users * 0.8  # Less than 80% snoozed
+            )
             
             result.append({
-                'alert': alert,
-                'is_read': preference.is_read if preference else False,
-                'is_snoozed': preference.is_snoozed if preference else False,
-                'snoozed_until': preference.snoozed_until if preference else None
+                "id": alert.id,
+                "title": alert.title,
+                "message": alert.message,
+                "severity": alert.severity.value,
+                "visibility_type": alert.visibility_type.value,
+                "target_id": alert.target_id,
+                "is_active": alert.is_active,
+                "status": status_value,
+                "created_at": alert.created_at,
+                "start_time": alert.start_time,
+                "expiry_time": alert.expiry_time,
+                "reminder_frequency": alert.reminder_frequency,
+                "total_users": total_users,
+                "snoozed_count": alert_snoozed,
+                "read_count": alert_read,
+                "is_recurring": is_recurring,
+                "engagement_rate": round((alert_read / total_users * 100) if total_users > 0 else 0, 1)
             })
         
-        return result
+        return result, total
+    
+    def audience_sizes(self, alerts: List[Alert]) -> Dict[tuple, int]:
+        """Current audience size per (visibility_type, target_id), from the cache or grouped counts"""
+        return audience_cache.get_sizes(self.db, [(alert.visibility_type, alert.target_id) for alert in alerts])
+    
+    def reschedule_reminders(self, alert: Alert):
+        """Refresh next_reminder_at after an alert's schedule or status changed"""
+        enabled = alert.is_active and alert.reminder_frequency and alert.reminder_frequency > 0
+        # Active alerts are re-evaluated on the next reminder tick
+        self.db.execute(
+            update(UserAlertPreference)
+            .where(UserAlertPreference.alert_id == alert.id)
+            .values(next_reminder_at=datetime.utcnow() if enabled else None),
+            execution_options={"synchronize_session": False}
+        )
+    
+    def save_alert(self, alert: Alert):
+        """Commit edits to an existing alert and refresh its reminder schedule"""
+        self.reschedule_reminders(alert)
+        touch(self.db, 'alerts')
+        self.db.commit()
     
     def snooze_alert(self, user_id: int, alert_id: int):
-        preference = self.db.query(UserAlertPreference).filter(
-            UserAlertPreference.user_id == user_id,
-            UserAlertPreference.alert_id == alert_id
-        ).first()
-        
-        if preference:
-            preference.is_snoozed = True
-            preference.snoozed_until = datetime.utcnow() + timedelta(days=1)
-            self.db.commit()
+        snoozed_until = datetime.utcnow() + timedelta(days=1)
+        newly_snoozed = self._update_preference(
+            user_id, alert_id, dict(is_snoozed=True, snoozed_until=snoozed_until),
+            UserAlertPreference.is_snoozed == False
+        )
+        if newly_snoozed:
+            AlertStatsService(self.db).bump(alert_id, snoozed_count=1)
+        # Snoozing again just extends the snooze
+        changed = newly_snoozed or self._update_preference(user_id, alert_id, dict(snoozed_until=snoozed_until))
+        if changed:
+            touch(self.db, f'inbox:{user_id}')
+        self.db.commit()
+        if changed:
+            self._publish(user_id, 'snoozed', alert_id, snoozed_until=snoozed_until.isoformat())
     
     def mark_as_read(self, user_id: int, alert_id: int):
-        preference = self.db.query(UserAlertPreference).filter(
-            UserAlertPreference.user_id == user_id,
-            UserAlertPreference.alert_id == alert_id
-        ).first()
-        
-        if preference:
-            preference.is_read = True
-            self.db.commit()
+        changed = self._update_preference(user_id, alert_id, dict(is_read=True), UserAlertPreference.is_read == False)
+        if changed:
+            AlertStatsService(self.db).bump(alert_id, read_count=1)
+            touch(self.db, f'inbox:{user_id}')
+        self.db.commit()
+        if changed:
+            self._publish(user_id, 'read', alert_id)
+    
+    def mark_as_unread(self, user_id: int, alert_id: int):
+        changed = self._update_preference(user_id, alert_id, dict(is_read=False), UserAlertPreference.is_read == True)
+        if changed:
+            AlertStatsService(self.db).bump(alert_id, read_count=-1)
+            touch(self.db, f'inbox:{user_id}')
+        self.db.commit()
+        if changed:
+            self._publish(user_id, 'unread', alert_id)
+    
+    def _publish(self, user_id: int, event_type: str, alert_id: int, **extra):
+        # Lets the user's other open inboxes update without polling
+        event_broker.publish([user_id], dict(type=event_type, alert_id=alert_id, **extra))
+    
+    def _update_preference(self, user_id: int, alert_id: int, values: dict, *conditions) -> bool:
+        """Conditional UPDATE so counters only move on a real state change, even under concurrency"""
+        return self.db.execute(
+            update(UserAlertPreference).where(
+                UserAlertPreference.user_id == user_id,
+                UserAlertPreference.alert_id == alert_id,
+                *conditions
+            ).values(**values),
+            execution_options={"synchronize_session": False}
+        ).rowcount > 0
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
 
 class ReminderService:
-    def __init__(self, db: Session, alert_service: AlertService):
+    """
+    Sends due reminders and expires snoozes.
+    
+    Several processes can run passes at once: due rows are leased a page at a
+    time through claimed_by/claimed_until, so each is handled by one worker.
+    A lease that outlives a crashed worker expires and the rows are claimed again.
+    """
+    
+    def __init__(self, db: Session, alert_service: AlertService, page_size: int = 500,
+                 lease: timedelta = timedelta(minutes=5), worker_id: Optional[str] = None,
+                 digest_window: timedelta = timedelta(minutes=1),
+                 rate_limiter: Optional[DeliveryRateLimiter] = delivery_rate_limiter):
         self.db = db
         self.alert_service = alert_service
+        self.page_size = page_size
+        self.lease = lease
+        self.worker_id = worker_id or default_worker_id()
+        self.digest_window = digest_window
+        self.rate_limiter = rate_limiter
+        self.last_run: Optional[dict] = None
+    
+    @staticmethod
+    def next_reminder_time(alert: Alert, last_reminded: Optional[datetime]) -> Optional[datetime]:
+        """When the next reminder for this alert is due, or None if it never will be"""
+        if not alert.is_active or not alert.reminder_frequency or alert.reminder_frequency <= 0:
+            return None
+        
+        if last_reminded:
+            due = last_reminded + timedelta(hours=alert.reminder_frequency)
+        else:
+            due = alert.start_time or datetime.utcnow()
+        
+        # Not before the alert starts, and never once it has expired
+        if alert.start_time and alert.start_time > due:
+            due = alert.start_time
+        if alert.expiry_time and alert.expiry_time < due:
+            return None
+        return due
     
     def process_reminders(self):
-        """Process all pending reminders"""
+        """
+        Process all pending reminders, committing after every batch.
+        
+        A failure only rolls back the batch in flight; its lease is released so
+        the next pass resumes with those rows. Per-batch timings are kept in
+        `last_run`.
+        """
+        started = time.perf_counter()
         now = datetime.utcnow()
+        self.last_run = {'expired_snoozes': 0, 'batches': [], 'reminded': 0, 'seconds': 0.0}
+        try:
+            self.last_run['expired_snoozes'] = self._expire_snoozes(now)
+            
+            # Only rows whose next_reminder_at has passed are claimed, a batch at a time
+            while True:
+                batch_started = time.perf_counter()
+                token = self.claim_due(now, self.page_size)
+                if token is None:
+                    break
+                try:
+                    reminded, rows = self._process_batch(token, now)
+                except Exception:
+                    self.db.rollback()
+                    self._release(token)
+                    raise
+                self.last_run['batches'].append({
+                    'rows': rows,
+                    'reminded': reminded,
+                    'seconds': round(time.perf_counter() - batch_started, 4)
+                })
+        finally:
+            self.last_run['reminded'] = sum(batch['reminded'] for batch in self.last_run['batches'])
+            self.last_run['seconds'] = round(time.perf_counter() - started, 4)
+            self._record_pass(time.perf_counter() - started)
+    
+    def _record_pass(self, seconds: float):
+        due = sum(batch['rows'] for batch in self.last_run['batches'])
+        reminder_passes_total.inc()
+        reminder_pass_seconds.observe(seconds)
+        reminders_due_total.inc(due)
+        reminders_sent_total.inc(self.last_run['reminded'])
+        expired_snoozes_total.inc(self.last_run['expired_snoozes'])
+        reminder_last_pass_rows.set(due, kind="due")
+        reminder_last_pass_rows.set(self.last_run['reminded'], kind="sent")
+    
+    def _expire_snoozes(self, now: datetime) -> int:
+        """Reset expired snoozes (next day) with one set-based UPDATE"""
+        # RETURNING lists only the rows this statement flipped, so concurrent passes can't double count
+        alert_ids = self.db.execute(
+            update(UserAlertPreference).where(
+                UserAlertPreference.is_snoozed == True,
+                UserAlertPreference.snoozed_until < now
+            ).values(is_snoozed=False, snoozed_until=None).returning(UserAlertPreference.alert_id),
+            execution_options={"synchronize_session": False}
+        ).scalars().all()
         
-        # Reset expired snoozes (next day)
-        expired_snoozes = self.db.query(UserAlertPreference).filter(
-            UserAlertPreference.is_snoozed == True,
-            UserAlertPreference.snoozed_until < now
+        AlertStatsService(self.db).bump_many(
+            'snoozed_count', {alert_id: -count for alert_id, count in Counter(alert_ids).items()}
+        )
+        if alert_ids:
+            touch(self.db, 'snoozes')
+        self.db.commit()
+        return len(alert_ids)
+    
+    def _process_batch(self, token: str, now: datetime) -> Tuple[int, int]:
+        """Send the reminders leased under `token` and commit; returns (reminded, rows)"""
+        page = self.db.query(UserAlertPreference).options(
+            joinedload(UserAlertPreference.alert)
+        ).filter(
+            UserAlertPreference.claimed_by == token,
+            UserAlertPreference.is_read == False,
+            UserAlertPreference.is_snoozed == False
         ).all()
         
-        for pref in expired_snoozes:
-            pref.is_snoozed = False
-            pref.snoozed_until = None
-        
-        # Find preferences that need reminders
-        preferences = self.db.query(UserAlertPreference).join(Alert).filter(
-            Alert.is_active == True,
-            Alert.reminder_frequency > 0,  # Only alerts with reminders enabled
+        reminded = self._process_page(page, now)
+        self._release(token, commit=False)
+        self.db.commit()
+        # Keeps the session's memory bounded by one batch however long the backlog
+        for preference in page:
+            self.db.expunge(preference)
+        return reminded, len(page)
+    
+    def _release(self, token: str, commit: bool = True):
+        self.db.query(UserAlertPreference).filter(UserAlertPreference.claimed_by == token).update(
+            {'claimed_by': None, 'claimed_until': None}, synchronize_session=False
+        )
+        if commit:
+            self.db.commit()
+    
+    def claim_due(self, now: datetime, limit: int) -> Optional[str]:
+        """Lease up to `limit` preferences due by `now` and return the claim token, or None"""
+        token = f"{self.worker_id}/{uuid.uuid4().hex[:8]}"
+        due = select(UserAlertPreference.id).where(
+            UserAlertPreference.is_read == False,
             UserAlertPreference.is_snoozed == False,
-            UserAlertPreference.is_read == False
-        ).all()
+            UserAlertPreference.next_reminder_at <= now,
+            or_(UserAlertPreference.claimed_until.is_(None), UserAlertPreference.claimed_until < datetime.utcnow())
+        ).order_by(UserAlertPreference.next_reminder_at).limit(limit).with_for_update(skip_locked=True)
         
+        claimed = self.db.execute(
+            update(UserAlertPreference)
+            .where(UserAlertPreference.id.in_(due.scalar_subquery()))
+            .values(claimed_by=token, claimed_until=datetime.utcnow() + self.lease),
+            execution_options={"synchronize_session": False}
+        ).rowcount
+        # Committing publishes the lease to other workers
+        self.db.commit()
+        return token if claimed else None
+    
+    def _process_page(self, preferences: List[UserAlertPreference], now: datetime) -> int:
+        due = {}
         for preference in preferences:
             alert = preference.alert
             
-            # Check if alert has started
-            if alert.start_time and alert.start_time > now:
-                continue
-                
-            # Check if alert is still valid
-            if alert.expiry_time and alert.expiry_time < now:
+            # The stored time can be stale after an alert was edited, so re-check it
+            next_at = self.next_reminder_time(alert, preference.last_reminded)
+            if next_at is None or next_at > now:
+                preference.next_reminder_at = next_at
                 continue
             
-            # Check if reminder is due
-            if preference.last_reminded:
-                time_since_last = now - preference.last_reminded
-                if time_since_last < timedelta(hours=alert.reminder_frequency):
-                    continue
-                
-            # Send reminder
-            user = preference.user
-            channel = self.alert_service.notification_channels.get(alert.delivery_type.value)
-            if channel and channel.send(user, alert):
-                # Log delivery
-                delivery = NotificationDelivery(
-                    alert_id=alert.id,
-                    user_id=user.id,
-                    delivery_type=alert.delivery_type
-                )
-                self.db.add(delivery)
-                
-                # Update last reminded
-                preference.last_reminded = now
+            due.setdefault(alert.id, (alert, []))[1].append(preference)
         
-        self.db.commit()
+        return self._send_reminders(list(due.values()), now)
+    
+    def _send_reminders(self, due: List[Tuple[Alert, List[UserAlertPreference]]], now: datetime) -> int:
+        """
+        Hand a page's due reminders to the delivery queue; returns how many were queued or sent.
+        
+        With queued deliveries the workers send them. Otherwise they are sent
+        here through the same path, so a user with several due reminders gets
+        one digest and sends respect the shared rate limiter. Deferred or
+        failed rows stay queued for the workers' backoff.
+        """
+        if self.alert_service.queue_deliveries:
+            for alert, preferences in due:
+                send_at = now if alert.delivery_type == DeliveryType.IN_APP else self.digest_slot(now)
+                DeliveryQueue(self.db).enqueue(alert, [p.user_id for p in preferences], send_at)
+                for preference in preferences:
+                    self._mark_reminded(alert, preference, now)
+            return sum(len(preferences) for _, preferences in due)
+        
+        delivery_queue = DeliveryQueue(self.db, rate_limiter=self.rate_limiter)
+        token = uuid.uuid4().hex
+        delivery_queue.enqueue_many([(alert, [p.user_id for p in preferences]) for alert, preferences in due],
+                                    now, claim_token=token)
+        for alert, preferences in due:
+            for preference in preferences:
+                self._mark_reminded(alert, preference, now)
+        
+        sent = 0
+        deliveries = delivery_queue.claimed(token)
+        for delivery_type in {delivery.delivery_type for delivery in deliveries}:
+            channel = self.alert_service.notification_channels.get(delivery_type.value)
+            sent += delivery_queue.deliver([d for d in deliveries if d.delivery_type == delivery_type], channel)['sent']
+        return sent
+    
+    def digest_slot(self, now: datetime) -> datetime:
+        """End of the digest window containing `now`; reminders queued for one slot are sent together"""
+        window = self.digest_window.total_seconds()
+        offset = (now - datetime(1970, 1, 1)).total_seconds() % window if window else 0
+        return now + timedelta(seconds=window - offset) if offset else now
+    
+    def _mark_reminded(self, alert: Alert, preference: UserAlertPreference, now: datetime):
+        preference.last_reminded = now
+        preference.next_reminder_at = self.next_reminder_time(alert, now)
 
 class AnalyticsService:
+    # Orderings for the per-alert breakdown, used to pick the top-N alerts in SQL
+    ALERT_SORTS = ('snoozed', 'read_rate', 'delivered', 'recent')
+    
     def __init__(self, db: Session):
         self.db = db
     
-    def get_dashboard_metrics(self) -> dict:
-        total_alerts = self.db.query(Alert).count()
-        active_alerts = self.db.query(Alert).filter(Alert.is_active == True).count()
+    def get_dashboard_metrics(self, limit: int = 50, offset: int = 0, sort_by: str = 'snoozed') -> dict:
+        if sort_by not in self.ALERT_SORTS:
+            raise ValueError(f"sort_by must be one of {', '.join(self.ALERT_SORTS)}")
         
-        total_deliveries = self.db.query(NotificationDelivery).count()
-        total_preferences = self.db.query(UserAlertPreference).count()
-        read_count = self.db.query(UserAlertPreference).filter(
-            UserAlertPreference.is_read == True
-        ).count()
+        total_alerts, active_alerts = self.db.query(
+            func.count(Alert.id),
+            func.sum(case((Alert.is_active == True, 1), else_=0))
+        ).one()
         
-        snoozed_count = self.db.query(UserAlertPreference).filter(
-            UserAlertPreference.is_snoozed == True
-        ).count()
+        # Totals come from the precomputed per-alert counters
+        total_preferences, total_deliveries, read_count, snoozed_count = self.db.query(
+            func.coalesce(func.sum(AlertStats.targeted_count), 0),
+            func.coalesce(func.sum(AlertStats.delivered_count), 0),
+            func.coalesce(func.sum(AlertStats.read_count), 0),
+            func.coalesce(func.sum(AlertStats.snoozed_count), 0)
+        ).one()
         
         # Severity breakdown
-        severity_counts = {}
-        for severity in SeverityLevel:
-            count = self.db.query(Alert).filter(
-                Alert.severity == severity,
-                Alert.is_active == True
-            ).count()
+        severity_counts = {severity.value: 0 for severity in SeverityLevel}
+        for severity, count in self.db.query(Alert.severity, func.count(Alert.id)).filter(
+            Alert.is_active == True
+        ).group_by(Alert.severity):
             severity_counts[severity.value] = count
         
         # Snoozed counts per alert
-        snoozed_per_alert = []
-        alerts = self.db.query(Alert).all()
-        for alert in alerts:
-            alert_snoozed = self.db.query(UserAlertPreference).filter(
-                UserAlertPreference.alert_id == alert.id,
-                UserAlertPreference.is_snoozed == True
-            ).count()
-            
-            alert_delivered = self.db.query(UserAlertPreference).filter(
-                UserAlertPreference.alert_id == alert.id
-            ).count()
-            
-            alert_read = self.db.query(UserAlertPreference).filter(
-                UserAlertPreference.alert_id == alert.id,
-                UserAlertPreference.is_read == True
-            ).count()
-            
-            snoozed_per_alert.append({
-                'alert_id': alert.id,
-                'title': alert.title,
-                'severity': alert.severity.value,
+        delivered = func.coalesce(AlertStats.targeted_count, 0)
+        read = func.coalesce(AlertStats.read_count, 0)
+        snoozed = func.coalesce(AlertStats.snoozed_count, 0)
+        read_rate = read * 1.0 / func.nullif(delivered, 0)
+        order_by = {
+            'snoozed': (snoozed.desc(), Alert.id.desc()),
+            'read_rate': (func.coalesce(read_rate, 0).desc(), Alert.id.desc()),
+            'delivered': (delivered.desc(), Alert.id.desc()),
+            'recent': (Alert.id.desc(),)
+        }[sort_by]
+        
+        rows = self.db.query(
+            Alert.id, Alert.title, Alert.severity, delivered, read, snoozed,
+            func.coalesce(AlertStats.delivered_count, 0)
+        ).outerjoin(AlertStats, AlertStats.alert_id == Alert.id).order_by(*order_by).limit(limit).offset(offset)
+        
+        snoozed_per_alert = [
+            {
+                'alert_id': alert_id,
+                'title': title,
+                'severity': severity.value,
                 'delivered': alert_delivered,
                 'read': alert_read,
                 'snoozed': alert_snoozed,
+                'notifications_sent': alert_sent,
                 'read_rate': round((alert_read / alert_delivered * 100) if alert_delivered > 0 else 0, 1)
-            })
+            }
+            for alert_id, title, severity, alert_delivered, alert_read, alert_snoozed, alert_sent in rows
+        ]
         
         return {
             'total_alerts': total_alerts,
-            'active_alerts': active_alerts,
+            'active_alerts': active_alerts or 0,
             'total_deliveries': total_deliveries,
             'total_preferences': total_preferences,
             'read_count': read_count,
             'snoozed_count': snoozed_count,
             'delivered_vs_read_rate': round((read_count / total_preferences * 100) if total_preferences > 0 else 0, 1),
             'severity_breakdown': severity_counts,
-            'snoozed_per_alert': snoozed_per_alert
-        }
\ No newline at end of file
+            'snoozed_per_alert': snoozed_per_alert,
+            'snoozed_per_alert_page': {'limit': limit, 'offset': offset, 'sort_by': sort_by, 'total': total_alerts}
+        }
+    
+    def get_delivery_history(self, days: int = 30) -> List[dict]:
+        """Sent deliveries per day and channel, oldest first"""
+        start = datetime.combine(datetime.utcnow().date() - timedelta(days=days - 1), datetime.min.time())
+        history: Dict[str, Dict[str, int]] = {
+            (start.date() + timedelta(days=offset)).isoformat(): {} for offset in range(days)
+        }
+        
+        # Compacted days come from the rollups and recent ones from the live rows; a row is only ever in one
+        live_day = func.date(NotificationDelivery.delivered_at)
+        live = self.db.query(live_day, NotificationDelivery.delivery_type, func.count(NotificationDelivery.id)).filter(
+            NotificationDelivery.status == DeliveryStatus.SENT,
+            NotificationDelivery.delivered_at >= start
+        ).group_by(live_day, NotificationDelivery.delivery_type)
+        archived = self.db.query(
+            DeliveryRollup.day, DeliveryRollup.delivery_type, func.sum(DeliveryRollup.sent_count)
+        ).filter(DeliveryRollup.day >= start.date()).group_by(DeliveryRollup.day, DeliveryRollup.delivery_type)
+        
+        for day, delivery_type, count in [*live, *archived]:
+            channels = history.setdefault(str(day), {})
+            channel = delivery_type.value if delivery_type else 'unknown'
+            channels[channel] = channels.get(channel, 0) + count
+        
+        return [
+            {'day': day, 'sent': sum(channels.values()), 'by_channel': channels}
+            for day, channels in sorted(history.items())
+        ]
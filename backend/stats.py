@@ -0,0 +1,171 @@
+"""
+Incrementally maintained per-alert counters (the alert_stats table).
+
+Services bump the counters in the same transaction as the change they
+describe; `rebuild` recomputes them from user_alert_preferences,
+notification_deliveries and delivery_rollups, and `reconcile` reports and
+repairs drift.
+
+    python stats.py rebuild
+    python stats.py reconcile
+"""
+
+import sys
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+from sqlalchemy import case, delete, func, insert, select, union_all, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from models import Alert, AlertStats, DeliveryRollup, NotificationDelivery, UserAlertPreference, DeliveryStatus
+from versions import touch
+
+COUNTERS = ('targeted_count', 'delivered_count', 'read_count', 'snoozed_count')
+
+# The counters' version is split by alert id, so writers to different alerts don't all
+# queue on one resource_versions row; readers of the counters depend on every shard
+STATS_SHARDS = 64
+STATS_RESOURCES = tuple(f"stats:{shard}" for shard in range(STATS_SHARDS))
+
+def touch_stats(db, alert_ids: Optional[Iterable[int]] = None):
+    """Bump the counter versions covering `alert_ids`, or all of them"""
+    if alert_ids is None:
+        touch(db, *STATS_RESOURCES)
+    else:
+        touch(db, *{STATS_RESOURCES[alert_id % STATS_SHARDS] for alert_id in alert_ids})
+
+def _recomputed(alert_ids: Optional[Iterable[int]] = None):
+    """SELECT of freshly computed counters, one row per alert"""
+    preferences = select(
+        UserAlertPreference.alert_id,
+        func.count(UserAlertPreference.id).label('targeted'),
+        func.sum(case((UserAlertPreference.is_read == True, 1), else_=0)).label('read'),
+        func.sum(case((UserAlertPreference.is_snoozed == True, 1), else_=0)).label('snoozed')
+    ).group_by(UserAlertPreference.alert_id).subquery()
+    # Deliveries compacted by retention.py only survive as daily rollups
+    sent_rows = union_all(
+        select(NotificationDelivery.alert_id, func.count(NotificationDelivery.id).label('delivered'))
+        .where(NotificationDelivery.status == DeliveryStatus.SENT).group_by(NotificationDelivery.alert_id),
+        select(DeliveryRollup.alert_id, func.sum(DeliveryRollup.sent_count).label('delivered'))
+        .group_by(DeliveryRollup.alert_id)
+    ).subquery()
+    sent = select(
+        sent_rows.c.alert_id, func.sum(sent_rows.c.delivered).label('delivered')
+    ).group_by(sent_rows.c.alert_id).subquery()
+    
+    query = select(
+        Alert.id,
+        func.coalesce(preferences.c.targeted, 0),
+        func.coalesce(sent.c.delivered, 0),
+        func.coalesce(preferences.c.read, 0),
+        func.coalesce(preferences.c.snoozed, 0)
+    ).outerjoin(preferences, preferences.c.alert_id == Alert.id).outerjoin(sent, sent.c.alert_id == Alert.id)
+    if alert_ids is not None:
+        query = query.where(Alert.id.in_(list(alert_ids)))
+    return query
+
+def rebuild_alert_stats(conn: Union[Connection, Session], alert_ids: Optional[Iterable[int]] = None) -> int:
+    """Recompute counters from scratch, for every alert or just `alert_ids`"""
+    alert_ids = None if alert_ids is None else list(alert_ids)
+    cleared = delete(AlertStats)
+    if alert_ids is not None:
+        cleared = cleared.where(AlertStats.alert_id.in_(alert_ids))
+    conn.execute(cleared)
+    return conn.execute(
+        insert(AlertStats).from_select(['alert_id', *COUNTERS], _recomputed(alert_ids))
+    ).rowcount
+
+class AlertStatsService:
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def record_fanout(self, alert_id: int, targeted: int, delivered: int = 0):
+        self.record_fanouts({alert_id: (targeted, delivered)})
+    
+    def record_fanouts(self, counts: Dict[int, Tuple[int, int]]):
+        """Create counter rows for new alerts from {alert_id: (targeted, delivered)}"""
+        if not counts:
+            return
+        self.db.execute(insert(AlertStats), [
+            dict(alert_id=alert_id, targeted_count=targeted, delivered_count=delivered,
+                 read_count=0, snoozed_count=0)
+            for alert_id, (targeted, delivered) in counts.items()
+        ])
+        touch_stats(self.db, counts)
+    
+    def bump(self, alert_id: int, **deltas: int):
+        """Add deltas to one alert's counters, e.g. bump(7, read_count=1)"""
+        values = {name: getattr(AlertStats, name) + delta for name, delta in deltas.items() if delta}
+        if not values:
+            return
+        touch_stats(self.db, [alert_id])
+        updated = self.db.execute(
+            update(AlertStats).where(AlertStats.alert_id == alert_id).values(**values),
+            execution_options={"synchronize_session": False}
+        ).rowcount
+        if not updated:
+            # Alert predates the counters table; computing it also covers this change
+            rebuild_alert_stats(self.db, [alert_id])
+    
+    def bump_many(self, counter: str, deltas: Dict[int, int]):
+        """Add {alert_id: delta} to one counter with an UPDATE per distinct delta"""
+        by_delta: Dict[int, List[int]] = {}
+        for alert_id, delta in deltas.items():
+            if delta:
+                by_delta.setdefault(delta, []).append(alert_id)
+        if not by_delta:
+            return
+        touch_stats(self.db, [alert_id for alert_ids in by_delta.values() for alert_id in alert_ids])
+        column = getattr(AlertStats, counter)
+        for delta, alert_ids in by_delta.items():
+            updated = self.db.execute(
+                update(AlertStats).where(AlertStats.alert_id.in_(alert_ids)).values({counter: column + delta}),
+                execution_options={"synchronize_session": False}
+            ).rowcount
+            if updated < len(alert_ids):
+                existing = set(self.db.scalars(select(AlertStats.alert_id).where(AlertStats.alert_id.in_(alert_ids))))
+                rebuild_alert_stats(self.db, [alert_id for alert_id in alert_ids if alert_id not in existing])
+    
+    def rebuild(self) -> int:
+        rebuilt = rebuild_alert_stats(self.db)
+        touch_stats(self.db)
+        self.db.commit()
+        return rebuilt
+    
+    def reconcile(self) -> List[dict]:
+        """Compare counters with a fresh computation, repair drifted alerts and report them"""
+        stored = {
+            row.alert_id: tuple(getattr(row, name) for name in COUNTERS)
+            for row in self.db.query(AlertStats)
+        }
+        drifted = []
+        for alert_id, *fresh in self.db.execute(_recomputed()):
+            current = stored.get(alert_id)
+            if current != tuple(fresh):
+                drifted.append({
+                    'alert_id': alert_id,
+                    'stored': dict(zip(COUNTERS, current)) if current else None,
+                    'actual': dict(zip(COUNTERS, fresh))
+                })
+        if drifted:
+            rebuild_alert_stats(self.db, [item['alert_id'] for item in drifted])
+            touch_stats(self.db, [item['alert_id'] for item in drifted])
+        self.db.commit()
+        return drifted
+
+if __name__ == "__main__":
+    from database import SessionLocal, create_tables
+    
+    command = sys.argv[1] if len(sys.argv) > 1 else "reconcile"
+    create_tables()
+    db = SessionLocal()
+    try:
+        if command == "rebuild":
+            print(f"Rebuilt counters for {AlertStatsService(db).rebuild()} alerts")
+        elif command == "reconcile":
+            drifted = AlertStatsService(db).reconcile()
+            for item in drifted:
+                print(f"Alert {item['alert_id']}: {item['stored']} -> {item['actual']}")
+            print(f"{len(drifted)} alerts repaired")
+        else:
+            sys.exit(f"Unknown command {command!r}; use 'rebuild' or 'reconcile'")
+    finally:
+        db.close()
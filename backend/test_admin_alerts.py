@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the admin alert listing
+"""
+
+from datetime import datetime, timedelta
+from models import Alert, User, Team, SeverityLevel, VisibilityType
+from services import AlertService, NotificationObserver
+from audience import audience_cache
+from testutils import make_engine, make_session, count_queries
+
+def seed_alerts(db, alert_service, count, team_id):
+    kinds = [(VisibilityType.ORGANIZATION, None), (VisibilityType.TEAM, team_id), (VisibilityType.USER, 1)]
+    for i in range(count):
+        visibility, target_id = kinds[i % 3]
+        alert_service.create_alert({
+            'title': f"Alert {i}", 'message': 'Admin listing', 'severity': SeverityLevel.INFO,
+            'visibility_type': visibility, 'target_id': target_id
+        }, created_by=1)
+
+def test_listing_uses_constant_queries():
+    print("Testing admin alert listing...")
+    engine = make_engine()
+    db = make_session(engine)
+    ops = Team(name="Ops")
+    db.add(ops)
+    db.flush()
+    db.add_all([User(name=f"User {i}", email=f"user{i}@company.com", team_id=ops.id if i < 3 else None)
+                for i in range(5)])
+    db.commit()
+
+    alert_service = AlertService(db)
+    alert_service.add_observer(NotificationObserver(db, alert_service))
+    seed_alerts(db, alert_service, 3, ops.id)
+    _, small = count_queries(engine, lambda: alert_service.get_admin_alerts())
+    seed_alerts(db, alert_service, 30, ops.id)
+    (alerts, total), large = count_queries(engine, lambda: alert_service.get_admin_alerts())
+    assert small == large
+    assert total is None and len(alerts) == 33
+    assert [a['total_users'] for a in alerts[:3]] == [5, 3, 1]
+
+    alert_service.mark_as_read(1, alerts[0]['id'])
+    alert_service.snooze_alert(2, alerts[0]['id'])
+    first = alert_service.get_admin_alerts(sort_by='read_count', order='desc', limit=1)
+    assert first[1] == 33
+    assert first[0][0]['id'] == alerts[0]['id']
+    assert (first[0][0]['read_count'], first[0][0]['snoozed_count']) == (1, 1)
+
+    expiring_id = alerts[1]['id']
+    db.get(Alert, expiring_id).expiry_time = datetime.utcnow() - timedelta(hours=1)
+    db.commit()
+    expired, _ = alert_service.get_admin_alerts(status='expired')
+    assert [a['id'] for a in expired] == [expiring_id]
+
+    db.close()
+
+def test_cold_audience_cache_keeps_constant_queries():
+    print("Testing admin listing with a cold audience cache...")
+    engine = make_engine()
+    db = make_session(engine)
+    teams = [Team(name=f"Team {i}") for i in range(40)]
+    db.add_all(teams)
+    db.flush()
+    db.add_all([User(name=f"User {i}", email=f"user{i}@company.com", team_id=teams[i % 40].id) for i in range(80)])
+    db.commit()
+
+    alert_service = AlertService(db)
+    def create(count, start):
+        # Every alert gets its own team or user target, the org alert aside
+        for i in range(start, start + count):
+            visibility, target_id = [(VisibilityType.TEAM, teams[i].id), (VisibilityType.USER, i + 1)][i % 2]
+            alert_service.create_alert({
+                'title': f"Alert {i}", 'message': 'Cold', 'severity': SeverityLevel.INFO,
+                'visibility_type': visibility, 'target_id': target_id
+            }, created_by=1)
+
+    create(3, 0)
+    alert_service.create_alert({'title': 'Org', 'message': 'Cold', 'severity': SeverityLevel.INFO,
+                                'visibility_type': VisibilityType.ORGANIZATION}, created_by=1)
+    audience_cache.clear()
+    (alerts, _), small = count_queries(engine, lambda: alert_service.get_admin_alerts())
+    create(30, 3)
+    audience_cache.clear()
+    (alerts, _), large = count_queries(engine, lambda: alert_service.get_admin_alerts())
+    assert small == large
+    sizes = {a['title']: a['total_users'] for a in alerts}
+    assert sizes['Org'] == 80 and sizes['Alert 0'] == 2 and sizes['Alert 1'] == 1
+
+    # Warm sizes are served without counting again
+    _, warm = count_queries(engine, lambda: alert_service.get_admin_alerts())
+    assert warm < large
+    db.close()
+
+if __name__ == "__main__":
+    test_listing_uses_constant_queries()
+    test_cold_audience_cache_keeps_constant_queries()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the dashboard aggregation
+"""
+
+from models import User, Team, Alert, UserAlertPreference, NotificationDelivery, SeverityLevel, VisibilityType, DeliveryStatus
+from services import AlertService, NotificationObserver, AnalyticsService
+from testutils import make_session
+
+def seed(db):
+    ops, sales, empty = Team(name="Ops"), Team(name="Sales"), Team(name="Empty")
+    db.add_all([ops, sales, empty])
+    db.flush()
+    db.add_all([User(name=f"User {i}", email=f"user{i}@company.com", team_id=ops.id if i < 5 else sales.id)
+                for i in range(8)])
+    db.commit()
+
+    alert_service = AlertService(db)
+    alert_service.add_observer(NotificationObserver(db, alert_service))
+    audiences = [(VisibilityType.ORGANIZATION, None), (VisibilityType.TEAM, ops.id), (VisibilityType.TEAM, sales.id),
+                 (VisibilityType.USER, 2), (VisibilityType.TEAM, empty.id), (VisibilityType.ORGANIZATION, None),
+                 (VisibilityType.TEAM, ops.id)]
+    severities = list(SeverityLevel)
+    alerts = [alert_service.create_alert({
+        'title': f"Alert {i}", 'message': 'Dashboard', 'severity': severities[i % len(severities)],
+        'visibility_type': visibility, 'target_id': target_id
+    }, created_by=1) for i, (visibility, target_id) in enumerate(audiences)]
+
+    # Reads and snoozes spread unevenly so every ordering differs
+    for alert, readers, snoozers in zip(alerts, [[1, 2, 3], [1], [6, 7, 8], [2], [], [1, 2, 3, 4, 5, 6], [1, 2]],
+                                        [[4], [2, 3, 4], [], [2], [], [7], [3, 4, 5]]):
+        for user_id in readers:
+            alert_service.mark_as_read(user_id, alert.id)
+        for user_id in snoozers:
+            alert_service.snooze_alert(user_id, alert.id)
+    alerts[-1].is_active = False
+    db.commit()
+    return [alert.id for alert in alerts]
+
+def per_alert_loop(db):
+    """Counts the way the dashboard computed them before the aggregation, one query per figure"""
+    entries = {}
+    for alert in db.query(Alert).all():
+        preferences = db.query(UserAlertPreference).filter(UserAlertPreference.alert_id == alert.id)
+        delivered = preferences.count()
+        read = preferences.filter(UserAlertPreference.is_read == True).count()
+        entries[alert.id] = {
+            'alert_id': alert.id,
+            'title': alert.title,
+            'severity': alert.severity.value,
+            'delivered': delivered,
+            'read': read,
+            'snoozed': preferences.filter(UserAlertPreference.is_snoozed == True).count(),
+            'notifications_sent': db.query(NotificationDelivery).filter(
+                NotificationDelivery.alert_id == alert.id,
+                NotificationDelivery.status == DeliveryStatus.SENT
+            ).count(),
+            'read_rate': round((read / delivered * 100) if delivered > 0 else 0, 1)
+        }
+    return entries
+
+def test_counts_match_per_alert_loop():
+    print("Testing dashboard counts...")
+    db = make_session()
+    seed(db)
+    expected = per_alert_loop(db)
+    metrics = AnalyticsService(db).get_dashboard_metrics(limit=100)
+
+    assert {entry['alert_id']: entry for entry in metrics['snoozed_per_alert']} == expected
+    assert metrics['total_alerts'] == 7 and metrics['active_alerts'] == 6
+    assert metrics['total_preferences'] == db.query(UserAlertPreference).count()
+    assert metrics['read_count'] == db.query(UserAlertPreference).filter(UserAlertPreference.is_read == True).count()
+    assert metrics['snoozed_count'] == db.query(UserAlertPreference).filter(UserAlertPreference.is_snoozed == True).count()
+    assert metrics['total_deliveries'] == db.query(NotificationDelivery).count()
+    assert metrics['delivered_vs_read_rate'] == round(metrics['read_count'] / metrics['total_preferences'] * 100, 1)
+    assert metrics['severity_breakdown'] == {
+        severity.value: db.query(Alert).filter(Alert.severity == severity, Alert.is_active == True).count()
+        for severity in SeverityLevel
+    }
+    db.close()
+
+def test_sort_orders():
+    print("Testing dashboard orderings...")
+    db = make_session()
+    seed(db)
+    entries = list(per_alert_loop(db).values())
+    keys = {
+        'snoozed': lambda e: (e['snoozed'], e['alert_id']),
+        'read_rate': lambda e: (e['read'] / e['delivered'] if e['delivered'] else 0, e['alert_id']),
+        'delivered': lambda e: (e['delivered'], e['alert_id']),
+        'recent': lambda e: e['alert_id']
+    }
+    analytics = AnalyticsService(db)
+    for sort_by in AnalyticsService.ALERT_SORTS:
+        expected = [e['alert_id'] for e in sorted(entries, key=keys[sort_by], reverse=True)]
+        top = analytics.get_dashboard_metrics(limit=3, sort_by=sort_by)
+        assert [e['alert_id'] for e in top['snoozed_per_alert']] == expected[:3], sort_by
+        assert top['snoozed_per_alert_page'] == {'limit': 3, 'offset': 0, 'sort_by': sort_by, 'total': 7}
+
+    try:
+        analytics.get_dashboard_metrics(sort_by='title')
+        assert False, "unknown sort_by should be rejected"
+    except ValueError:
+        pass
+    db.close()
+
+def test_pagination():
+    print("Testing dashboard pagination...")
+    db = make_session()
+    seed(db)
+    analytics = AnalyticsService(db)
+    for sort_by in AnalyticsService.ALERT_SORTS:
+        full = [e['alert_id'] for e in analytics.get_dashboard_metrics(limit=100, sort_by=sort_by)['snoozed_per_alert']]
+        pages = []
+        for offset in range(0, 8, 3):
+            page = analytics.get_dashboard_metrics(limit=3, offset=offset, sort_by=sort_by)['snoozed_per_alert']
+            assert len(page) == min(3, 7 - offset)
+            pages += [e['alert_id'] for e in page]
+        assert pages == full and len(set(full)) == 7
+    assert analytics.get_dashboard_metrics(offset=7)['snoozed_per_alert'] == []
+    db.close()
+
+if __name__ == "__main__":
+    test_counts_match_per_alert_loop()
+    test_sort_orders()
+    test_pagination()
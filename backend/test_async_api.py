@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the async request path
+"""
+
+import asyncio
+import os
+import tempfile
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from models import Base, User, Team
+from database import get_async_db
+from main import app
+
+def make_app(workdir):
+    path = os.path.join(workdir, 'api.db')
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    ops = Team(name="Ops")
+    db.add(ops)
+    db.flush()
+    db.add_all([User(name=f"User {i}", email=f"user{i}@company.com", team_id=ops.id) for i in range(5)])
+    db.commit()
+    db.close()
+    engine.dispose()
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    sessions = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    async def override():
+        async with sessions() as session:
+            yield session
+    app.dependency_overrides[get_async_db] = override
+    return async_engine
+
+async def exercise():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/admin/alerts", json={
+            'title': 'Async', 'message': 'Hello', 'severity': 'Warning', 'visibility_type': 'Organization'
+        })
+        assert response.status_code == 200
+        alert_id = response.json()['id']
+
+        # Concurrent inbox polls are served through the async session
+        inboxes = await asyncio.gather(*[client.get(f"/users/{i}/alerts") for i in range(1, 6)])
+        assert all(r.status_code == 200 and [a['id'] for a in r.json()] == [alert_id] for r in inboxes)
+
+        await client.post(f"/users/1/alerts/{alert_id}/snooze")
+        snoozed = (await client.get("/users/1/alerts/snoozed")).json()
+        assert [a['id'] for a in snoozed] == [alert_id]
+
+        user = (await client.post("/users", json={'name': 'New', 'email': 'new@company.com', 'team_id': 1})).json()
+        assert user['team_name'] == "Ops"
+        assert (await client.put("/admin/alerts/999/toggle")).status_code == 404
+
+def test_async_handlers():
+    print("Testing async handlers...")
+    with tempfile.TemporaryDirectory() as workdir:
+        async_engine = make_app(workdir)
+        try:
+            asyncio.run(exercise())
+            asyncio.run(async_engine.dispose())
+        finally:
+            app.dependency_overrides.clear()
+
+if __name__ == "__main__":
+    test_async_handlers()
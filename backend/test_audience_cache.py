@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the audience cache
+"""
+
+from models import User, Team, VisibilityType
+from audience import AudienceCache, audience_cache
+from testutils import make_session
+
+def test_cache_hits_invalidation_and_eviction():
+    print("Testing audience cache...")
+    db = make_session()
+    ops, sales = Team(name="Ops"), Team(name="Sales")
+    db.add_all([ops, sales])
+    db.flush()
+    db.add_all([User(name=f"User {i}", email=f"user{i}@company.com", team_id=ops.id if i < 4 else sales.id)
+                for i in range(6)])
+    db.commit()
+
+    cache = AudienceCache(max_ids=8)
+    assert list(cache.get_member_ids(db, VisibilityType.TEAM, ops.id)) == [1, 2, 3, 4]
+    assert cache.get_size(db, VisibilityType.TEAM, ops.id) == 4
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # Moving a user between teams invalidates both audiences and the org list
+    assert cache.get_size(db, VisibilityType.ORGANIZATION, None) == 6
+    user = db.get(User, 1)
+    user.team_id = sales.id
+    db.commit()
+    cache.user_changed(1, [ops.id, sales.id])
+    assert cache.get_size(db, VisibilityType.TEAM, ops.id) == 3
+    assert cache.get_size(db, VisibilityType.TEAM, sales.id) == 3
+
+    # 6 org ids + 3 + 3 exceeds max_ids, so least recently used entries were evicted
+    cache.get_size(db, VisibilityType.ORGANIZATION, None)
+    stats = cache.stats()
+    print(f"Cache stats: {stats}")
+    assert stats['cached_ids'] <= 8
+    assert stats['evictions'] >= 1
+    db.close()
+
+def test_sizes_are_counted_together():
+    print("Testing batched audience sizes...")
+    db = make_session()
+    ops, sales = Team(name="Ops"), Team(name="Sales")
+    db.add_all([ops, sales])
+    db.flush()
+    db.add_all([User(name=f"User {i}", email=f"user{i}@company.com", team_id=ops.id if i < 4 else sales.id)
+                for i in range(6)])
+    db.commit()
+
+    cache = AudienceCache()
+    keys = [(VisibilityType.ORGANIZATION, None), (VisibilityType.TEAM, ops.id), (VisibilityType.TEAM, sales.id),
+            (VisibilityType.TEAM, 99), (VisibilityType.USER, 2), (VisibilityType.USER, 99)]
+    expected = dict(zip(keys, [6, 4, 2, 0, 1, 0]))
+    assert cache.get_sizes(db, keys) == expected
+    assert (cache.hits, cache.misses) == (0, 6)
+    assert cache.get_sizes(db, keys) == expected
+    assert cache.hits == 6
+
+    # Invalidation drops cached sizes too
+    user = db.get(User, 1)
+    user.team_id = sales.id
+    db.commit()
+    cache.user_changed(1, [ops.id, sales.id])
+    sizes = cache.get_sizes(db, keys)
+    assert sizes[(VisibilityType.TEAM, ops.id)] == 3 and sizes[(VisibilityType.TEAM, sales.id)] == 3
+    db.close()
+
+def test_committed_deletes_invalidate():
+    print("Testing audience invalidation on deletes...")
+    db = make_session()
+    ops, sales = Team(name="Ops"), Team(name="Sales")
+    db.add_all([ops, sales])
+    db.flush()
+    db.add_all([User(name=f"User {i}", email=f"user{i}@company.com", team_id=ops.id if i < 4 else sales.id)
+                for i in range(6)])
+    db.commit()
+    audience_cache.clear()
+    assert list(audience_cache.get_member_ids(db, VisibilityType.TEAM, ops.id)) == [1, 2, 3, 4]
+    assert audience_cache.get_sizes(db, [(VisibilityType.ORGANIZATION, None)])[(VisibilityType.ORGANIZATION, None)] == 6
+
+    # A rolled back delete keeps the cached audience
+    db.delete(db.get(User, 2))
+    db.flush()
+    db.rollback()
+    hits = audience_cache.hits
+    assert list(audience_cache.get_member_ids(db, VisibilityType.TEAM, ops.id)) == [1, 2, 3, 4]
+    assert audience_cache.hits == hits + 1
+
+    # Deleting a member, or moving one out, drops the cached ids without calling the hooks
+    db.delete(db.get(User, 2))
+    db.get(User, 3).team_id = sales.id
+    db.commit()
+    assert list(audience_cache.get_member_ids(db, VisibilityType.TEAM, ops.id)) == [1, 4]
+    assert audience_cache.get_sizes(db, [(VisibilityType.ORGANIZATION, None)])[(VisibilityType.ORGANIZATION, None)] == 5
+
+    assert list(audience_cache.get_member_ids(db, VisibilityType.TEAM, sales.id)) == [3, 5, 6]
+    sales_id = sales.id
+    db.delete(sales)
+    db.commit()
+    assert list(audience_cache.get_member_ids(db, VisibilityType.TEAM, sales_id)) == []
+    db.close()
+
+if __name__ == "__main__":
+    test_cache_hits_invalidation_and_eviction()
+    test_sizes_are_counted_together()
+    test_committed_deletes_invalidate()
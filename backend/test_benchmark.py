@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the data generator and benchmark scenarios
+"""
+
+import random
+from sqlalchemy import func
+from sqlalchemy.orm import sessionmaker
+from models import Alert, AlertStats, User, UserAlertPreference
+from datagen import generate
+from benchmark import QueryCounter, bench_inbox, bench_reminders
+from testutils import make_engine
+
+def test_generate_is_reproducible():
+    print("Testing synthetic data generation...")
+    sizes = {'users': 300, 'teams': 10, 'alerts': 40}
+    first, second = make_engine(), make_engine()
+    counts = generate(first, sizes, seed=7)
+    assert generate(second, sizes, seed=7) == counts
+
+    db = sessionmaker(bind=first)()
+    assert db.query(User).count() == 300 and db.query(Alert).count() == 40
+    assert db.query(UserAlertPreference).count() == counts['preferences'] > 0
+    # Counters are built for the generated rows
+    assert db.query(func.sum(AlertStats.targeted_count)).scalar() == counts['preferences']
+    db.close()
+
+def test_scenarios_report_timings_and_queries():
+    engine = make_engine()
+    sizes = generate(engine, {'users': 200, 'teams': 5, 'alerts': 20}, seed=1)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    counter = QueryCounter(engine)
+
+    inbox = bench_inbox(Session, counter, sizes, 5, random.Random(1))
+    print(f"Inbox scenario: {inbox}")
+    assert inbox['iterations'] == 5 and inbox['queries_per_call'] == 1.0
+
+    reminders = bench_reminders(Session, counter, 1)
+    assert reminders['reminders_per_second'] > 0 and reminders['batches_per_pass'] >= 1
+
+if __name__ == "__main__":
+    test_generate_is_reproducible()
+    test_scenarios_report_timings_and_queries()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Test script to verify bulk alert creation
+"""
+
+from models import (User, Team, AlertStats, UserAlertPreference, NotificationDelivery,
+                    SeverityLevel, VisibilityType, DeliveryStatus)
+from services import AlertService, NotificationObserver
+from testutils import make_engine, make_session, capture_queries
+
+def test_bulk_create_with_rejections():
+    print("Testing bulk alert creation...")
+    engine = make_engine()
+    db = make_session(engine)
+    ops = Team(name="Ops")
+    db.add(ops)
+    db.flush()
+    db.add_all([User(name=f"User {i}", email=f"user{i}@company.com", team_id=ops.id if i < 40 else None)
+                for i in range(100)])
+    db.commit()
+
+    items = []
+    for i in range(60):
+        visibility, target_id = [(VisibilityType.ORGANIZATION, None), (VisibilityType.TEAM, ops.id),
+                                 (VisibilityType.USER, 5)][i % 3]
+        items.append({'title': f"Incident {i}", 'message': 'Bulk', 'severity': SeverityLevel.CRITICAL,
+                      'visibility_type': visibility, 'target_id': target_id})
+    items[7] = dict(items[7], target_id=999)            # unknown team
+    items[11] = dict(items[11], target_id=None)         # user alert without a target
+
+    alert_service = AlertService(db, queue_deliveries=True)
+    observer = NotificationObserver(db, alert_service, chunk_size=500)
+    alert_service.add_observer(observer)
+
+    with capture_queries(engine) as statements:
+        created, errors = alert_service.create_alerts(items, created_by=1)
+
+    assert sorted(errors) == [7, 11] and "does not exist" in errors[7]
+    assert len(created) == 58 and 7 not in created
+
+    # 20 org alerts x 100 users + 19 team alerts x 40 + 19 user alerts x 1
+    expected = 20 * 100 + 19 * 40 + 19
+    print(f"Fan-out stats: {observer.last_fanout}, {len(statements)} statements")
+    assert observer.last_fanout['audiences'] == 3
+    assert observer.last_fanout['preferences'] == expected
+    assert db.query(UserAlertPreference).count() == expected
+    assert db.query(NotificationDelivery).filter(NotificationDelivery.status == DeliveryStatus.QUEUED).count() == expected
+    assert db.query(AlertStats).count() == 58
+
+    # One audience query per distinct audience, not per alert
+    audience_lookups = [s for s in statements if s.startswith("SELECT users.id AS users_id")]
+    assert len(audience_lookups) == 3
+    preference_inserts = [s for s in statements if s.startswith("INSERT INTO user_alert_preferences")]
+    assert len(preference_inserts) <= expected // 500 + 1
+
+    db.close()
+
+if __name__ == "__main__":
+    test_bulk_create_with_rejections()
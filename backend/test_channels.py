@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Test script to verify batched channel sends
+"""
+
+from services import (EmailNotificationChannel, SlackNotificationChannel, NotificationChannel, channel_failed_total,
+                      channel_sent_total)
+from metrics import registry
+from providers import FakeProvider
+from models import Alert, User, SeverityLevel, DeliveryType, VisibilityType
+
+class LegacyChannel(NotificationChannel):
+    def send(self, user: User, alert: Alert) -> bool:
+        if user.id == 3:
+            raise RuntimeError("boom")
+        return user.id % 2 == 1
+
+def make_alert():
+    return Alert(
+        id=1,
+        title="Batch Alert",
+        message="Testing send_many",
+        severity=SeverityLevel.WARNING,
+        delivery_type=DeliveryType.EMAIL,
+        visibility_type=VisibilityType.ORGANIZATION
+    )
+
+def test_send_many_chunks_provider_calls():
+    print("Testing batched sends...")
+    users = [User(id=i, name=f"User {i}", email=f"user{i}@company.com") for i in range(1, 251)]
+    provider = FakeProvider("email", max_batch_size=100)
+    channel = EmailNotificationChannel(provider=provider, batch_size=100)
+
+    results = channel.send_many(users, make_alert())
+
+    assert provider.calls == 3
+    assert provider.messages == 250
+    assert len(results) == 250 and all(results.values())
+
+def test_send_many_reports_failed_batches_per_recipient():
+    users = [User(id=i, name=f"User {i}", email=f"user{i}@company.com") for i in range(1, 6)]
+    channel = SlackNotificationChannel(provider=FakeProvider("slack", max_batch_size=2), batch_size=3)
+
+    results = channel.send_many(users, make_alert())
+
+    # The first batch of 3 exceeds the provider limit; the trailing batch of 2 still goes out
+    assert results == {1: False, 2: False, 3: False, 4: True, 5: True}
+
+def test_send_many_falls_back_to_send():
+    users = [User(id=i, name=f"User {i}", email=f"user{i}@company.com") for i in range(1, 5)]
+    results = LegacyChannel().send_many(users, make_alert())
+    print(f"Fallback results: {results}")
+    assert results == {1: True, 2: False, 3: False, 4: False}
+
+def test_sends_are_counted_per_channel():
+    print("Testing channel metrics...")
+    users = [User(id=i, name=f"User {i}", email=f"user{i}@company.com") for i in range(1, 6)]
+    sent, failed = channel_sent_total.value(channel="Slack"), channel_failed_total.value(channel="Slack")
+    SlackNotificationChannel(provider=FakeProvider("slack", max_batch_size=2), batch_size=3).send_many(
+        users, make_alert())
+    assert channel_sent_total.value(channel="Slack") == sent + 2
+    assert channel_failed_total.value(channel="Slack") == failed + 3
+
+    # Channels without a label are counted under their class name
+    legacy = channel_sent_total.value(channel="LegacyChannel")
+    LegacyChannel().send_many(users[:4], make_alert())
+    assert channel_sent_total.value(channel="LegacyChannel") == legacy + 1
+    assert 'notification_send_seconds_count{channel="Slack"}' in registry.render()
+
+if __name__ == "__main__":
+    test_send_many_chunks_provider_calls()
+    test_send_many_reports_failed_batches_per_recipient()
+    test_send_many_falls_back_to_send()
+    test_sends_are_counted_per_channel()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test script to verify ETag revalidation and the response cache
+"""
+
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timedelta
+import httpx
+from sqlalchemy import create_engine, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from models import Base, User, Team, UserAlertPreference, SeverityLevel, VisibilityType
+from services import AlertService, NotificationObserver
+from database import get_async_db
+from versions import etag_matches, response_cache
+from main import app
+
+def make_app(workdir):
+    path = os.path.join(workdir, 'etag.db')
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    ops = Team(name="Ops")
+    db.add(ops)
+    db.flush()
+    db.add_all([User(name="Alice", email="alice@company.com", team_id=ops.id),
+                User(name="Bob", email="bob@company.com", team_id=ops.id)])
+    db.commit()
+    alert_service = AlertService(db)
+    alert_service.add_observer(NotificationObserver(db, alert_service))
+    alert = alert_service.create_alert({
+        'title': 'Cached', 'message': 'Hello', 'severity': SeverityLevel.INFO,
+        'visibility_type': VisibilityType.ORGANIZATION
+    }, created_by=1)
+    alert_id = alert.id
+    db.close()
+    engine.dispose()
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    sessions = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    async def override():
+        async with sessions() as session:
+            yield session
+    app.dependency_overrides[get_async_db] = override
+    return async_engine, alert_id, path
+
+def write_from_another_process(path):
+    subprocess.run([sys.executable, "stats.py", "rebuild"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                   env={**os.environ, "DATABASE_URL": f"sqlite:///{path}"}, check=True, capture_output=True)
+
+async def exercise(alert_id, path):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        first = await client.get("/users/1/alerts")
+        etag = first.headers["etag"]
+        bob_etag = (await client.get("/users/2/alerts")).headers["etag"]
+
+        hits = response_cache.stats()['hits']
+        again = await client.get("/users/1/alerts")
+        assert again.content == first.content and response_cache.stats()['hits'] == hits + 1
+
+        unchanged = await client.get("/users/1/alerts", headers={"If-None-Match": etag})
+        assert unchanged.status_code == 304 and unchanged.headers["etag"] == etag
+
+        # Alice's write only invalidates Alice's inbox
+        await client.post(f"/users/1/alerts/{alert_id}/read")
+        changed = await client.get("/users/1/alerts", headers={"If-None-Match": etag})
+        assert changed.status_code == 200 and changed.json()[0]['is_read'] is True
+        assert changed.headers["etag"] != etag
+        assert (await client.get("/users/2/alerts", headers={"If-None-Match": bob_etag})).status_code == 304
+
+        teams_etag = (await client.get("/teams")).headers["etag"]
+        await client.post("/teams", json={'name': 'Sales'})
+        teams = await client.get("/teams", headers={"If-None-Match": teams_etag})
+        assert teams.status_code == 200 and len(teams.json()) == 2
+
+        analytics = await client.get("/analytics")
+        assert (await client.get("/analytics", headers={"If-None-Match": analytics.headers["etag"]})).status_code == 304
+        write_from_another_process(path)
+        assert (await client.get("/analytics", headers={"If-None-Match": analytics.headers["etag"]})).status_code == 200
+        assert (await client.get("/analytics", params={'sort_by': 'bogus'})).status_code == 400
+
+        # A snooze that lapses on its own changes the ETag without any write
+        analytics = await client.get("/analytics")
+        await client.post(f"/users/2/alerts/{alert_id}/snooze")
+        assert (await client.get("/analytics", headers={"If-None-Match": analytics.headers["etag"]})).status_code == 200
+        engine = create_engine(f"sqlite:///{path}")
+        with engine.begin() as conn:
+            conn.execute(update(UserAlertPreference).where(UserAlertPreference.user_id == 2).values(
+                snoozed_until=datetime.utcnow() + timedelta(seconds=1)))
+        engine.dispose()
+        snoozed = await client.get("/users/2/alerts")
+        assert snoozed.json()[0]['is_snoozed'] is True
+        await asyncio.sleep(1.1)
+        lapsed = await client.get("/users/2/alerts", headers={"If-None-Match": snoozed.headers["etag"]})
+        assert lapsed.status_code == 200 and lapsed.json()[0]['is_snoozed'] is False
+
+def test_conditional_get():
+    print("Testing conditional GETs...")
+    with tempfile.TemporaryDirectory() as workdir:
+        async_engine, alert_id, path = make_app(workdir)
+        try:
+            asyncio.run(exercise(alert_id, path))
+            asyncio.run(async_engine.dispose())
+        finally:
+            app.dependency_overrides.clear()
+
+def test_etag_matching():
+    assert etag_matches('W/"a-1"', 'W/"a-1"')
+    assert etag_matches('"x", "a-1"', 'W/"a-1"')
+    assert etag_matches('*', 'W/"a-1"')
+    assert not etag_matches(None, 'W/"a-1"')
+
+if __name__ == "__main__":
+    test_conditional_get()
+    test_etag_matching()
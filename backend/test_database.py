@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Test script to verify engine configuration and pool metrics
+"""
+
+import os
+import tempfile
+import threading
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+from models import Base, Team
+from database import PoolMetrics, async_url, make_engine
+
+def test_async_url_translation():
+    assert async_url("sqlite:///./alerts.db") == "sqlite+aiosqlite:///./alerts.db"
+    assert async_url("postgres://app:secret@db/alerts") == "postgresql+asyncpg://app:secret@db/alerts"
+    assert async_url("postgresql+psycopg2://db/alerts") == "postgresql+asyncpg://db/alerts"
+
+def test_sqlite_concurrent_writers():
+    print("Testing concurrent SQLite writers...")
+    with tempfile.TemporaryDirectory() as workdir:
+        metrics = PoolMetrics()
+        engine = make_engine(f"sqlite:///{os.path.join(workdir, 'pool.db')}", metrics)
+        Base.metadata.create_all(bind=engine)
+        with engine.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+            assert conn.execute(text("PRAGMA busy_timeout")).scalar() > 0
+
+        Session = sessionmaker(bind=engine)
+        errors = []
+        def writer(worker):
+            try:
+                for i in range(25):
+                    with Session() as db:
+                        db.add(Team(name=f"Team {worker}-{i}"))
+                        db.commit()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        with Session() as db:
+            assert db.query(Team).count() == 200
+
+        stats = metrics.snapshot(engine.pool)
+        print(f"Pool stats: {stats}")
+        assert stats['checkouts'] >= 200 and stats['timeouts'] == 0
+        assert stats['checked_out'] == 0
+        assert 1 <= stats['connections_opened'] <= 15  # pool_size + max_overflow
+        engine.dispose()
+
+if __name__ == "__main__":
+    test_async_url_translation()
+    test_sqlite_concurrent_writers()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the durable delivery queue
+"""
+
+from models import User, NotificationDelivery, SeverityLevel, DeliveryType, DeliveryStatus, VisibilityType
+from services import AlertService, NotificationObserver, DeliveryQueue, NotificationChannel
+from testutils import make_session
+
+class FlakyChannel(NotificationChannel):
+    def __init__(self, failing_user_ids):
+        self.failing_user_ids = set(failing_user_ids)
+        self.sent = []
+
+    def send(self, user, alert) -> bool:
+        if user.id in self.failing_user_ids:
+            raise ConnectionError("provider unavailable")
+        self.sent.append(user.id)
+        return True
+
+def test_queue_lifecycle():
+    print("Testing delivery queue lifecycle...")
+    db = make_session()
+    db.add_all([User(name=f"User {i}", email=f"user{i}@company.com") for i in range(5)])
+    db.commit()
+
+    alert_service = AlertService(db, queue_deliveries=True)
+    alert_service.add_observer(NotificationObserver(db, alert_service))
+    alert = alert_service.create_alert({
+        'title': 'Queued',
+        'message': 'Sent by workers',
+        'severity': SeverityLevel.CRITICAL,
+        'delivery_type': DeliveryType.EMAIL,
+        'visibility_type': VisibilityType.ORGANIZATION
+    }, created_by=1)
+
+    queued = db.query(NotificationDelivery).filter(NotificationDelivery.alert_id == alert.id).all()
+    assert len(queued) == 5
+    assert all(d.status == DeliveryStatus.QUEUED and d.delivered_at is None for d in queued)
+
+    delivery_queue = DeliveryQueue(db, max_attempts=2, backoff_seconds=0)
+    channel = FlakyChannel(failing_user_ids=[1])
+
+    token = delivery_queue.claim(DeliveryType.EMAIL, limit=10)
+    assert token is not None
+    assert delivery_queue.claim(DeliveryType.EMAIL, limit=10) is None  # leased rows are not re-claimed
+    result = delivery_queue.deliver(delivery_queue.claimed(token), channel)
+    print(f"First pass: {result}")
+    assert result == {'sent': 4, 'failed': 1, 'deferred': 0, 'digests': 0}
+
+    retry = db.query(NotificationDelivery).filter(NotificationDelivery.user_id == 1).one()
+    assert retry.status == DeliveryStatus.QUEUED
+    assert retry.attempts == 1
+    assert retry.last_error == "channel reported failure"
+
+    token = delivery_queue.claim(DeliveryType.EMAIL, limit=10)
+    result = delivery_queue.deliver(delivery_queue.claimed(token), channel)
+    print(f"Second pass: {result}")
+    db.refresh(retry)
+    assert retry.status == DeliveryStatus.FAILED
+    assert retry.attempts == 2
+
+    sent = db.query(NotificationDelivery).filter(NotificationDelivery.status == DeliveryStatus.SENT).count()
+    assert sent == 4
+    assert sorted(channel.sent) == [2, 3, 4, 5]
+
+    db.close()
+    print("\nDelivery queue test completed!")
+
+if __name__ == "__main__":
+    test_queue_lifecycle()
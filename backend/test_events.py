@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Test script to verify inbox event streaming
+"""
+
+import asyncio
+import threading
+from models import User, Team, SeverityLevel, VisibilityType
+from services import AlertService, NotificationObserver, StreamObserver
+from events import EventBroker, event_broker, format_sse
+from testutils import make_session
+
+def drain(subscription):
+    events = []
+    while not subscription.queue.empty():
+        events.append(subscription.queue.get_nowait())
+    return events
+
+def test_broker_delivers_across_threads():
+    print("Testing event broker...")
+    async def scenario():
+        broker = EventBroker(queue_size=2)
+        subscription = broker.subscribe(7)
+        publisher = threading.Thread(target=lambda: [
+            broker.publish([7, 8], {'type': 'read', 'alert_id': n}) for n in range(3)
+        ])
+        publisher.start()
+        publisher.join()
+        await asyncio.sleep(0)
+
+        # The oldest event is dropped once the queue is full
+        assert [e['alert_id'] for e in drain(subscription)] == [1, 2]
+        assert broker.stats()['dropped'] == 1
+
+        broker.unsubscribe(subscription)
+        assert broker.subscribed_user_ids() == set()
+    asyncio.run(scenario())
+
+def test_alerts_and_state_changes_are_pushed():
+    print("Testing pushed inbox events...")
+    db = make_session()
+    ops, sales = Team(name="Ops"), Team(name="Sales")
+    db.add_all([ops, sales])
+    db.flush()
+    db.add_all([User(name="Alice", email="alice@company.com", team_id=ops.id),
+                User(name="Bob", email="bob@company.com", team_id=sales.id)])
+    db.commit()
+
+    async def scenario():
+        alice, bob = event_broker.subscribe(1), event_broker.subscribe(2)
+        try:
+            alert_service = AlertService(db)
+            alert_service.add_observer(NotificationObserver(db, alert_service))
+            alert_service.add_observer(StreamObserver(db))
+            alert = alert_service.create_alert({
+                'title': 'Ops only', 'message': 'Deploy freeze', 'severity': SeverityLevel.WARNING,
+                'visibility_type': VisibilityType.TEAM, 'target_id': ops.id
+            }, created_by=1)
+            alert_service.mark_as_read(1, alert.id)
+            alert_service.mark_as_read(1, alert.id)  # no change, no event
+            await asyncio.sleep(0)
+
+            events = drain(alice)
+            assert [e['type'] for e in events] == ['alert', 'read']
+            assert events[0]['alert']['id'] == alert.id and events[1]['alert_id'] == alert.id
+            assert format_sse(events[0]).startswith(f"id: {events[0]['id']}\nevent: alert\ndata: ")
+            assert drain(bob) == []
+        finally:
+            event_broker.unsubscribe(alice)
+            event_broker.unsubscribe(bob)
+    asyncio.run(scenario())
+    db.close()
+
+if __name__ == "__main__":
+    test_broker_delivers_across_threads()
+    test_alerts_and_state_changes_are_pushed()
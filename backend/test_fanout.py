@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Test script to verify bulk alert fan-out
+"""
+
+from models import User, Team, UserAlertPreference, NotificationDelivery, SeverityLevel, DeliveryType, VisibilityType
+from services import AlertService, NotificationObserver
+from testutils import make_session
+
+def test_bulk_fanout():
+    print("Testing bulk fan-out...")
+    db = make_session()
+
+    ops = Team(name="Ops")
+    db.add(ops)
+    db.flush()
+    db.add_all([
+        User(name=f"User {i}", email=f"user{i}@company.com", team_id=ops.id if i % 2 else None)
+        for i in range(1203)
+    ])
+    db.commit()
+
+    alert_service = AlertService(db)
+    observer = NotificationObserver(db, alert_service, chunk_size=250)
+    alert_service.add_observer(observer)
+
+    org_alert = alert_service.create_alert({
+        'title': 'Org-wide',
+        'message': 'Everyone gets this',
+        'severity': SeverityLevel.INFO,
+        'visibility_type': VisibilityType.ORGANIZATION
+    }, created_by=1)
+
+    print(f"Fan-out stats: {observer.last_fanout}")
+    assert observer.last_fanout['recipients'] == 1203
+    assert observer.last_fanout['preferences'] == 1203
+    assert observer.last_fanout['deliveries'] == 1203
+    assert db.query(UserAlertPreference).filter(UserAlertPreference.alert_id == org_alert.id).count() == 1203
+    assert db.query(NotificationDelivery).filter(NotificationDelivery.alert_id == org_alert.id).count() == 1203
+
+    team_alert = alert_service.create_alert({
+        'title': 'Ops only',
+        'message': 'Team alert',
+        'severity': SeverityLevel.WARNING,
+        'delivery_type': DeliveryType.EMAIL,
+        'visibility_type': VisibilityType.TEAM,
+        'target_id': ops.id
+    }, created_by=1)
+
+    assert observer.last_fanout['recipients'] == 601
+    assert db.query(UserAlertPreference).filter(UserAlertPreference.alert_id == team_alert.id).count() == 601
+
+    db.close()
+    print("\nBulk fan-out test completed!")
+
+if __name__ == "__main__":
+    test_bulk_fanout()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the single-query user inbox
+"""
+
+from models import User, Team, SeverityLevel, VisibilityType
+from services import AlertService, NotificationObserver
+from testutils import make_engine, make_session, capture_queries
+
+def test_inbox_visibility_and_paging():
+    print("Testing user inbox...")
+    engine = make_engine()
+    db = make_session(engine)
+    ops, sales = Team(name="Ops"), Team(name="Sales")
+    db.add_all([ops, sales])
+    db.flush()
+    alice = User(name="Alice", email="alice@company.com", team_id=ops.id)
+    bob = User(name="Bob", email="bob@company.com", team_id=sales.id)
+    db.add_all([alice, bob])
+    db.commit()
+
+    alert_service = AlertService(db)
+    alert_service.add_observer(NotificationObserver(db, alert_service))
+    def create(title, severity, visibility, target_id=None):
+        return alert_service.create_alert({
+            'title': title, 'message': title, 'severity': severity,
+            'visibility_type': visibility, 'target_id': target_id
+        }, created_by=1)
+
+    org = create("Org", SeverityLevel.INFO, VisibilityType.ORGANIZATION)
+    ops_alert = create("Ops", SeverityLevel.CRITICAL, VisibilityType.TEAM, ops.id)
+    create("Sales", SeverityLevel.INFO, VisibilityType.TEAM, sales.id)
+    direct = create("Direct", SeverityLevel.WARNING, VisibilityType.USER, alice.id)
+    archived = create("Archived", SeverityLevel.INFO, VisibilityType.ORGANIZATION)
+    archived.is_active = False
+    db.commit()
+    alert_service.mark_as_read(alice.id, org.id)
+
+    alice_id = alice.id
+    with capture_queries(engine) as statements:
+        inbox = alert_service.get_alerts_for_user(alice_id)
+    assert len(statements) == 1
+    assert [d['alert'].id for d in inbox] == [direct.id, ops_alert.id, org.id]
+    assert [d['is_read'] for d in inbox] == [False, False, True]
+
+    first_page = alert_service.get_alerts_for_user(alice.id, limit=2)
+    second_page = alert_service.get_alerts_for_user(alice.id, after=first_page[-1]['alert'].id, limit=2)
+    assert [d['alert'].id for d in first_page + second_page] == [direct.id, ops_alert.id, org.id]
+
+    unread = alert_service.get_alerts_for_user(alice.id, unread_only=True)
+    assert org.id not in [d['alert'].id for d in unread]
+    critical = alert_service.get_alerts_for_user(alice.id, severity=SeverityLevel.CRITICAL)
+    assert [d['alert'].id for d in critical] == [ops_alert.id]
+
+    assert alert_service.get_alerts_for_user(9999) == []
+    db.close()
+
+if __name__ == "__main__":
+    test_inbox_visibility_and_paging()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test script to verify per-request query counting, slow-query fingerprints and /metrics
+"""
+
+import asyncio
+import os
+import tempfile
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from models import Base
+from database import get_async_db
+from instrumentation import SlowQueryLog, fingerprint, instrument_engine
+from metrics import Registry
+from main import app
+
+def test_fingerprint():
+    print("Testing statement fingerprints...")
+    assert fingerprint("SELECT * FROM users WHERE id = 42 AND name = 'O''Brien'") == \
+        "SELECT * FROM users WHERE id = ? AND name = ?"
+    # IN lists of different lengths share one fingerprint
+    assert fingerprint("SELECT id FROM alerts WHERE id IN (1, 2, 3)") == \
+        fingerprint("SELECT id FROM alerts\n  WHERE id IN (?)")
+
+    log = SlowQueryLog(max_fingerprints=1)
+    log.record("SELECT 1 FROM t WHERE a IN (1, 2)", 0.3)
+    log.record("SELECT 1 FROM t WHERE a IN (5)", 0.1)
+    log.record("DELETE FROM t", 0.5)
+    stats = log.stats()
+    assert stats['fingerprints'] == 1 and stats['dropped'] == 1
+    assert stats['slowest'][0]['count'] == 2 and stats['slowest'][0]['max_ms'] == 300.0
+
+def test_registry_render():
+    print("Testing metrics rendering...")
+    registry = Registry()
+    requests = registry.counter("requests_total", "Requests", ("route",))
+    requests.inc(route="/teams")
+    requests.inc(2, route="/teams")
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1))
+    latency.observe(0.05)
+    latency.observe(3)
+    depth = registry.gauge("queue_depth", "Queued rows")
+    registry.collector(lambda: depth.set(7))
+
+    text = registry.render()
+    assert 'requests_total{route="/teams"} 3' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1"} 1' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 2' in text
+    assert 'latency_seconds_count 2' in text
+    assert 'queue_depth 7' in text
+    assert registry.counter("requests_total", "Requests", ("route",)) is requests
+    try:
+        requests.inc(status="200")
+        assert False, "wrong labels should be rejected"
+    except ValueError:
+        pass
+
+async def exercise():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.post("/teams", json={'name': 'Ops'})
+        response = await client.get("/teams")
+        assert response.status_code == 200
+        assert int(response.headers["x-db-queries"]) >= 1
+        assert float(response.headers["x-db-time-ms"]) >= 0
+        assert float(response.headers["x-response-time-ms"]) > 0
+
+        # Labelled by path template, not by the concrete path
+        await client.get("/users/999/alerts")
+        metrics = await client.get("/metrics")
+        assert metrics.status_code == 200
+        assert 'http_requests_total{method="GET",route="/teams",status="200"}' in metrics.text
+        assert 'http_request_db_queries_bucket{method="GET",route="/users/{user_id}/alerts"' in metrics.text
+        assert 'db_queries_total' in metrics.text
+
+        slow = (await client.get("/admin/slow-queries", params={'limit': 5})).json()
+        assert {'threshold_ms', 'fingerprints', 'slowest'} <= set(slow)
+
+def test_request_instrumentation():
+    print("Testing request instrumentation...")
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, 'metrics.db')
+        engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(bind=engine)
+        engine.dispose()
+
+        async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        instrument_engine(async_engine.sync_engine)
+        sessions = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+        async def override():
+            async with sessions() as session:
+                yield session
+        app.dependency_overrides[get_async_db] = override
+        try:
+            asyncio.run(exercise())
+            asyncio.run(async_engine.dispose())
+        finally:
+            app.dependency_overrides.clear()
+
+if __name__ == "__main__":
+    test_fingerprint()
+    test_registry_render()
+    test_request_instrumentation()
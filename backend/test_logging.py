@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Test script to verify queued JSON logging and per-call channel summaries
+"""
+
+import io
+import json
+import logging
+from logging_config import configure_logging, log_records_dropped, stop_logging
+from providers import FakeProvider
+from services import EmailNotificationChannel
+from models import Alert, User, SeverityLevel, DeliveryType, VisibilityType
+
+def capture(level="DEBUG", queue_size=1000):
+    stream = io.StringIO()
+    configure_logging(level=level, fmt="json", stream=stream, queue_size=queue_size, force=True)
+    return stream
+
+def records(stream):
+    stop_logging()
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+def test_json_lines_with_extra_fields():
+    print("Testing JSON log sink...")
+    stream = capture()
+    try:
+        logger = logging.getLogger("alerting.test")
+        logger.info("hello %s", "world", extra={'alert_id': 7})
+        try:
+            raise RuntimeError("boom")
+        except RuntimeError:
+            logger.exception("failed")
+        logging.getLogger("alerting.test").debug("visible at DEBUG")
+        lines = records(stream)
+    finally:
+        configure_logging(force=True)
+
+    assert lines[0]['message'] == "hello world" and lines[0]['alert_id'] == 7
+    assert lines[0]['level'] == "INFO" and lines[0]['logger'] == "alerting.test"
+    assert lines[1]['level'] == "ERROR" and "RuntimeError: boom" in lines[1]['exc']
+    assert len(lines) == 3
+
+def test_channel_logs_once_per_batch():
+    print("Testing channel send summaries...")
+    users = [User(id=i, name=f"User {i}", email=f"user{i}@company.com") for i in range(1, 251)]
+    alert = Alert(id=1, title="Logged", message="x", severity=SeverityLevel.INFO,
+                  delivery_type=DeliveryType.EMAIL, visibility_type=VisibilityType.ORGANIZATION)
+    channel = EmailNotificationChannel(provider=FakeProvider("email", max_batch_size=100), batch_size=100)
+
+    stream = capture(level="DEBUG")
+    try:
+        channel.send_many(users, alert)
+        lines = records(stream)
+    finally:
+        configure_logging(force=True)
+
+    # 250 recipients, three provider batches, three lines
+    sends = [line for line in lines if line['logger'] == "alerting.channels"]
+    assert len(sends) == 3
+    assert sum(line['sent'] for line in sends) == 250 and all('duration_ms' in line for line in sends)
+
+    # Not emitted at the default level
+    stream = capture(level="INFO")
+    try:
+        channel.send_many(users, alert)
+        assert records(stream) == []
+    finally:
+        configure_logging(force=True)
+
+def test_full_queue_drops_instead_of_blocking():
+    print("Testing log queue overflow...")
+    capture(queue_size=1)
+    try:
+        # Stop draining so the queue stays full
+        stop_logging()
+        dropped = log_records_dropped.value()
+        for i in range(5):
+            logging.getLogger("alerting.test").info("record %d", i)
+        assert log_records_dropped.value() >= dropped + 4
+    finally:
+        configure_logging(force=True)
+
+if __name__ == "__main__":
+    test_json_lines_with_extra_fields()
+    test_channel_logs_once_per_batch()
+    test_full_queue_drops_instead_of_blocking()
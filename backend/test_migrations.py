@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Test script to verify migrating an existing database with duplicate preferences
+"""
+
+import os
+import tempfile
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+import database
+from models import Base, User, Alert, AlertStats, UserAlertPreference, SeverityLevel, VisibilityType
+from migrations import MIGRATIONS
+from testutils import capture_queries
+
+SNOOZED_AT = datetime(2030, 1, 1, 9, 0)
+
+def make_old_database(engine):
+    """A database from before the unique preference index, holding duplicate rows"""
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ux_preferences_user_alert"))
+    db = sessionmaker(bind=engine)()
+    db.add_all([User(name=f"User {i}", email=f"user{i}@company.com") for i in range(3)])
+    db.add_all([Alert(title=f"Alert {i}", message="Old", severity=SeverityLevel.INFO,
+                      visibility_type=VisibilityType.ORGANIZATION, created_by=1) for i in range(2)])
+    db.flush()
+    # (user_id, alert_id, is_read, snoozed for hours); later duplicates carry read flags and snoozes
+    rows = [(1, 1, False, None), (1, 1, True, None), (1, 1, False, None), (2, 1, False, 1), (2, 1, False, 2),
+            (3, 1, True, None), (1, 2, False, None), (2, 2, True, None), (2, 2, True, 3)]
+    db.add_all([UserAlertPreference(user_id=user_id, alert_id=alert_id, is_read=is_read, is_snoozed=bool(hours),
+                                    snoozed_until=hours and SNOOZED_AT + timedelta(hours=hours))
+                for user_id, alert_id, is_read, hours in rows])
+    db.commit()
+    db.close()
+
+def create_tables(engine):
+    original = database.engine
+    database.engine = engine
+    try:
+        database.create_tables()
+    finally:
+        database.engine = original
+
+def test_duplicates_collapse_before_unique_index():
+    print("Testing preference dedupe migration...")
+    with tempfile.TemporaryDirectory() as workdir:
+        engine = database.make_engine(f"sqlite:///{os.path.join(workdir, 'old.db')}")
+        make_old_database(engine)
+        create_tables(engine)
+
+        db = sessionmaker(bind=engine)()
+        preferences = db.query(UserAlertPreference).order_by(UserAlertPreference.id).all()
+        # Each pair keeps its oldest row, read if any duplicate was read and snoozed until the latest snooze
+        assert [(p.id, p.user_id, p.alert_id, p.is_read, p.is_snoozed) for p in preferences] == [
+            (1, 1, 1, True, False), (4, 2, 1, False, True), (6, 3, 1, True, False),
+            (7, 1, 2, False, False), (8, 2, 2, True, True)
+        ]
+        assert [p.snoozed_until for p in preferences] == [
+            None, SNOOZED_AT + timedelta(hours=2), None, None, SNOOZED_AT + timedelta(hours=3)
+        ]
+        stats = {s.alert_id: (s.targeted_count, s.read_count, s.snoozed_count) for s in db.query(AlertStats)}
+        assert stats == {1: (3, 2, 1), 2: (2, 1, 1)}
+
+        db.add(UserAlertPreference(user_id=2, alert_id=1))
+        try:
+            db.commit()
+            assert False, "duplicate preference should be rejected"
+        except IntegrityError:
+            db.rollback()
+        db.close()
+
+        # Running it again changes nothing
+        with engine.connect() as conn:
+            versions = conn.execute(text("SELECT version FROM schema_version ORDER BY version")).scalars().all()
+        assert versions == [version for version, _, _ in MIGRATIONS]
+        with capture_queries(engine) as statements:
+            create_tables(engine)
+        writes = [s for s in statements if s.split()[0].upper() in ("INSERT", "UPDATE", "DELETE", "CREATE", "ALTER", "DROP")
+                  and "IF NOT EXISTS" not in s]
+        assert writes == [], writes
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT COUNT(*) FROM user_alert_preferences")).scalar() == 5
+        engine.dispose()
+
+if __name__ == "__main__":
+    test_duplicates_collapse_before_unique_index()
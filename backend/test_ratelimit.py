@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Test script to verify delivery rate limits and digests
+"""
+
+from datetime import datetime, timedelta
+from models import (User, NotificationDelivery, UserAlertPreference, SeverityLevel, DeliveryType, DeliveryStatus,
+                    VisibilityType)
+from providers import FakeProvider
+from ratelimit import DeliveryRateLimiter, TokenBucket
+from services import AlertService, NotificationObserver, ReminderService, DeliveryQueue, EmailNotificationChannel
+from testutils import make_session
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_token_bucket():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=0.5, capacity=2, clock=clock)
+    bucket.take()
+    bucket.take()
+    assert bucket.wait_time() == 2.0
+    clock.now = 1.0
+    assert bucket.wait_time() == 1.0
+    clock.now = 10.0
+    assert bucket.wait_time() == 0 and bucket.full
+
+def test_limiter_buckets():
+    clock = FakeClock()
+    limiter = DeliveryRateLimiter({DeliveryType.SMS: 2}, user_burst=1, user_interval=60, clock=clock)
+    assert limiter.acquire(DeliveryType.SMS, 1) == 0
+    assert limiter.acquire(DeliveryType.SMS, 1) == 60      # user bucket empty
+    assert limiter.acquire(DeliveryType.SMS, 2) == 0
+    assert limiter.acquire(DeliveryType.SMS, 3) == 0.5     # channel bucket empty
+    assert limiter.acquire(DeliveryType.EMAIL, 1) == 0     # separate bucket per channel
+    assert all(limiter.acquire(DeliveryType.IN_APP, 1) == 0 for _ in range(10))
+    stats = limiter.stats()
+    assert (stats['allowed'], stats['limited']) == (3, 2)
+
+def test_digest_and_deferral():
+    print("Testing digests and rate limited deliveries...")
+    db = make_session()
+    db.add_all([User(name=f"User {i}", email=f"user{i}@company.com") for i in range(3)])
+    db.commit()
+
+    alert_service = AlertService(db)
+    alerts = [alert_service.create_alert({
+        'title': f"Outage {i}", 'message': 'Email', 'severity': SeverityLevel.WARNING,
+        'delivery_type': DeliveryType.EMAIL, 'visibility_type': VisibilityType.ORGANIZATION
+    }, created_by=1) for i in range(4)]
+
+    delivery_queue = DeliveryQueue(db)
+    # User 1 has four alerts due, user 2 has one, user 3 is already over their limit
+    for alert in alerts:
+        delivery_queue.enqueue(alert, [1])
+    delivery_queue.enqueue(alerts[0], [2, 3])
+    db.commit()
+
+    clock = FakeClock()
+    limiter = DeliveryRateLimiter({}, user_burst=1, user_interval=60, clock=clock)
+    limiter.acquire(DeliveryType.EMAIL, 3)
+    provider = FakeProvider("email")
+    channel = EmailNotificationChannel(provider=provider)
+
+    delivery_queue = DeliveryQueue(db, rate_limiter=limiter)
+    token = delivery_queue.claim(DeliveryType.EMAIL, limit=10)
+    result = delivery_queue.deliver(delivery_queue.claimed(token), channel)
+    print(f"Delivery result: {result}, provider calls={provider.calls} messages={provider.messages}")
+    assert result == {'sent': 5, 'failed': 0, 'deferred': 1, 'digests': 1}
+    assert provider.messages == 2 and provider.calls == 2
+
+    deferred = db.query(NotificationDelivery).filter(NotificationDelivery.user_id == 3).one()
+    assert deferred.status == DeliveryStatus.QUEUED and deferred.attempts == 0 and deferred.claim_token is None
+    assert delivery_queue.claim(DeliveryType.EMAIL, limit=10) is None  # waits out the user's bucket
+
+    db.close()
+
+def test_claim_keeps_a_users_rows_together():
+    print("Testing per-user claims...")
+    db = make_session()
+    db.add_all([User(name=f"User {i}", email=f"user{i}@company.com") for i in range(2)])
+    db.commit()
+    alert_service = AlertService(db)
+    alerts = [alert_service.create_alert({
+        'title': f"Outage {i}", 'message': 'Email', 'severity': SeverityLevel.WARNING,
+        'delivery_type': DeliveryType.EMAIL, 'visibility_type': VisibilityType.ORGANIZATION
+    }, created_by=1) for i in range(4)]
+
+    # Ordered by due time user 1's rows are split by user 2's: (1, 2, 1, 1, 1)
+    start = datetime.utcnow() - timedelta(minutes=10)
+    delivery_queue = DeliveryQueue(db)
+    delivery_queue.enqueue(alerts[0], [1], start)
+    delivery_queue.enqueue(alerts[0], [2], start + timedelta(minutes=1))
+    for alert in alerts[1:]:
+        delivery_queue.enqueue(alert, [1], start + timedelta(minutes=2))
+    db.commit()
+
+    token = delivery_queue.claim(DeliveryType.EMAIL, limit=1)
+    assert sorted(d.alert_id for d in delivery_queue.claimed(token)) == [a.id for a in alerts]
+    assert {d.user_id for d in delivery_queue.claimed(token)} == {1}
+    token = delivery_queue.claim(DeliveryType.EMAIL, limit=1)
+    assert [(d.user_id, d.alert_id) for d in delivery_queue.claimed(token)] == [(2, alerts[0].id)]
+    db.close()
+
+def test_inline_reminders_are_digested_and_limited():
+    print("Testing inline reminder digests...")
+    db = make_session()
+    db.add_all([User(name=f"User {i}", email=f"user{i}@company.com") for i in range(3)])
+    db.commit()
+    alert_service = AlertService(db)
+    alert_service.add_observer(NotificationObserver(db, alert_service))
+    for i in range(2):
+        alert_service.create_alert({
+            'title': f"Outage {i}", 'message': 'Email', 'severity': SeverityLevel.WARNING,
+            'delivery_type': DeliveryType.EMAIL, 'visibility_type': VisibilityType.ORGANIZATION,
+            'reminder_frequency': 1
+        }, created_by=1)
+    past = datetime.utcnow() - timedelta(hours=2)
+    db.query(UserAlertPreference).update({'last_reminded': past, 'next_reminder_at': past + timedelta(hours=1)})
+    db.commit()
+    initial = db.query(NotificationDelivery).count()
+
+    provider = FakeProvider("email")
+    alert_service.notification_channels['Email'] = EmailNotificationChannel(provider=provider)
+    limiter = DeliveryRateLimiter({}, user_burst=1, user_interval=60, clock=FakeClock())
+    limiter.acquire(DeliveryType.EMAIL, 3)
+    reminder_service = ReminderService(db, alert_service, rate_limiter=limiter)
+    reminder_service.process_reminders()
+
+    # Users 1 and 2 get one digest each for both alerts; user 3 is over the limit
+    print(f"Reminder run: {reminder_service.last_run}, provider messages={provider.messages}")
+    assert provider.messages == 2 and reminder_service.last_run['reminded'] == 4
+    reminders = db.query(NotificationDelivery).count() - initial
+    deferred = db.query(NotificationDelivery).filter(NotificationDelivery.user_id == 3,
+                                                     NotificationDelivery.status == DeliveryStatus.QUEUED).count()
+    assert reminders == 6 and deferred == 2
+    db.close()
+
+if __name__ == "__main__":
+    test_token_bucket()
+    test_limiter_buckets()
+    test_digest_and_deferral()
+    test_claim_keeps_a_users_rows_together()
+    test_inline_reminders_are_digested_and_limited()
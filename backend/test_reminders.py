@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Test script to verify due-time driven reminder processing
+"""
+
+from datetime import datetime, timedelta
+from models import User, UserAlertPreference, NotificationDelivery, SeverityLevel, VisibilityType
+from services import AlertService, NotificationObserver, ReminderService
+from testutils import make_session
+
+def create_alert(db, **overrides):
+    alert_service = AlertService(db)
+    alert_service.add_observer(NotificationObserver(db, alert_service))
+    alert_data = {
+        'title': 'Reminder Alert',
+        'message': 'Please read me',
+        'severity': SeverityLevel.WARNING,
+        'visibility_type': VisibilityType.ORGANIZATION,
+        'reminder_frequency': 1
+    }
+    alert_data.update(overrides)
+    return alert_service, alert_service.create_alert(alert_data, created_by=1)
+
+def backdate(db, alert, hours):
+    past = datetime.utcnow() - timedelta(hours=hours)
+    for preference in db.query(UserAlertPreference).filter(UserAlertPreference.alert_id == alert.id):
+        preference.last_reminded = past
+        preference.next_reminder_at = past + timedelta(hours=alert.reminder_frequency)
+    db.commit()
+
+def reminders_sent(db, alert):
+    # One delivery per user comes from the initial fan-out
+    return db.query(NotificationDelivery).filter(NotificationDelivery.alert_id == alert.id).count() - 7
+
+def test_only_due_preferences_are_reminded():
+    print("Testing due reminders...")
+    db = make_session()
+    db.add_all([User(name=f"User {i}", email=f"user{i}@company.com") for i in range(7)])
+    db.commit()
+
+    alert_service, alert = create_alert(db)
+    reminder_service = ReminderService(db, alert_service, page_size=3)
+
+    reminder_service.process_reminders()
+    assert reminders_sent(db, alert) == 0
+
+    backdate(db, alert, hours=2)
+    db.query(UserAlertPreference).filter(UserAlertPreference.user_id == 1).one().is_read = True
+    db.commit()
+
+    reminder_service.process_reminders()
+    assert reminders_sent(db, alert) == 6  # paged through 3 at a time, read user skipped
+
+    preference = db.query(UserAlertPreference).filter(UserAlertPreference.user_id == 2).one()
+    assert preference.next_reminder_at > datetime.utcnow() + timedelta(minutes=59)
+
+    db.close()
+
+def test_deactivated_alert_stops_reminders():
+    print("Testing reminder rescheduling...")
+    db = make_session()
+    db.add_all([User(name=f"User {i}", email=f"user{i}@company.com") for i in range(7)])
+    db.commit()
+
+    alert_service, alert = create_alert(db, start_time=datetime.utcnow() - timedelta(hours=3))
+    backdate(db, alert, hours=2)
+
+    alert.is_active = False
+    alert_service.reschedule_reminders(alert)
+    db.commit()
+    assert db.query(UserAlertPreference).filter(UserAlertPreference.next_reminder_at.isnot(None)).count() == 0
+
+    alert.is_active = True
+    alert_service.reschedule_reminders(alert)
+    db.commit()
+
+    ReminderService(db, alert_service).process_reminders()
+    # Reactivation makes every row due for re-evaluation; none were reminded within the hour
+    assert reminders_sent(db, alert) == 7
+
+    db.close()
+
+def test_leased_rows_are_skipped_by_other_workers():
+    print("Testing reminder leases...")
+    db = make_session()
+    db.add_all([User(name=f"User {i}", email=f"user{i}@company.com") for i in range(7)])
+    db.commit()
+
+    alert_service, alert = create_alert(db)
+    backdate(db, alert, hours=2)
+
+    # Worker A leases three rows and dies before processing them
+    worker_a = ReminderService(db, alert_service, worker_id="a", lease=timedelta(minutes=5))
+    token = worker_a.claim_due(datetime.utcnow(), limit=3)
+    assert token.startswith("a/")
+    assert db.query(UserAlertPreference).filter(UserAlertPreference.claimed_by == token).count() == 3
+
+    worker_b = ReminderService(db, alert_service, worker_id="b", page_size=2)
+    worker_b.process_reminders()
+    assert reminders_sent(db, alert) == 4
+    assert db.query(UserAlertPreference).filter(UserAlertPreference.claimed_by.isnot(None)).count() == 3
+
+    # Once A's lease runs out, the rows are picked up again
+    db.query(UserAlertPreference).filter(UserAlertPreference.claimed_by == token).update(
+        {'claimed_until': datetime.utcnow() - timedelta(seconds=1)}
+    )
+    db.commit()
+    worker_b.process_reminders()
+    assert reminders_sent(db, alert) == 7
+    assert db.query(UserAlertPreference).filter(UserAlertPreference.claimed_by.isnot(None)).count() == 0
+
+    db.close()
+
+def test_failed_batch_is_resumed():
+    print("Testing batched reminder commits...")
+    db = make_session()
+    db.add_all([User(name=f"User {i}", email=f"user{i}@company.com") for i in range(7)])
+    db.commit()
+
+    alert_service, alert = create_alert(db)
+    backdate(db, alert, hours=2)
+
+    reminder_service = ReminderService(db, alert_service, page_size=3)
+    send_reminders = reminder_service._send_reminders
+    calls = []
+    def flaky_send(*args):
+        calls.append(args)
+        if len(calls) == 2:
+            raise RuntimeError("provider outage")
+        return send_reminders(*args)
+    reminder_service._send_reminders = flaky_send
+
+    try:
+        reminder_service.process_reminders()
+        assert False, "expected the second batch to fail"
+    except RuntimeError:
+        pass
+    # The first batch stays committed and the failed batch's lease is released
+    assert reminders_sent(db, alert) == 3
+    assert [batch['rows'] for batch in reminder_service.last_run['batches']] == [3]
+    assert db.query(UserAlertPreference).filter(UserAlertPreference.claimed_by.isnot(None)).count() == 0
+
+    reminder_service.process_reminders()
+    assert reminders_sent(db, alert) == 7
+    run = reminder_service.last_run
+    print(f"Reminder run: {run}")
+    assert [batch['rows'] for batch in run['batches']] == [3, 1] and run['reminded'] == 4
+    assert all(batch['seconds'] >= 0 for batch in run['batches'])
+
+    db.close()
+
+if __name__ == "__main__":
+    test_only_due_preferences_are_reminded()
+    test_deactivated_alert_stops_reminders()
+    test_leased_rows_are_skipped_by_other_workers()
+    test_failed_batch_is_resumed()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Test script to verify delivery compaction into archives and rollups
+"""
+
+import gzip
+import json
+import tempfile
+from datetime import datetime, time, timedelta
+from models import (User, AlertStats, DeliveryRollup, NotificationDelivery, SeverityLevel,
+                    DeliveryStatus, VisibilityType)
+from services import AlertService, NotificationObserver, AnalyticsService
+from stats import AlertStatsService
+from retention import archive_path, compact_deliveries
+from testutils import make_session
+
+def test_compaction_keeps_counts():
+    print("Testing delivery compaction...")
+    db = make_session()
+    db.add_all([User(name=f"User {i}", email=f"user{i}@company.com") for i in range(4)])
+    db.commit()
+
+    alert_service = AlertService(db)
+    alert_service.add_observer(NotificationObserver(db, alert_service))
+    alert = alert_service.create_alert({
+        'title': 'Old', 'message': 'History', 'severity': SeverityLevel.INFO,
+        'visibility_type': VisibilityType.ORGANIZATION
+    }, created_by=1)
+
+    # Three reminder rounds ten days ago, plus a failed row that is never compacted
+    old_day = datetime.combine(datetime.utcnow().date() - timedelta(days=10), time(12))
+    for round_ in range(3):
+        db.add_all([NotificationDelivery(alert_id=alert.id, user_id=user_id, delivery_type=alert.delivery_type,
+                                          delivered_at=old_day + timedelta(minutes=round_), attempts=1)
+                    for user_id in range(1, 5)])
+    db.add(NotificationDelivery(alert_id=alert.id, user_id=1, delivery_type=alert.delivery_type,
+                                delivered_at=None, status=DeliveryStatus.FAILED, attempts=5))
+    db.commit()
+    AlertStatsService(db).rebuild()
+    assert db.get(AlertStats, alert.id).delivered_count == 16
+    history = AnalyticsService(db).get_delivery_history(days=14)
+
+    with tempfile.TemporaryDirectory() as archive_dir:
+        summary = compact_deliveries(db, datetime.utcnow() - timedelta(days=5), archive_dir, batch_size=5)
+        print(f"Compaction summary: {summary}")
+        assert summary['archived'] == 12 and summary['batches'] == 3
+
+        with gzip.open(archive_path(archive_dir, old_day.date()), 'rt') as archive:
+            archived = [json.loads(line) for line in archive]
+        assert len(archived) == 12 and {row['alert_id'] for row in archived} == {alert.id}
+
+    # Only the fresh fan-out rows and the failed row are left
+    assert db.query(NotificationDelivery).count() == 5
+    rollup = db.query(DeliveryRollup).one()
+    assert (rollup.day, rollup.sent_count) == (old_day.date(), 12)
+
+    # Counters and history read the same whether rows are live or rolled up
+    assert AlertStatsService(db).reconcile() == []
+    assert db.get(AlertStats, alert.id).delivered_count == 16
+    assert AnalyticsService(db).get_delivery_history(days=14) == history
+    assert history[-11]['sent'] == 12 and history[-1]['sent'] == 4
+
+    db.close()
+
+if __name__ == "__main__":
+    test_compaction_keeps_counts()
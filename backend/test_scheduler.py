@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the due-time driven reminder scheduler
+"""
+
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from models import Base, User, UserAlertPreference, NotificationDelivery, SeverityLevel, VisibilityType
+from services import AlertService, NotificationObserver, reminders_due_total, reminders_sent_total
+from scheduler import ReminderScheduler
+from metrics import registry
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+def test_scheduler_runs_due_passes_and_stops_promptly():
+    print("Testing reminder scheduler...")
+    with tempfile.TemporaryDirectory() as workdir:
+        engine = create_engine(f"sqlite:///{os.path.join(workdir, 'scheduler.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        db = Session()
+        db.add_all([User(name=f"User {i}", email=f"user{i}@company.com") for i in range(3)])
+        db.commit()
+
+        alert_service = AlertService(db)
+        alert_service.add_observer(NotificationObserver(db, alert_service))
+        alert = alert_service.create_alert({
+            'title': 'Hourly', 'message': 'Reminder', 'severity': SeverityLevel.WARNING,
+            'visibility_type': VisibilityType.ORGANIZATION, 'reminder_frequency': 1,
+            'start_time': datetime.utcnow() - timedelta(hours=3)
+        }, created_by=1)
+        alert_id = alert.id
+
+        def backdate():
+            past = datetime.utcnow() - timedelta(hours=2)
+            db.query(UserAlertPreference).update({'last_reminded': past, 'next_reminder_at': past + timedelta(hours=1)})
+            db.commit()
+        def reminders():
+            return db.query(NotificationDelivery).filter(NotificationDelivery.alert_id == alert_id).count() - 3
+
+        scheduler = ReminderScheduler(max_sleep_seconds=3600, session_factory=Session, min_pass_interval=0)
+        scheduler.start()
+        try:
+            # Nothing is due yet, so the scheduler sleeps until the next hourly reminder
+            assert wait_for(lambda: scheduler.stats()['next_due_at'] is not None)
+            assert scheduler.stats()['next_due_at'] > datetime.utcnow() + timedelta(minutes=59)
+            assert scheduler.passes == 0
+
+            # A change that makes reminders due is picked up on replan, not after the sleep
+            due, sent = reminders_due_total.value(), reminders_sent_total.value()
+            backdate()
+            scheduler.replan()
+            assert wait_for(lambda: reminders() == 3 and scheduler.passes == 1)
+            stats = scheduler.stats()
+            print(f"Scheduler stats: {stats}")
+            assert stats['passes'] == 1 and stats['lag_seconds']['samples'] == 1
+            assert stats['lag_seconds']['p50'] >= 3600  # the backdated rows were an hour overdue
+            assert reminders_due_total.value() == due + 3 and reminders_sent_total.value() == sent + 3
+            assert 'reminder_scheduler_lag_seconds_bucket{le="+Inf"}' in registry.render()
+
+            # A pushed due time wakes the thread early
+            scheduler.schedule(datetime.utcnow())
+            assert wait_for(lambda: scheduler.passes == 2)
+        finally:
+            started = time.monotonic()
+            scheduler.stop()
+            assert time.monotonic() - started < 2
+        db.close()
+        engine.dispose()
+
+def test_replan_keeps_retry_backoff():
+    print("Testing retry backoff across replans...")
+    with tempfile.TemporaryDirectory() as workdir:
+        engine = create_engine(f"sqlite:///{os.path.join(workdir, 'retry.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        db = Session()
+        db.add(User(name="User", email="user@company.com"))
+        db.commit()
+        alert_service = AlertService(db)
+        alert_service.add_observer(NotificationObserver(db, alert_service))
+        alert_service.create_alert({
+            'title': 'Hourly', 'message': 'Reminder', 'severity': SeverityLevel.WARNING,
+            'visibility_type': VisibilityType.ORGANIZATION, 'reminder_frequency': 1
+        }, created_by=1)
+        # Overdue, as it stays when passes keep failing
+        db.query(UserAlertPreference).update({'next_reminder_at': datetime.utcnow() - timedelta(minutes=5)})
+        db.commit()
+        db.close()
+
+        scheduler = ReminderScheduler(session_factory=Session, retry_seconds=60)
+        retry_at = datetime.utcnow() + timedelta(seconds=60)
+        scheduler.schedule(retry_at, "retry")
+        scheduler._seed()
+        stats = scheduler.stats()
+        assert stats['queued_due_times'] == 2
+        assert stats['next_due_at'] == retry_at and stats['next_due_reason'] == "retry"
+        assert not scheduler._next_due_by(datetime.utcnow())
+        engine.dispose()
+
+def test_rows_leased_elsewhere_are_not_seeded():
+    print("Testing seeding around leased rows...")
+    with tempfile.TemporaryDirectory() as workdir:
+        engine = create_engine(f"sqlite:///{os.path.join(workdir, 'leased.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        db = Session()
+        db.add_all([User(name=f"User {i}", email=f"user{i}@company.com") for i in range(2)])
+        db.commit()
+        alert_service = AlertService(db)
+        alert_service.add_observer(NotificationObserver(db, alert_service))
+        alert_service.create_alert({
+            'title': 'Hourly', 'message': 'Reminder', 'severity': SeverityLevel.WARNING,
+            'visibility_type': VisibilityType.ORGANIZATION, 'reminder_frequency': 1
+        }, created_by=1)
+        # Both rows are overdue; another worker holds the first one's lease
+        now = datetime.utcnow()
+        first, second = db.query(UserAlertPreference).order_by(UserAlertPreference.id).all()
+        first.next_reminder_at = now - timedelta(minutes=10)
+        first.claimed_by, first.claimed_until = "other/1", now + timedelta(minutes=5)
+        second.next_reminder_at = now + timedelta(minutes=30)
+        db.commit()
+
+        scheduler = ReminderScheduler(session_factory=Session)
+        scheduler._seed()
+        assert scheduler.stats()['next_due_at'] == second.next_reminder_at
+
+        # Once the lease has lapsed the row is due again
+        first.claimed_until = now - timedelta(seconds=1)
+        db.commit()
+        scheduler._seed()
+        assert scheduler.stats()['next_due_at'] == now - timedelta(minutes=10)
+        db.close()
+        engine.dispose()
+
+if __name__ == "__main__":
+    test_scheduler_runs_due_passes_and_stops_promptly()
+    test_replan_keeps_retry_backoff()
+    test_rows_leased_elsewhere_are_not_seeded()
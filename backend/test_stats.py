@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Test script to verify incrementally maintained alert counters
+"""
+
+from datetime import datetime, timedelta
+from models import User, AlertStats, UserAlertPreference, SeverityLevel, DeliveryType, VisibilityType
+from services import AlertService, NotificationObserver, ReminderService, DeliveryQueue, InAppNotificationChannel
+from stats import AlertStatsService
+from testutils import make_session
+
+def counters(db, alert_id):
+    db.expire_all()
+    stats = db.get(AlertStats, alert_id)
+    return (stats.targeted_count, stats.delivered_count, stats.read_count, stats.snoozed_count)
+
+def test_counters_follow_state_changes():
+    print("Testing alert counters...")
+    db = make_session()
+    db.add_all([User(name=f"User {i}", email=f"user{i}@company.com") for i in range(4)])
+    db.commit()
+
+    alert_service = AlertService(db, queue_deliveries=True)
+    alert_service.add_observer(NotificationObserver(db, alert_service))
+    alert = alert_service.create_alert({
+        'title': 'Counted',
+        'message': 'Counters',
+        'severity': SeverityLevel.INFO,
+        'delivery_type': DeliveryType.IN_APP,
+        'visibility_type': VisibilityType.ORGANIZATION
+    }, created_by=1)
+    assert counters(db, alert.id) == (4, 0, 0, 0)
+
+    delivery_queue = DeliveryQueue(db)
+    token = delivery_queue.claim(DeliveryType.IN_APP, limit=10)
+    delivery_queue.deliver(delivery_queue.claimed(token), InAppNotificationChannel())
+    assert counters(db, alert.id) == (4, 4, 0, 0)
+
+    alert_service.mark_as_read(1, alert.id)
+    alert_service.mark_as_read(1, alert.id)
+    alert_service.mark_as_read(2, alert.id)
+    alert_service.mark_as_unread(2, alert.id)
+    alert_service.mark_as_unread(3, alert.id)
+    assert counters(db, alert.id) == (4, 4, 1, 0)
+
+    alert_service.snooze_alert(3, alert.id)
+    alert_service.snooze_alert(3, alert.id)
+    alert_service.snooze_alert(4, alert.id)
+    assert counters(db, alert.id) == (4, 4, 1, 2)
+
+    expired = db.query(UserAlertPreference).filter(UserAlertPreference.user_id == 4).one()
+    expired.snoozed_until = datetime.utcnow() - timedelta(minutes=1)
+    db.commit()
+    # Already reads as expired before the reminder pass resets the row
+    inbox = {item['alert'].id: item for item in alert_service.get_alerts_for_user(4)}
+    assert inbox[alert.id]['is_snoozed'] is False and inbox[alert.id]['snoozed_until'] is None
+    reminder_service = ReminderService(db, alert_service)
+    reminder_service.process_reminders()
+    assert reminder_service.last_run['expired_snoozes'] == 1
+    assert counters(db, alert.id) == (4, 4, 1, 1)
+    reminder_service.process_reminders()
+    assert counters(db, alert.id) == (4, 4, 1, 1)
+
+    stats_service = AlertStatsService(db)
+    assert stats_service.reconcile() == []
+
+    db.get(AlertStats, alert.id).read_count = 99
+    db.commit()
+    drifted = stats_service.reconcile()
+    assert [item['alert_id'] for item in drifted] == [alert.id]
+    assert counters(db, alert.id) == (4, 4, 1, 1)
+
+    db.close()
+
+if __name__ == "__main__":
+    test_counters_follow_state_changes()
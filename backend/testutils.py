@@ -0,0 +1,34 @@
+"""
+Shared helpers for the test scripts
+"""
+
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from models import Base
+
+def make_engine():
+    """In-memory SQLite engine with every table created"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+def make_session(engine=None):
+    return sessionmaker(bind=engine or make_engine())()
+
+@contextmanager
+def capture_queries(engine):
+    """Collect the SQL of every statement executed on `engine` inside the block"""
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+def count_queries(engine, fn):
+    with capture_queries(engine) as statements:
+        result = fn()
+    return result, len(statements)
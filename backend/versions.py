@@ -0,0 +1,128 @@
+"""
+Resource versions and the response cache they drive.
+
+Writers call `touch(db, ...)` with the resources they changed; the versions
+in the resource_versions table are bumped inside that session's commit, so
+a new ETag never describes data that isn't visible yet, and writes from any
+process (CLI scripts, delivery workers, other API workers) change it. Read
+endpoints derive their ETag from the versions they depend on, answer 304
+when the client already has it and otherwise serve a short-lived cached
+body stored under the same ETag.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy import event, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+from models import ResourceVersion
+
+class ResourceVersions:
+    """Versions per resource name such as 'alerts' or 'inbox:7', stored in the database"""
+
+    def bump(self, session: Session, resources: Iterable[str]):
+        """Increment `resources` in the session's current transaction"""
+        dialect = postgresql if session.get_bind().dialect.name == "postgresql" else sqlite
+        # Sorted so concurrent writers take row locks in the same order
+        statement = dialect.insert(ResourceVersion).values(
+            [{'resource': resource, 'version': 1} for resource in sorted(set(resources))]
+        )
+        session.execute(statement.on_conflict_do_update(
+            index_elements=[ResourceVersion.resource], set_={'version': ResourceVersion.version + 1}
+        ))
+
+    def query(self, resources: Iterable[str]) -> Select:
+        """(resource, version) rows for `resources`; run it on the session that builds the response"""
+        return select(ResourceVersion.resource, ResourceVersion.version).where(
+            ResourceVersion.resource.in_(set(resources))
+        )
+
+    @staticmethod
+    def etag(versions: Dict[str, int], resources: Iterable[str], key: str) -> str:
+        state = ",".join(f"{r}={versions.get(r, 0)}" for r in resources)
+        digest = hashlib.blake2b(f"{state}|{key}".encode(), digest_size=8).hexdigest()
+        return f'W/"{digest}"'
+
+class ResponseCache:
+    """Bounded LRU of serialized response bodies, valid while their ETag is current"""
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 5.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[str, bytes, dict, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def get(self, key: str, etag: str) -> Optional[Tuple[bytes, dict]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == etag and time.monotonic() - entry[3] < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1], entry[2]
+            if entry:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, etag: str, body: bytes, headers: dict):
+        with self._lock:
+            self._entries[key] = (etag, body, headers, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def record_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'not_modified': self.not_modified,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    # Weak comparison, as required for If-None-Match
+    def strip(tag: str) -> str:
+        return tag.strip().removeprefix("W/")
+    return any(tag.strip() == "*" or strip(tag) == strip(etag) for tag in if_none_match.split(","))
+
+def touch(db, *resources: str):
+    """Bump `resources` once `db` commits; dropped if it rolls back"""
+    session = getattr(db, 'sync_session', db)
+    session.info.setdefault('touched_resources', set()).update(resources)
+
+@event.listens_for(Session, "before_commit")
+def _bump_touched(session: Session):
+    touched = session.info.pop('touched_resources', None)
+    if touched:
+        resource_versions.bump(session, touched)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_touched(session: Session):
+    session.info.pop('touched_resources', None)
+
+# Global instances
+resource_versions = ResourceVersions()
+response_cache = ResponseCache(ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL", 5)))
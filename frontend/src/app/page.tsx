@@ -6,7 +6,7 @@ import AlertCard from '@/components/AlertCard'
 import CreateAlertModal from '@/components/CreateAlertModal'
 import UserModal from '@/components/UserModal'
 import TeamModal from '@/components/TeamModal'
-import { apiClient, Alert, User, Team, Analytics } from '@/lib/api'
+import { apiClient, Alert, AlertStreamEvent, User, Team, Analytics } from '@/lib/api'
 import { Plus, Filter, Search, BarChart3, Users, AlertTriangle, CheckCircle, Clock, Pause, Edit, Trash2 } from 'lucide-react'
 
 export default function Home() {
@@ -42,6 +42,22 @@ export default function Home() {
     }
   }, [currentView, currentUser])
 
+  useEffect(() => {
+    if (!currentUser || currentView !== 'alerts') return
+    // Apply pushed changes instead of re-fetching the inbox
+    return apiClient.subscribeToAlerts(currentUser.id, (event: AlertStreamEvent) => {
+      if (event.type === 'alert') {
+        setAlerts(prev => prev.some(a => a.id === event.alert.id) ? prev : [event.alert, ...prev])
+      } else {
+        setAlerts(prev => prev.map(a => a.id !== event.alert_id ? a : {
+          ...a,
+          is_read: event.type === 'read' ? true : event.type === 'unread' ? false : a.is_read,
+          is_snoozed: event.type === 'snoozed' ? true : a.is_snoozed,
+        }))
+      }
+    })
+  }, [currentView, currentUser])
+
   const loadInitialData = async () => {
     try {
       const [usersData, teamsData] = await Promise.all([
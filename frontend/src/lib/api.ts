@@ -12,6 +12,11 @@ export interface Alert {
   is_snoozed: boolean
 }
 
+export type AlertStreamEvent =
+  | { type: 'alert'; id: number; alert: Alert }
+  | { type: 'read' | 'unread'; id: number; alert_id: number }
+  | { type: 'snoozed'; id: number; alert_id: number; snoozed_until: string }
+
 export interface User {
   id: number
   name: string
@@ -68,6 +73,16 @@ class ApiClient {
     return this.request<Alert[]>(`/users/${userId}/alerts`)
   }
 
+  // Server-Sent Events feed of inbox changes; returns a function that closes it
+  subscribeToAlerts(userId: number, onEvent: (event: AlertStreamEvent) => void): () => void {
+    const source = new EventSource(`${API_BASE_URL}/users/${userId}/stream`)
+    const handler = (message: MessageEvent) => onEvent(JSON.parse(message.data))
+    for (const type of ['alert', 'read', 'unread', 'snoozed']) {
+      source.addEventListener(type, handler)
+    }
+    return () => source.close()
+  }
+
   async snoozeAlert(userId: number, alertId: number): Promise<void> {
     await this.request(`/users/${userId}/alerts/${alertId}/snooze`, {
       method: 'POST',